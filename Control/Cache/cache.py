@@ -0,0 +1,125 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# --- Constantes do Cache ---
+# Limites padrão: quantidade de itens e memória total (estimada) guardada.
+MAX_ITENS_PADRAO = 64
+MAX_BYTES_PADRAO = 256 * 1024 * 1024
+# Sentinela para distinguir "não encontrado" de um valor None guardado.
+_AUSENTE = object()
+
+# --- Funções Auxiliares ---
+
+def impressao_digital(*partes) -> str:
+    """
+    Gera uma chave (hash BLAKE2b) a partir de arrays, Series/DataFrames e valores simples.
+
+    Arrays entram com tipo, formato e bytes; objetos do pandas pelo hash de cada linha
+    (sem o índice); os demais valores pela sua representação textual.
+    """
+    resumo = hashlib.blake2b(digest_size=20)
+    for parte in partes:
+        if isinstance(parte, (pd.DataFrame, pd.Series)):
+            parte = pd.util.hash_pandas_object(parte, index=False).to_numpy()
+        if isinstance(parte, np.ndarray):
+            parte = np.ascontiguousarray(parte)
+            resumo.update(f"{parte.dtype.str}{parte.shape}".encode())
+            resumo.update(parte.view(np.uint8).ravel() if parte.size else b"")
+        else:
+            resumo.update(repr(parte).encode())
+        resumo.update(b"|")
+    return resumo.hexdigest()
+
+def tamanho_em_bytes(objeto) -> int:
+    """
+    Estima a memória ocupada por um objeto: arrays pelo 'nbytes', contêineres e objetos
+    comuns (via __dict__) somando as partes, e o restante por sys.getsizeof.
+    """
+    if isinstance(objeto, np.ndarray):
+        return objeto.nbytes
+    if isinstance(objeto, (pd.DataFrame, pd.Series)):
+        return int(np.sum(objeto.memory_usage(deep=True)))
+    if isinstance(objeto, dict):
+        return sys.getsizeof(objeto) + sum(tamanho_em_bytes(k) + tamanho_em_bytes(v) for k, v in objeto.items())
+    if isinstance(objeto, (list, tuple)):
+        return sys.getsizeof(objeto) + sum(tamanho_em_bytes(item) for item in objeto)
+    if hasattr(objeto, "__dict__"):
+        return sys.getsizeof(objeto) + tamanho_em_bytes(vars(objeto))
+    return sys.getsizeof(objeto)
+
+# --- Cache LRU ---
+
+class CacheLRU:
+    """
+    Cache em memória com despejo do item menos usado recentemente (LRU), limitado
+    pela quantidade de itens e pelo total de bytes estimado.
+
+    Os valores são devolvidos por referência: quem consulta não deve alterá-los.
+    Seguro para uso entre threads (o Streamlit atende cada sessão em uma thread).
+    """
+
+    def __init__(self, max_itens: int = MAX_ITENS_PADRAO, max_bytes: int = MAX_BYTES_PADRAO):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave, padrao=None):
+        """Devolve o valor da chave (marcando-o como usado) ou 'padrao' se não existir."""
+        with self._trava:
+            if chave not in self._itens:
+                self.falhas += 1
+                return padrao
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return self._itens[chave][0]
+
+    def guardar(self, chave, valor, tamanho: int = None):
+        """
+        Guarda o valor e despeja os itens mais antigos até respeitar os limites.
+        Um valor maior que 'max_bytes' sozinho não é guardado.
+        """
+        tamanho = tamanho_em_bytes(valor) if tamanho is None else tamanho
+        with self._trava:
+            if chave in self._itens:
+                self._bytes -= self._itens.pop(chave)[1]
+            if tamanho > self.max_bytes:
+                return
+            self._itens[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                _, (_, tamanho_despejado) = self._itens.popitem(last=False)
+                self._bytes -= tamanho_despejado
+
+    def obter_ou_calcular(self, chave, calcular):
+        """Devolve o valor em cache ou executa 'calcular()', guarda e devolve o resultado."""
+        valor = self.obter(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = calcular()
+            self.guardar(chave, valor)
+        return valor
+
+    def limpar(self):
+        """Remove todos os itens."""
+        with self._trava:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self) -> dict:
+        """Itens, bytes ocupados, acertos e falhas do cache."""
+        with self._trava:
+            return {"itens": len(self._itens), "bytes": self._bytes, "acertos": self.acertos, "falhas": self.falhas}
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __contains__(self, chave):
+        return chave in self._itens
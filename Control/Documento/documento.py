@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# --- Constantes dos Documentos ---
+# Tipos de pessoa, na ordem das categorias da coluna 'tipo_pessoa'.
+TIPOS_PESSOA = ('pf', 'pj')
+# Quantidade de dígitos de cada tipo (CPF e CNPJ).
+DIGITOS_POR_TIPO = {'pf': 11, 'pj': 14}
+# Pesos do primeiro e do segundo dígito verificador (módulo 11).
+PESOS_CPF = (np.arange(10, 1, -1), np.arange(11, 1, -1))
+PESOS_CNPJ = (np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]), np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]))
+
+_ZERO, _NOVE = ord('0'), ord('9')
+
+# --- Funções Auxiliares ---
+
+def digito_verificador(digitos: np.ndarray, pesos: np.ndarray) -> np.ndarray:
+    """Dígito verificador módulo 11 (CPF e CNPJ): 0 se o resto for 0 ou 1, senão 11 - resto."""
+    return (digitos @ pesos * 10 % 11) % 10
+
+def _buffers(documentos: pd.Series) -> tuple:
+    """
+    Bytes dos textos e posição de início de cada um, lidos direto dos buffers do Arrow
+    (sem cópia quando a coluna já é texto do pandas com pyarrow). Ausentes viram textos vazios.
+    """
+    if not isinstance(documentos.dtype, pd.StringDtype):
+        documentos = documentos.astype(pd.StringDtype("pyarrow"))
+    textos = pa.chunked_array(pa.array(documentos, from_pandas=True)).combine_chunks()
+    if pa.types.is_large_string(textos.type):
+        tipo_posicao = np.int64
+    elif pa.types.is_string(textos.type):
+        tipo_posicao = np.int32
+    else:
+        textos = textos.cast(pa.large_string())
+        tipo_posicao = np.int64
+    _, buffer_posicoes, buffer_dados = textos.buffers()
+    posicoes = np.frombuffer(buffer_posicoes, dtype=tipo_posicao)[textos.offset:textos.offset + len(textos) + 1]
+    dados = np.frombuffer(buffer_dados, dtype=np.uint8) if buffer_dados is not None else np.zeros(0, np.uint8)
+    posicoes = posicoes.astype(np.int64)
+    if textos.null_count:
+        # Um texto ausente pode apontar para bytes quaisquer: zera o seu tamanho.
+        ausentes = textos.is_null().to_numpy(zero_copy_only=False)
+        inicio = posicoes[:-1].copy()
+        fim = posicoes[1:].copy()
+        fim[ausentes] = inicio[ausentes]
+        return dados, inicio, fim
+    return dados, posicoes[:-1], posicoes[1:]
+
+def _digitos(documentos: pd.Series) -> tuple:
+    """
+    Dígitos de todos os documentos, ignorando pontuação e demais caracteres, em uma só
+    passada sobre os bytes.
+
+    Returns:
+        tuple: (dígitos de todos os textos em sequência, posição do primeiro dígito de cada
+            texto nessa sequência, quantidade de dígitos de cada texto).
+    """
+    dados, inicio, fim = _buffers(documentos)
+    primeiro, ultimo = (int(inicio.min()), int(fim.max())) if len(inicio) else (0, 0)
+    trecho = dados[primeiro:ultimo]
+    e_digito = (trecho >= _ZERO) & (trecho <= _NOVE)
+    # Dígitos acumulados antes de cada byte: a diferença entre o fim e o início de um texto é a sua contagem.
+    acumulado = np.zeros(len(trecho) + 1, dtype=np.int32 if len(trecho) < 2 ** 31 else np.int64)
+    np.cumsum(e_digito, out=acumulado[1:])
+    antes = acumulado[inicio - primeiro]
+    return trecho[e_digito] - np.uint8(_ZERO), antes, acumulado[fim - primeiro] - antes
+
+def _verificadores_validos(digitos: np.ndarray, pesos: tuple) -> np.ndarray:
+    """Confere os dois dígitos verificadores; documentos com todos os dígitos iguais são inválidos."""
+    n_raiz = len(pesos[0])
+    primeiro = digito_verificador(digitos[:, :n_raiz], pesos[0])
+    segundo = digito_verificador(digitos[:, :n_raiz + 1], pesos[1])
+    repetidos = (digitos == digitos[:, :1]).all(axis=1)
+    return (primeiro == digitos[:, n_raiz]) & (segundo == digitos[:, n_raiz + 1]) & ~repetidos
+
+# --- Classificação e Validação ---
+
+def analisar_documentos(documentos: pd.Series) -> pd.DataFrame:
+    """
+    Classifica e valida CPFs e CNPJs, com ou sem pontuação.
+
+    O tipo vem da quantidade de dígitos (11 = 'pf', 14 = 'pj'; os demais ficam ausentes)
+    e 'documento_valido' indica se os dígitos verificadores conferem.
+
+    Returns:
+        pd.DataFrame: Mesmo índice, com 'tipo_pessoa' (categórica) e 'documento_valido' (bool).
+    """
+    digitos, antes, contagem = _digitos(documentos)
+    codigos = np.full(len(contagem), -1, dtype=np.int8)
+    valido = np.zeros(len(contagem), dtype=bool)
+    for codigo, (tipo, pesos) in enumerate(zip(TIPOS_PESSOA, (PESOS_CPF, PESOS_CNPJ))):
+        linhas = np.flatnonzero(contagem == DIGITOS_POR_TIPO[tipo])
+        codigos[linhas] = codigo
+        # Matriz (documentos x dígitos) do tipo, lida da sequência a partir do primeiro dígito de cada um.
+        matriz = digitos.take(antes[linhas][:, None] + np.arange(DIGITOS_POR_TIPO[tipo])).astype(np.int64)
+        valido[linhas] = _verificadores_validos(matriz, pesos)
+    return pd.DataFrame({
+        'tipo_pessoa': pd.Categorical.from_codes(codigos, categories=list(TIPOS_PESSOA)),
+        'documento_valido': valido,
+    }, index=documentos.index)
+
+def classificar_tipo_pessoa(documentos: pd.Series, somente_validos: bool = False) -> pd.Series:
+    """
+    Classifica cada documento como 'pf' (CPF) ou 'pj' (CNPJ) pela quantidade de dígitos;
+    os demais ficam ausentes. Com 'somente_validos', documentos com dígito verificador
+    errado também ficam ausentes.
+    """
+    if somente_validos:
+        analise = analisar_documentos(documentos)
+        return analise['tipo_pessoa'].where(analise['documento_valido']).rename('tipo_pessoa')
+    _, _, contagem = _digitos(documentos)
+    codigos = np.full(len(contagem), -1, dtype=np.int8)
+    for codigo, tipo in enumerate(TIPOS_PESSOA):
+        codigos[contagem == DIGITOS_POR_TIPO[tipo]] = codigo
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=list(TIPOS_PESSOA)),
+                     index=documentos.index, name='tipo_pessoa')
+
+def tipo_pessoa(df_prospects: pd.DataFrame) -> pd.Series:
+    """
+    Coluna 'tipo_pessoa' da carteira: reaproveita a que já foi calculada por
+    anotar_tipo_pessoa (categórica 'pf'/'pj') e só classifica os documentos se ela não existir.
+    """
+    coluna = df_prospects.get('tipo_pessoa')
+    if isinstance(coluna, pd.Series) and isinstance(coluna.dtype, pd.CategoricalDtype) \
+            and tuple(coluna.cat.categories) == TIPOS_PESSOA:
+        return coluna
+    return classificar_tipo_pessoa(df_prospects['documento'])
+
+def anotar_tipo_pessoa(df_prospects: pd.DataFrame) -> pd.DataFrame:
+    """Grava (no próprio DataFrame) a coluna categórica 'tipo_pessoa', usada pelas etapas seguintes."""
+    df_prospects['tipo_pessoa'] = tipo_pessoa(df_prospects)
+    return df_prospects
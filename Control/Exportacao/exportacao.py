@@ -0,0 +1,142 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes da Exportação ---
+# Extensão de cada formato suportado.
+FORMATOS = {"parquet": ".parquet", "arrow": ".arrow"}
+COMPRESSAO_PADRAO = "zstd"
+# Exportações aguardando a thread de gravação; com a fila cheia, quem exporta espera.
+FILA_MAXIMA = 8
+
+# --- Exportador ---
+
+class ExportadorAssincrono:
+    """
+    Grava DataFrames intermediários (carteira pontuada, matriz do PCA, ...) em Parquet ou
+    Arrow IPC comprimidos, em uma thread de fundo: quem exporta só enfileira o DataFrame
+    e segue, sem esperar o disco.
+
+    Cada exportação recebe um nome único (nome, data e hora, processo e um sufixo
+    aleatório), então sessões simultâneas não sobrescrevem os arquivos umas das outras.
+    O arquivo é gravado com um nome temporário e renomeado ao final, para que nunca seja
+    lido pela metade.
+    """
+
+    def __init__(self, diretorio: str, formato: str = "parquet", compressao: str = COMPRESSAO_PADRAO,
+                 fila_maxima: int = FILA_MAXIMA):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de exportação não suportado: {formato} (use {', '.join(FORMATOS)}).")
+        os.makedirs(diretorio, exist_ok=True)
+        self.diretorio = diretorio
+        self.formato = formato
+        self.compressao = compressao
+        self.gravados = []
+        self.erros = []
+        self._fila = queue.Queue(maxsize=fila_maxima)
+        self._thread = threading.Thread(target=self._gravar_fila, name="exportador-zoro", daemon=True)
+        self._thread.start()
+
+    def caminho_unico(self, nome: str) -> str:
+        """Caminho de saída único para uma exportação de 'nome'."""
+        carimbo = time.strftime("%Y%m%d_%H%M%S")
+        return os.path.join(self.diretorio, f"{nome}_{carimbo}_{os.getpid()}_{uuid.uuid4().hex[:8]}{FORMATOS[self.formato]}")
+
+    def exportar(self, nome: str, df: pd.DataFrame) -> str:
+        """
+        Enfileira a gravação de 'df' e devolve o caminho do arquivo (que existe quando a
+        gravação termina; ver aguardar). O DataFrame é copiado de forma rasa: com o
+        Copy-on-Write do pandas, alterações feitas depois pelo chamador não chegam ao arquivo.
+        """
+        caminho = self.caminho_unico(nome)
+        self._fila.put((caminho, df.copy(deep=False)))
+        return caminho
+
+    def aguardar(self):
+        """Bloqueia até que todas as exportações enfileiradas tenham sido gravadas."""
+        self._fila.join()
+
+    def fechar(self):
+        """Grava o que estiver pendente e encerra a thread."""
+        if self._thread.is_alive():
+            self._fila.put(None)
+            self._thread.join()
+
+    def _gravar(self, caminho: str, df: pd.DataFrame):
+        tabela = pa.Table.from_pandas(df)
+        temporario = f"{caminho}.parcial"
+        if self.formato == "parquet":
+            pq.write_table(tabela, temporario, compression=self.compressao)
+        else:
+            opcoes = pa.ipc.IpcWriteOptions(compression=self.compressao)
+            with pa.OSFile(temporario, "wb") as arquivo, pa.ipc.new_file(arquivo, tabela.schema, options=opcoes) as escritor:
+                escritor.write_table(tabela)
+        os.replace(temporario, caminho)
+
+    def _gravar_fila(self):
+        while True:
+            item = self._fila.get()
+            try:
+                if item is None:
+                    return
+                caminho, df = item
+                try:
+                    self._gravar(caminho, df)
+                    self.gravados.append(caminho)
+                except Exception as erro:
+                    self.erros.append((caminho, erro))
+                    logger.warning("Falha ao exportar '%s': %s", caminho, erro)
+            finally:
+                self._fila.task_done()
+
+# --- Exportador Padrão ---
+# Desligado até configurar_exportacao ser chamada; as etapas do pipeline chamam exportar()
+# sem saber se há (ou qual é) o destino.
+
+_exportador = None
+_trava = threading.Lock()
+
+def configurar_exportacao(diretorio: str, formato: str = "parquet",
+                          compressao: str = COMPRESSAO_PADRAO) -> ExportadorAssincrono:
+    """Liga a exportação (substituindo a configuração anterior, depois de gravar o que estava pendente)."""
+    global _exportador
+    with _trava:
+        anterior, _exportador = _exportador, ExportadorAssincrono(diretorio, formato, compressao)
+    if anterior is not None:
+        anterior.fechar()
+    return _exportador
+
+def desativar_exportacao():
+    """Desliga a exportação, gravando antes o que estiver pendente."""
+    global _exportador
+    with _trava:
+        anterior, _exportador = _exportador, None
+    if anterior is not None:
+        anterior.fechar()
+
+def exportador_atual():
+    """O exportador configurado, ou None se a exportação estiver desligada."""
+    return _exportador
+
+def exportar(nome: str, df: pd.DataFrame):
+    """
+    Exporta 'df' em segundo plano se a exportação estiver ligada.
+
+    Returns:
+        str | None: O caminho do arquivo, ou None com a exportação desligada.
+    """
+    exportador = _exportador
+    return exportador.exportar(nome, df) if exportador is not None else None
+
+# Exportações pendentes são gravadas antes de o processo terminar.
+atexit.register(desativar_exportacao)
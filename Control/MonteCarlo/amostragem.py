@@ -0,0 +1,138 @@
+import numpy as np
+from scipy.optimize import brentq
+from scipy.special import expit, logit
+from scipy.stats import norm
+
+# --- Esquemas de Amostragem Disponíveis ---
+# 'simples'     : uniformes independentes (Monte Carlo padrão).
+# 'antitetica'  : metade do bloco usa U e a outra metade 1 - U.
+# 'lhs'         : hipercubo latino; em cada bloco, cada prospect recebe exatamente um
+#                 sorteio em cada um dos estratos [k/b, (k+1)/b).
+# 'importancia' : probabilidades inclinadas para cenários de baixa recuperação, com
+#                 pesos de verossimilhança que corrigem os quantis da cauda inferior
+#                 (média, desvio e quantis superiores vêm dos momentos exatos).
+AMOSTRAGENS = ("simples", "antitetica", "lhs", "importancia")
+# Quantil que a amostragem por importância mira (o cenário pessimista do app).
+QUANTIL_ALVO_IMPORTANCIA = 0.05
+
+# --- Sorteio das Uniformes ---
+
+def sortear_uniformes(rng: np.random.Generator, sorteios: np.ndarray, amostragem: str = "simples"):
+    """
+    Preenche o buffer 'sorteios' (cenários x prospects) com uniformes segundo o esquema escolhido.
+    Na amostragem por importância as uniformes são simples; a inclinação está nas probabilidades.
+    """
+    if amostragem in ("simples", "importancia"):
+        rng.random(out=sorteios)
+    elif amostragem == "antitetica":
+        metade = len(sorteios) // 2
+        rng.random(out=sorteios[:metade])
+        np.subtract(1.0, sorteios[:metade], out=sorteios[metade:2 * metade])
+        if len(sorteios) % 2:
+            rng.random(out=sorteios[2 * metade:])
+    elif amostragem == "lhs":
+        n_cenarios = len(sorteios)
+        estratos = rng.permuted(np.broadcast_to(np.arange(n_cenarios, dtype=np.float64)[:, None], sorteios.shape), axis=0)
+        rng.random(out=sorteios)
+        sorteios += estratos
+        sorteios /= n_cenarios
+    else:
+        raise ValueError(f"Amostragem desconhecida: '{amostragem}'. Use uma de {AMOSTRAGENS}.")
+
+# --- Amostragem por Importância ---
+
+def calcular_inclinacao(probabilidades: np.ndarray, valores: np.ndarray, media: float, desvio: float,
+                        quantil_alvo: float = QUANTIL_ALVO_IMPORTANCIA) -> tuple:
+    """
+    Inclinação exponencial da distribuição da recuperação S em direção à cauda inferior.
+
+    Sob a medida inclinada Q (proporcional a P * exp(t * S), com t < 0), cada prospect
+    paga com probabilidade expit(logit(p) + t * v). O parâmetro t é escolhido para que
+    a média sob Q fique no quantil alvo da aproximação normal.
+
+    Returns:
+        tuple: (t, K(t), probabilidades inclinadas), onde K é a função geradora de
+            cumulantes de S sob P.
+    """
+    p = np.clip(probabilidades, 1e-12, 1 - 1e-12)
+    logito = logit(p)
+    alvo = media + desvio * norm.ppf(quantil_alvo)
+
+    def media_inclinada(t):
+        return np.sum(valores * expit(logito + t * valores)) - alvo
+
+    limite = 1.0 / max(desvio, np.finfo(float).tiny)
+    while media_inclinada(-limite) > 0:
+        limite *= 2
+    t = brentq(media_inclinada, -limite, 0.0) if media_inclinada(0.0) > 0 else 0.0
+    cumulante = float(np.sum(np.logaddexp(np.log1p(-p), np.log(p) + t * valores)))
+    return t, cumulante, expit(logito + t * valores)
+
+def pesos_importancia(resultados: np.ndarray, t: float, cumulante: float) -> np.ndarray:
+    """Razão de verossimilhança dP/dQ = exp(-t * S + K(t)) de cada cenário."""
+    return np.exp(-t * resultados + cumulante)
+
+# --- Diagnóstico ---
+
+def tamanho_efetivo_por_blocos(momentos_blocos: list, variancia_referencia: float):
+    """
+    Tamanho amostral efetivo estimado pelas médias dos blocos.
+
+    Cada bloco é uma réplica independente do esquema de amostragem, então a dispersão
+    das médias dos blocos estima a variância do estimador da média. O tamanho efetivo
+    é quantos cenários simples dariam a mesma variância: variancia_referencia / variância.
+    Retorna None com menos de dois blocos.
+    """
+    if len(momentos_blocos) < 2:
+        return None
+    pesos = np.array([momento[1] for momento in momentos_blocos])
+    medias = np.array([momento[3] for momento in momentos_blocos])
+    fracoes = pesos / pesos.sum()
+    media = np.sum(fracoes * medias)
+    variancia_media = len(medias) / (len(medias) - 1) * np.sum(fracoes ** 2 * (medias - media) ** 2)
+    if variancia_media == 0:
+        return np.inf
+    return float(variancia_referencia / variancia_media)
+
+def tamanho_efetivo_antitetico(momentos_pares: list, variancia_referencia: float):
+    """
+    Tamanho amostral efetivo da amostragem antitética pela variância dos pares.
+
+    Cada par (X + X') / 2 é uma réplica independente; com m pares, a média estimada tem
+    variância Var_par / m, e o tamanho efetivo é variancia_referencia * m / Var_par.
+    'momentos_pares' são os momentos (momentos_bloco) das médias dos pares de cada bloco,
+    juntados aqui em uma única variância. Retorna None com menos de dois pares.
+    """
+    contagens = np.array([momento[0] for momento in momentos_pares], dtype=np.float64)
+    total = contagens.sum()
+    if total < 2:
+        return None
+    medias = np.array([momento[3] for momento in momentos_pares])
+    m2 = np.array([momento[4] for momento in momentos_pares])
+    media = np.sum(contagens * medias) / total
+    variancia_par = (np.sum(m2) + np.sum(contagens * (medias - media) ** 2)) / (total - 1)
+    if variancia_par == 0:
+        return np.inf
+    return float(variancia_referencia * total / variancia_par)
+
+def tamanho_efetivo_quantil_por_blocos(quantis_blocos: list, q: float, densidade: float):
+    """
+    Tamanho amostral efetivo no quantil q estimado pelos quantis de cada bloco.
+
+    Com n cenários simples, o quantil amostral tem variância q(1-q) / (n f²), em que f é
+    a densidade no quantil. Cada bloco é uma réplica independente do esquema, então a
+    dispersão dos quantis dos blocos (ponderada por n_b, já que a variância cai com 1/n_b)
+    estima c = n_b * Var(quantil do bloco); o tamanho efetivo é N q(1-q) / (f² c).
+    'quantis_blocos' são pares (cenários, quantil) por bloco. Retorna None com menos de
+    dois blocos.
+    """
+    if len(quantis_blocos) < 2:
+        return None
+    tamanhos = np.array([tamanho for tamanho, _ in quantis_blocos], dtype=np.float64)
+    quantis = np.array([quantil for _, quantil in quantis_blocos], dtype=np.float64)
+    total = tamanhos.sum()
+    media = np.sum(tamanhos * quantis) / total
+    dispersao = np.sum(tamanhos * (quantis - media) ** 2) / (len(quantis) - 1)
+    if dispersao == 0 or not np.isfinite(densidade):
+        return np.inf
+    return float(total * q * (1 - q) / (densidade ** 2 * dispersao))
@@ -0,0 +1,234 @@
+import numpy as np
+from scipy.optimize import brentq
+from scipy.special import expit, logit
+from scipy.stats import norm
+
+# --- Constantes do Modo Analítico ---
+# Constante de Berry–Esseen para somas de variáveis independentes não idênticas (Shevtsova, 2010).
+CONSTANTE_BERRY_ESSEEN = 0.56
+# Pontos da grade usada na convolução via FFT.
+PONTOS_GRADE_FFT = 16384
+# Largura da janela da FFT, em desvios padrão ao redor da média.
+LARGURA_JANELA_DESVIOS = 20
+# Acima deste custo (prospects x pontos da grade) o modo 'auto' troca a FFT pelo ponto de sela.
+MAX_CUSTO_FFT = 20_000_000
+# Prospects processados por vez no produto da função característica.
+PROSPECTS_POR_LOTE_FFT = 64
+
+# --- Funções Auxiliares (Lógica Interna) ---
+
+def momentos_carteira(probabilidades: np.ndarray, valores: np.ndarray) -> tuple:
+    """Média e desvio padrão exatos da soma ponderada de Bernoullis independentes."""
+    media = float(np.sum(probabilidades * valores))
+    variancia = float(np.sum(probabilidades * (1 - probabilidades) * valores ** 2))
+    return media, float(np.sqrt(variancia))
+
+def _limite_berry_esseen(probabilidades: np.ndarray, valores: np.ndarray, desvio: float) -> float:
+    """
+    Distância máxima entre a função de distribuição da soma e a normal com os mesmos
+    momentos: C * sum E|X_i - E[X_i]|^3 / desvio^3.
+    """
+    p = probabilidades
+    terceiro_momento = np.sum(np.abs(valores) ** 3 * p * (1 - p) * (p ** 2 + (1 - p) ** 2))
+    return CONSTANTE_BERRY_ESSEEN * terceiro_momento / desvio ** 3
+
+def _erro_quantil_normal(media: float, desvio: float, nivel: float, epsilon: float) -> float:
+    """
+    Converte o limite de Berry–Esseen (em probabilidade) em um limite no valor do
+    quantil: a maior distância entre o quantil normal em 'nivel' e em 'nivel ± epsilon'.
+    """
+    if nivel - epsilon <= 0 or nivel + epsilon >= 1:
+        return np.inf
+    centro = norm.ppf(nivel)
+    return desvio * max(centro - norm.ppf(nivel - epsilon), norm.ppf(nivel + epsilon) - centro)
+
+def _quantis_normal(media: float, desvio: float, niveis: tuple) -> list:
+    """Quantis pela aproximação normal."""
+    return [media + desvio * norm.ppf(nivel) for nivel in niveis]
+
+def _quantis_ponto_sela(probabilidades: np.ndarray, valores: np.ndarray, media: float,
+                        desvio: float, niveis: tuple) -> list:
+    """
+    Quantis pela aproximação de ponto de sela (Lugannani–Rice).
+
+    Trabalha na escala padronizada (valores / desvio) para manter a função geradora
+    de cumulantes numericamente estável.
+    """
+    u = valores / desvio
+    log_p = np.log(probabilidades)
+    log_q = np.log1p(-probabilidades)
+    logito = logit(probabilidades)
+
+    def cumulantes(s):
+        k = np.sum(np.logaddexp(log_q, log_p + s * u))
+        w = expit(logito + s * u)
+        return k, np.sum(u * w), np.sum(u ** 2 * w * (1 - w))
+
+    def distribuicao(s):
+        k, k1, k2 = cumulantes(s)
+        if abs(s) < 1e-6:
+            return norm.cdf((k1 - media / desvio) / np.sqrt(k2))
+        w_hat = np.sign(s) * np.sqrt(max(2 * (s * k1 - k), 0.0))
+        u_hat = s * np.sqrt(k2)
+        if abs(w_hat) < 1e-8:
+            return norm.cdf(w_hat)
+        return norm.cdf(w_hat) + norm.pdf(w_hat) * (1 / w_hat - 1 / u_hat)
+
+    quantis = []
+    # Em carteiras pequenas a cauda satura (k2 -> 0) antes de alcançar o nível; a divisão
+    # por zero vira NaN aqui e a falha sobe como ValueError para o chamador.
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for nivel in niveis:
+            limite = 1.0
+            while distribuicao(-limite) > nivel or distribuicao(limite) < nivel:
+                limite *= 2
+                if limite > 1e4:
+                    raise ValueError(f"Não foi possível localizar o ponto de sela para o quantil {nivel}.")
+            s = brentq(lambda s: distribuicao(s) - nivel, -limite, limite, xtol=1e-10)
+            quantis.append(cumulantes(s)[1] * desvio)
+    if not np.all(np.isfinite(quantis)):
+        raise ValueError("O ponto de sela não convergiu para um quantil finito.")
+    return quantis
+
+def _densidade_normal(media: float, desvio: float, total: float, n_pontos: int) -> dict:
+    """
+    Densidade da aproximação normal com os momentos exatos, como massa por ponto de uma
+    grade na mesma janela da FFT (LARGURA_JANELA_DESVIOS ao redor da média, limitada a
+    [0, total]). Usada pelos métodos sem grade própria ('normal' e 'sela').
+    """
+    inicio_janela = max(0.0, media - LARGURA_JANELA_DESVIOS / 2 * desvio)
+    fim_janela = min(total, media + LARGURA_JANELA_DESVIOS / 2 * desvio)
+    grade = np.linspace(inicio_janela, fim_janela, n_pontos)
+    massa = norm.pdf(grade, loc=media, scale=desvio)
+    massa /= massa.sum()
+    return {"valores": grade, "probabilidades": massa}
+
+def _distribuicao_fft(probabilidades: np.ndarray, valores: np.ndarray, media: float,
+                      desvio: float, niveis: tuple, n_pontos: int) -> dict:
+    """
+    Distribuição da soma por convolução exata via FFT sobre os valores discretizados.
+
+    Cada dívida é arredondada para um múltiplo inteiro do passo 'h' da grade. A função
+    característica da soma (produto das funções de cada Bernoulli) é avaliada nas
+    raízes da unidade e a FFT inversa devolve a massa de probabilidade em cada ponto.
+    A janela cobre LARGURA_JANELA_DESVIOS desvios ao redor da média; a massa fora
+    dela é desprezível e se dobra sobre a grade (aliasing).
+    """
+    total = float(np.sum(valores))
+    inicio_janela = max(0.0, media - LARGURA_JANELA_DESVIOS / 2 * desvio)
+    fim_janela = min(total, media + LARGURA_JANELA_DESVIOS / 2 * desvio)
+    # Quando a janela alcança o total, o arredondamento pode empurrar a soma de todas as
+    # dívidas até meio passo por prospect além dele; a folga evita que essa massa dê a
+    # volta na grade circular (só pesa em carteiras pequenas).
+    folga = min(len(valores), n_pontos // 2) // 2 + 1 if fim_janela >= total else 0
+    passo = max(fim_janela - inicio_janela, desvio) / (n_pontos - 1 - folga)
+
+    unidades = np.rint(valores / passo).astype(np.int64)
+    erros_arredondamento = unidades * passo - valores
+
+    # Função característica avaliada nas n_pontos raízes da unidade.
+    raizes = np.exp(-2j * np.pi * np.arange(n_pontos) / n_pontos)
+    frequencias = np.arange(n_pontos, dtype=np.int64)
+    caracteristica = np.ones(n_pontos, dtype=np.complex128)
+    for inicio in range(0, len(probabilidades), PROSPECTS_POR_LOTE_FFT):
+        p = probabilidades[inicio:inicio + PROSPECTS_POR_LOTE_FFT, None]
+        k = unidades[inicio:inicio + PROSPECTS_POR_LOTE_FFT, None] % n_pontos
+        caracteristica *= np.prod(1 - p + p * raizes[(k * frequencias) % n_pontos], axis=0)
+
+    massa = np.clip(np.fft.ifft(caracteristica).real, 0, None)
+    massa /= massa.sum()
+
+    # Reordena a grade circular para começar no início da janela.
+    unidade_inicial = int(np.floor(inicio_janela / passo))
+    massa = np.roll(massa, -(unidade_inicial % n_pontos))
+    # Corrige o deslocamento da média introduzido pelo arredondamento.
+    deslocamento = float(np.sum(probabilidades * erros_arredondamento))
+    grade = (unidade_inicial + np.arange(n_pontos)) * passo - deslocamento
+
+    acumulada = np.cumsum(massa)
+    quantis = [grade[min(np.searchsorted(acumulada, nivel), n_pontos - 1)] for nivel in niveis]
+
+    # Erro restante: dispersão do arredondamento (3 desvios) mais um passo da grade.
+    desvio_arredondamento = np.sqrt(np.sum(probabilidades * (1 - probabilidades) * erros_arredondamento ** 2))
+    erro = 3 * desvio_arredondamento + passo
+
+    return {
+        "quantis": quantis,
+        "erros": [erro] * len(niveis),
+        "grade": grade,
+        "massa": massa,
+    }
+
+# --- Função Principal do Modo Analítico ---
+
+def distribuicao_recuperacao(probabilidades: np.ndarray, valores: np.ndarray, metodo: str = "auto",
+                             n_pontos: int = PONTOS_GRADE_FFT) -> dict:
+    """
+    Calcula a distribuição do valor recuperado sem simulação.
+
+    O total recuperado é uma soma ponderada de Bernoullis independentes: a média e o
+    desvio padrão são exatos, e os percentis 5 e 95 vêm de um dos métodos abaixo.
+
+    Args:
+        probabilidades (np.ndarray): Probabilidade de pagamento de cada prospect.
+        valores (np.ndarray): Valor (R$) da dívida de cada prospect.
+        metodo (str): 'fft' (convolução exata sobre valores discretizados), 'normal',
+            'sela' (ponto de sela de Lugannani–Rice) ou 'auto', que usa a FFT quando
+            o custo prospects x pontos cabe em MAX_CUSTO_FFT e o ponto de sela caso contrário.
+        n_pontos (int): Pontos da grade da FFT.
+
+    Returns:
+        dict: Média, desvio padrão, percentis 5 e 95 e o erro estimado de cada percentil.
+            Para 'normal' e 'sela' o erro vem do limite de Berry–Esseen (rigoroso para a
+            normal e conservador para o ponto de sela); para 'fft' é o erro de discretização.
+            Inclui ainda a 'densidade' (grade de valores e probabilidades): a massa da FFT
+            ou, para 'normal' e 'sela', a normal com os momentos exatos. Se o ponto de sela
+            não converge (carteiras muito pequenas), o resultado vem da FFT e 'metodo' indica isso.
+    """
+    probabilidades = np.clip(np.asarray(probabilidades, dtype=np.float64), 0.0, 1.0)
+    valores = np.asarray(valores, dtype=np.float64)
+    niveis = (0.05, 0.95)
+
+    if metodo == "auto":
+        metodo = "fft" if len(probabilidades) * n_pontos <= MAX_CUSTO_FFT else "sela"
+    if metodo not in ("fft", "normal", "sela"):
+        raise ValueError(f"Método analítico desconhecido: '{metodo}'.")
+
+    media, desvio = momentos_carteira(probabilidades, valores)
+    densidade = None
+
+    if desvio == 0:
+        quantis, erros = [media, media], [0.0, 0.0]
+    elif metodo == "fft":
+        distribuicao = _distribuicao_fft(probabilidades, valores, media, desvio, niveis, n_pontos)
+        quantis, erros = distribuicao["quantis"], distribuicao["erros"]
+        densidade = {"valores": distribuicao["grade"], "probabilidades": distribuicao["massa"]}
+    else:
+        # Evita log(0) no ponto de sela; não altera os momentos de forma perceptível.
+        probabilidades_sela = np.clip(probabilidades, 1e-12, 1 - 1e-12)
+        try:
+            quantis = (_quantis_ponto_sela(probabilidades_sela, valores, media, desvio, niveis)
+                       if metodo == "sela" else _quantis_normal(media, desvio, niveis))
+        except ValueError:
+            # Só acontece em carteiras pequenas, em que a FFT é exata e barata.
+            metodo = "fft"
+        if metodo == "fft":
+            distribuicao = _distribuicao_fft(probabilidades, valores, media, desvio, niveis, n_pontos)
+            quantis, erros = distribuicao["quantis"], distribuicao["erros"]
+            densidade = {"valores": distribuicao["grade"], "probabilidades": distribuicao["massa"]}
+        else:
+            epsilon = _limite_berry_esseen(probabilidades, valores, desvio)
+            erros = [_erro_quantil_normal(media, desvio, nivel, epsilon) for nivel in niveis]
+            densidade = _densidade_normal(media, desvio, float(np.sum(valores)), n_pontos)
+
+    return {
+        "modo": "analitico",
+        "metodo": metodo,
+        "media_recuperacao": media,
+        "desvio_padrao": desvio,
+        "percentil_5": float(quantis[0]),
+        "percentil_95": float(quantis[1]),
+        "erro_percentil_5": float(erros[0]),
+        "erro_percentil_95": float(erros[1]),
+        "densidade": densidade,
+    }
@@ -0,0 +1,271 @@
+import numpy as np
+from scipy.stats import norm
+
+from Control.MonteCarlo.analitico import momentos_carteira
+
+# --- Constantes do Acumulador ---
+# Bins do histograma fino usado como sketch de quantis. O erro de um quantil é de no
+# máximo a largura de um bin (largura da faixa / BINS_SKETCH).
+BINS_SKETCH = 16384
+# Bins do histograma enviado para a interface.
+BINS_HISTOGRAMA = 50
+# Faixa do sketch, em desvios padrão ao redor da média analítica da carteira.
+DESVIOS_FAIXA_SKETCH = 8
+
+class AcumuladorSimulacao:
+    """
+    Acumula os resultados da simulação sem guardar as amostras.
+
+    Mantém média e variância pelo algoritmo de Welford (com a fórmula de Chan para
+    juntar blocos), mínimo e máximo, e um histograma fino de faixa fixa que serve de
+    sketch de quantis. Todas as partes podem ser mescladas, então blocos simulados em
+    processos diferentes se juntam sem perda.
+
+    Cada amostra pode ter um peso; sem pesos, todas valem 1. Quando os pesos são razões
+    de verossimilhança (amostragem por importância, 'razao_verossimilhanca'), cuja média
+    é 1, os quantis usam o estimador não normalizado da função de distribuição, bem
+    menos ruidoso na cauda para a qual a amostragem foi inclinada.
+
+    A inclinação leva quase todos os cenários para a cauda inferior: a média ponderada e
+    os quantis superiores passam a depender de poucos cenários de peso enorme. Por isso,
+    com 'momentos_exatos' (média e desvio da carteira), média e desvio vêm deles, só os
+    quantis até a mediana usam os pesos e os acima dela vêm da aproximação normal com os
+    momentos exatos (sem 'momentos_exatos', esses quantis ficam NaN).
+    """
+
+    def __init__(self, limite_inferior: float, limite_superior: float, n_bins: int = BINS_SKETCH):
+        if not limite_superior > limite_inferior:
+            limite_superior = limite_inferior + 1.0
+        self.limite_inferior = float(limite_inferior)
+        self.limite_superior = float(limite_superior)
+        self.n = 0
+        self.peso_total = 0.0
+        self.peso_quadrado_total = 0.0
+        self.media_amostral = 0.0
+        self.m2 = 0.0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        # Posições 0 e -1 guardam o que cai abaixo e acima da faixa.
+        self.contagens = np.zeros(n_bins + 2, dtype=np.float64)
+        # Soma dos pesos ao quadrado por bin, para o tamanho efetivo dos quantis.
+        self.contagens_quadrado = np.zeros(n_bins + 2, dtype=np.float64)
+        self.razao_verossimilhanca = False
+        # (média, desvio) exatos da carteira, usados no lugar dos amostrais (ver acima).
+        self.momentos_exatos = None
+        # Preenchido pelo modo adaptativo (cenários usados, precisão atingida).
+        self.diagnostico = None
+
+    # --- Atualização ---
+
+    @staticmethod
+    def momentos_bloco(amostras: np.ndarray, pesos: np.ndarray = None) -> tuple:
+        """Resumo (n, soma dos pesos, soma dos pesos², média, M2, mínimo, máximo) de um bloco."""
+        amostras = np.asarray(amostras, dtype=np.float64)
+        if amostras.size == 0:
+            return 0, 0.0, 0.0, 0.0, 0.0, np.inf, -np.inf
+        if pesos is None:
+            media = float(amostras.mean())
+            m2 = float(np.sum((amostras - media) ** 2))
+            return amostras.size, float(amostras.size), float(amostras.size), media, m2, float(amostras.min()), float(amostras.max())
+        peso = float(np.sum(pesos))
+        media = float(np.sum(pesos * amostras) / peso)
+        m2 = float(np.sum(pesos * (amostras - media) ** 2))
+        return amostras.size, peso, float(np.sum(pesos ** 2)), media, m2, float(amostras.min()), float(amostras.max())
+
+    def mesclar_momentos(self, n: int, peso: float, peso_quadrado: float, media: float, m2: float,
+                         minimo: float, maximo: float):
+        """Junta o resumo de um bloco aos momentos acumulados (fórmula de Chan, ponderada)."""
+        if n == 0:
+            return
+        total = self.peso_total + peso
+        delta = media - self.media_amostral
+        self.media_amostral += delta * peso / total
+        self.m2 += m2 + delta ** 2 * self.peso_total * peso / total
+        self.n += n
+        self.peso_total = total
+        self.peso_quadrado_total += peso_quadrado
+        self.minimo = min(self.minimo, minimo)
+        self.maximo = max(self.maximo, maximo)
+
+    def contar(self, amostras: np.ndarray, pesos: np.ndarray = None):
+        """Adiciona as amostras (e seus pesos) ao histograma fino (sketch de quantis)."""
+        n_bins = len(self.contagens) - 2
+        largura = (self.limite_superior - self.limite_inferior) / n_bins
+        posicoes = np.floor((np.asarray(amostras, dtype=np.float64) - self.limite_inferior) / largura)
+        posicoes = np.clip(posicoes, -1, n_bins).astype(np.int64) + 1
+        contagens = np.bincount(posicoes, weights=pesos, minlength=len(self.contagens))
+        self.contagens += contagens
+        self.contagens_quadrado += contagens if pesos is None else \
+            np.bincount(posicoes, weights=pesos ** 2, minlength=len(self.contagens))
+
+    def somar_histograma(self, outro: "AcumuladorSimulacao"):
+        """Soma ao sketch as contagens de outro acumulador com a mesma faixa."""
+        if (outro.limite_inferior, outro.limite_superior, len(outro.contagens)) != \
+                (self.limite_inferior, self.limite_superior, len(self.contagens)):
+            raise ValueError("Só é possível mesclar acumuladores com a mesma faixa e os mesmos bins.")
+        self.contagens += outro.contagens
+        self.contagens_quadrado += outro.contagens_quadrado
+
+    def atualizar(self, amostras: np.ndarray, pesos: np.ndarray = None):
+        """Incorpora um bloco de amostras, opcionalmente ponderadas."""
+        self.mesclar_momentos(*self.momentos_bloco(amostras, pesos))
+        self.contar(amostras, pesos)
+
+    def mesclar(self, outro: "AcumuladorSimulacao"):
+        """Incorpora outro acumulador com a mesma faixa e o mesmo número de bins."""
+        self.somar_histograma(outro)
+        self.mesclar_momentos(outro.n, outro.peso_total, outro.peso_quadrado_total,
+                              outro.media_amostral, outro.m2, outro.minimo, outro.maximo)
+
+    # --- Consulta ---
+
+    @property
+    def media(self) -> float:
+        """Média do valor recuperado: a exata, se houver 'momentos_exatos', senão a amostral."""
+        if self.momentos_exatos is not None:
+            return float(self.momentos_exatos[0])
+        return self.media_amostral
+
+    @property
+    def desvio_padrao(self) -> float:
+        """Desvio padrão (o exato, se houver 'momentos_exatos'; senão o populacional, como np.std)."""
+        if self.momentos_exatos is not None:
+            return float(self.momentos_exatos[1])
+        return float(np.sqrt(self.m2 / self.peso_total)) if self.n else 0.0
+
+    @property
+    def tamanho_amostral_efetivo(self) -> float:
+        """Tamanho amostral efetivo de Kish, (soma dos pesos)² / soma dos pesos². Sem pesos, é n."""
+        return self.peso_total ** 2 / self.peso_quadrado_total if self.n else 0.0
+
+    def tamanho_amostral_efetivo_quantil(self, q: float) -> float:
+        """
+        Tamanho amostral efetivo na estimativa do quantil q: quantos cenários simples
+        dariam a mesma variância para a função de distribuição no ponto do quantil,
+        q(1-q) / Var(w * 1{S <= x_q}). Sem razão de verossimilhança, é n.
+        """
+        if not self.razao_verossimilhanca or self.n == 0:
+            return float(self.n)
+        indice = int(np.searchsorted(self._bordas(), self.quantil(q)))
+        if q > 0.5:
+            segundo_momento = np.sum(self.contagens_quadrado[indice + 1:]) / self.n
+            fracao = np.sum(self.contagens[indice + 1:]) / self.n
+        else:
+            segundo_momento = np.sum(self.contagens_quadrado[:indice + 1]) / self.n
+            fracao = np.sum(self.contagens[:indice + 1]) / self.n
+        variancia = segundo_momento - fracao ** 2
+        return float(self.n * q * (1 - q) / variancia) if variancia > 0 else np.inf
+
+    def _bordas(self) -> np.ndarray:
+        """Bordas dos bins internos do sketch."""
+        return np.linspace(self.limite_inferior, self.limite_superior, len(self.contagens) - 1)
+
+    def quantil(self, q: float) -> float:
+        """
+        Quantil q (entre 0 e 1) estimado pelo sketch, com interpolação linear dentro
+        do bin. Quantis que caem fora da faixa são limitados pelo mínimo/máximo observado.
+        """
+        return float(self.quantis([q])[0])
+
+    def quantis(self, niveis) -> np.ndarray:
+        """Vários quantis de uma vez (mesma estimativa de 'quantil'), sem loop por nível."""
+        niveis = np.asarray(niveis, dtype=np.float64)
+        if self.n == 0:
+            return np.full(niveis.shape, np.nan)
+        acumulada = np.cumsum(self.contagens)
+        if self.razao_verossimilhanca:
+            # Cauda inferior: F(x) = soma dos pesos até x / n. A superior quase não tem
+            # cenários sob a inclinação e vem da aproximação normal com os momentos exatos.
+            alvos = niveis * self.n
+            indices = np.searchsorted(acumulada, alvos)
+            anteriores = acumulada[np.maximum(indices - 1, 0)]
+        else:
+            alvos = niveis * self.peso_total
+            indices = np.searchsorted(acumulada, alvos)
+            anteriores = acumulada[np.maximum(indices - 1, 0)]
+
+        bordas = self._bordas()
+        internos = np.clip(indices, 1, len(bordas) - 1)
+        contagens = self.contagens[internos]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fracoes = np.where(contagens > 0, (alvos - anteriores) / contagens, 0.0)
+        valores = bordas[internos - 1] + fracoes * (bordas[internos] - bordas[internos - 1])
+        valores = np.clip(valores, self.minimo, self.maximo)
+        valores = np.where(indices == 0, self.minimo, valores)
+        valores = np.where(indices >= len(self.contagens) - 1, self.maximo, valores)
+        if self.razao_verossimilhanca:
+            superior = niveis > 0.5
+            if self.momentos_exatos is None:
+                return np.where(superior, np.nan, valores)
+            media, desvio = self.momentos_exatos
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(superior, media + desvio * norm.ppf(niveis), valores)
+        return valores
+
+    def intervalos_confianca(self, nivel: float = 0.95) -> dict:
+        """
+        Meia-largura dos intervalos de confiança da média e dos percentis 5 e 95.
+
+        A média usa a aproximação normal (z * desvio / raiz(n)); os percentis usam o
+        intervalo de estatísticas de ordem, cujos postos são q ± z * raiz(q(1-q)/n).
+        Com pesos, n é o tamanho amostral efetivo (Kish para a média e o específico
+        de cada quantil para os percentis). O que vem dos momentos exatos (média e,
+        com razão de verossimilhança, o percentil 95) não tem erro de amostragem: 0.
+        """
+        n_efetivo = self.tamanho_amostral_efetivo
+        if n_efetivo < 2:
+            return {"media_recuperacao": np.inf, "percentil_5": np.inf, "percentil_95": np.inf}
+        z = norm.ppf(0.5 + nivel / 2)
+        intervalos = {"media_recuperacao": float(z * self.desvio_padrao / np.sqrt(n_efetivo))}
+        if self.momentos_exatos is not None:
+            intervalos["media_recuperacao"] = 0.0
+        for chave, q in (("percentil_5", 0.05), ("percentil_95", 0.95)):
+            if self.razao_verossimilhanca and q > 0.5:
+                intervalos[chave] = 0.0 if self.momentos_exatos is not None else np.nan
+                continue
+            margem = z * np.sqrt(q * (1 - q) / self.tamanho_amostral_efetivo_quantil(q))
+            intervalos[chave] = (self.quantil(min(q + margem, 1.0)) - self.quantil(max(q - margem, 0.0))) / 2
+        return intervalos
+
+    def histograma(self, n_bins: int = BINS_HISTOGRAMA) -> dict:
+        """
+        Histograma compacto para exibição: agrupa o sketch em até 'n_bins' bins
+        cobrindo apenas a região observada (mínimo a máximo).
+        """
+        if self.n == 0:
+            return {"bordas": np.array([]), "contagens": np.array([])}
+        bordas = self._bordas()
+        internas = self.contagens[1:-1]
+        ocupados = np.flatnonzero(internas)
+        primeiro = ocupados[0] if ocupados.size else 0
+        ultimo = ocupados[-1] if ocupados.size else len(internas) - 1
+        fator = max(1, int(np.ceil((ultimo - primeiro + 1) / n_bins)))
+        fim = primeiro + fator * int(np.ceil((ultimo - primeiro + 1) / fator))
+        trecho = np.zeros(fim - primeiro)
+        trecho[:min(fim, len(internas)) - primeiro] = internas[primeiro:fim]
+        contagens = trecho.reshape(-1, fator).sum(axis=1)
+        # O que ficou fora da faixa entra nos bins das pontas.
+        contagens[0] += self.contagens[0]
+        contagens[-1] += self.contagens[-1]
+        largura = bordas[1] - bordas[0]
+        bordas_agrupadas = bordas[primeiro] + largura * fator * np.arange(len(contagens) + 1)
+        return {"bordas": bordas_agrupadas, "contagens": contagens}
+
+def criar_acumulador(probabilidades: np.ndarray, valores: np.ndarray, desvio: float = None) -> AcumuladorSimulacao:
+    """
+    Cria um acumulador cuja faixa do sketch cobre DESVIOS_FAIXA_SKETCH desvios padrão
+    ao redor da média analítica da carteira, limitada a [0, valor total].
+    'desvio' substitui o desvio padrão da carteira independente (ex.: com fatores de correlação).
+    """
+    media, desvio_independente = momentos_carteira(probabilidades, valores)
+    desvio = desvio_independente if desvio is None else desvio
+    inferior = max(0.0, media - DESVIOS_FAIXA_SKETCH * desvio)
+    superior = min(float(np.sum(valores)), media + DESVIOS_FAIXA_SKETCH * desvio)
+    return AcumuladorSimulacao(inferior, superior)
+
+def acumular_amostras(amostras) -> AcumuladorSimulacao:
+    """Constrói um acumulador a partir de uma lista/array de resultados já simulados."""
+    amostras = np.asarray(amostras, dtype=np.float64)
+    acumulador = AcumuladorSimulacao(amostras.min(), np.nextafter(amostras.max(), np.inf)) if amostras.size else AcumuladorSimulacao(0.0, 1.0)
+    acumulador.atualizar(amostras)
+    return acumulador
@@ -1,42 +1,419 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import streamlit as st
 
-def rodar_simulacao(df_carteira, n_simulacoes):
+import Control.MonteCarlo.amostragem   as Amostragem
+import Control.MonteCarlo.analitico    as Analitico
+import Control.MonteCarlo.estatisticas as Estatisticas
+import Control.MonteCarlo.fatores      as Fatores
+import Control.Telemetria.telemetria   as Telemetria
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes do Motor de Simulação ---
+# Limite de elementos (cenários x prospects) sorteados por bloco. Mantém a memória
+# de cada bloco em torno de 16 MB para os sorteios em float64.
+MAX_ELEMENTOS_BLOCO = 2_000_000
+# Limite de cenários por bloco, para que carteiras pequenas ainda gerem vários
+# blocos e possam ser distribuídas entre os processos.
+MAX_CENARIOS_BLOCO = 8192
+# Tolerância padrão do modo adaptativo: meia-largura do IC de 95% relativa à média.
+TOLERANCIA_PADRAO = 0.005
+# Cenários mínimos antes de o modo adaptativo avaliar a convergência.
+MIN_CENARIOS_ADAPTATIVO = 1000
+# Precisões do núcleo de simulação: 'dupla' (float64) ou 'compacta' (limiares uint32,
+# bits aleatórios crus e acumulação em float32), que move cerca de metade dos bytes.
+PRECISOES = ("dupla", "compacta")
+# Prospects somados por vez em float32 no núcleo compacto; as somas parciais são
+# acumuladas em float64. Controla o erro de arredondamento (ver _preparar_compacto).
+PROSPECTS_POR_LOTE_COMPACTO = 4096
+
+# --- Funções Auxiliares (Lógica Interna) ---
+
+def _definir_tamanho_bloco(n_prospects: int, n_simulacoes: int, tamanho_bloco: int = None) -> int:
+    """
+    Define quantos cenários são sorteados de uma vez, limitando a matriz do bloco
+    a MAX_ELEMENTOS_BLOCO elementos quando o tamanho não é informado.
+    """
+    if tamanho_bloco is None:
+        tamanho_bloco = min(MAX_ELEMENTOS_BLOCO // max(n_prospects, 1), MAX_CENARIOS_BLOCO)
+    return int(max(1, min(tamanho_bloco, n_simulacoes)))
+
+def _planejar_blocos(n_simulacoes: int, tamanho_bloco: int, seed=None) -> list:
+    """
+    Divide os cenários em blocos e associa a cada bloco um fluxo aleatório próprio,
+    derivado da semente do usuário via SeedSequence.spawn.
+
+    Como o fluxo pertence ao bloco (e não ao processo que o executa), o resultado
+    é o mesmo qualquer que seja o número de processos.
+    """
+    tamanhos = [min(tamanho_bloco, n_simulacoes - inicio) for inicio in range(0, n_simulacoes, tamanho_bloco)]
+    sementes = np.random.SeedSequence(seed).spawn(len(tamanhos))
+    return list(zip(tamanhos, sementes))
+
+def _simular_bloco(rng: np.random.Generator, probabilidades: np.ndarray, valores: np.ndarray,
+                   sorteios: np.ndarray, pagou: np.ndarray, amostragem: str = "simples") -> np.ndarray:
+    """
+    Simula um bloco de cenários de uma só vez.
+
+    Sorteia uma matriz (cenários x prospects) de números aleatórios, compara com as
+    probabilidades de pagamento e reduz cada linha com um produto matriz-vetor
+    contra os valores das dívidas. Os buffers 'sorteios' e 'pagou' são reaproveitados
+    entre blocos para não alocar memória nova a cada iteração.
+    """
+    Amostragem.sortear_uniformes(rng, sorteios, amostragem)
+    np.less(sorteios, probabilidades, out=pagou)
+    return pagou @ valores
+
+def _preparar_compacto(probabilidades: np.ndarray, valores: np.ndarray) -> dict:
+    """
+    Converte a carteira para o núcleo compacto.
+
+    Cada probabilidade vira um limiar inteiro round(p * 2^32), comparado com 32 bits
+    aleatórios crus; cada valor vira float32 e as somas são feitas em lotes de
+    PROSPECTS_POR_LOTE_COMPACTO prospects. Diferença máxima para o núcleo float64,
+    por cenário, com V = soma dos valores da carteira:
+      - probabilidade: cada p muda no máximo 2^-33 (2^-32 para p = 1);
+      - valores: arredondamento para float32, até 2^-24 * V;
+      - soma: até PROSPECTS_POR_LOTE_COMPACTO * 2^-24 * V (limite de pior caso; o erro
+        típico cresce com a raiz do número de termos e fica ordens de grandeza abaixo).
+    """
+    limiares = np.minimum(np.rint(np.clip(probabilidades, 0.0, 1.0) * 2.0 ** 32), 2.0 ** 32 - 1)
+    return {"limiares": limiares.astype(np.uint32), "valores": valores.astype(np.float32)}
+
+def _simular_bloco_compacto(rng: np.random.Generator, compacto: dict, pagou: np.ndarray,
+                            amostragem: str = "simples") -> np.ndarray:
+    """
+    Simula um bloco no núcleo compacto: 32 bits crus do gerador por elemento (metade
+    dos bytes de um uniforme float64), comparados direto com os limiares inteiros e
+    gravados em 'pagou' (float32), que segue para produtos matriz-vetor em float32.
+    Na amostragem antitética, a segunda metade usa o complemento dos bits (2^32 - 1 - U).
+    """
+    n_cenarios, n_prospects = pagou.shape
+    n_sorteados = n_cenarios if amostragem != "antitetica" else n_cenarios - n_cenarios // 2
+    brutos = rng.bit_generator.random_raw((n_sorteados * n_prospects + 1) // 2)
+    bits = brutos.view(np.uint32)[:n_sorteados * n_prospects].reshape(n_sorteados, n_prospects)
+    if amostragem == "antitetica":
+        metade = n_cenarios // 2
+        bits = np.concatenate([bits, np.invert(bits[:metade])])
+    np.less(bits, compacto["limiares"], out=pagou, casting="unsafe")
+
+    resultados = np.zeros(n_cenarios, dtype=np.float64)
+    for inicio in range(0, n_prospects, PROSPECTS_POR_LOTE_COMPACTO):
+        fim = inicio + PROSPECTS_POR_LOTE_COMPACTO
+        resultados += pagou[:, inicio:fim] @ compacto["valores"][inicio:fim]
+    return resultados
+
+def _iterar_blocos(probabilidades: np.ndarray, valores: np.ndarray, blocos: list, acumulador,
+                   amostragem: str = "simples", inclinacao: tuple = None, modelo_fatores: dict = None,
+                   precisao: str = "dupla"):
+    """
+    Executa uma sequência de blocos (tamanho, semente), devolvendo um bloco por vez.
+
+    Os buffers de sorteio e a preparação do núcleo compacto são feitos uma única vez,
+    no primeiro bloco. Os resultados de cada bloco alimentam o histograma fino de
+    'acumulador' e são descartados em seguida; os momentos não são mesclados aqui, para
+    que o chamador os incorpore sempre na ordem dos blocos. Com 'inclinacao' (t, K(t))
+    da amostragem por importância, cada cenário recebe seu peso de verossimilhança. Com
+    'modelo_fatores', os cenários seguem o modelo de fatores correlacionados (ver
+    Control.MonteCarlo.fatores). Com precisao='compacta', usa o núcleo compacto (ver
+    _preparar_compacto). Na amostragem antitética, os 'metade' primeiros cenários de cada
+    bloco formam par com os 'metade' seguintes (no núcleo compacto, com os 'metade'
+    últimos: o cenário sem par de um bloco ímpar fica no meio). No hipercubo latino,
+    cada bloco devolve também o seu próprio percentil 5.
+
+    Yields:
+        tuple: (momentos do bloco, momentos das médias dos pares antitéticos ou None,
+            (cenários, percentil 5) do bloco no hipercubo latino ou None).
+    """
+    maior_bloco = max(tamanho for tamanho, _ in blocos)
+    if precisao == "compacta":
+        compacto = _preparar_compacto(probabilidades, valores)
+        pagou = np.empty((maior_bloco, len(probabilidades)), dtype=np.float32)
+    else:
+        sorteios = np.empty((maior_bloco, len(probabilidades)), dtype=np.float64)
+        pagou = np.empty(sorteios.shape, dtype=bool)
+
+    for n_cenarios, semente in blocos:
+        rng = np.random.default_rng(semente)
+        if precisao == "compacta":
+            resultados = _simular_bloco_compacto(rng, compacto, pagou[:n_cenarios], amostragem)
+        elif modelo_fatores:
+            resultados = Fatores.simular_bloco(rng, modelo_fatores, sorteios[:n_cenarios], pagou[:n_cenarios], amostragem)
+        else:
+            resultados = _simular_bloco(rng, probabilidades, valores, sorteios[:n_cenarios], pagou[:n_cenarios], amostragem)
+        pesos = Amostragem.pesos_importancia(resultados, *inclinacao) if inclinacao else None
+        acumulador.contar(resultados, pesos)
+        pares, quantil_bloco = None, None
+        if amostragem == "lhs":
+            quantil_bloco = (n_cenarios, float(np.quantile(resultados, 0.05)))
+        elif amostragem == "antitetica":
+            metade = n_cenarios // 2
+            inicio_pares = n_cenarios - metade if precisao == "compacta" else metade
+            pares = acumulador.momentos_bloco((resultados[:metade] + resultados[inicio_pares:inicio_pares + metade]) / 2)
+        yield acumulador.momentos_bloco(resultados, pesos), pares, quantil_bloco
+
+def _simular_blocos(probabilidades: np.ndarray, valores: np.ndarray, blocos: list, limites: tuple,
+                    amostragem: str = "simples", inclinacao: tuple = None, modelo_fatores: dict = None,
+                    precisao: str = "dupla") -> tuple:
+    """
+    Executa uma sequência de blocos (ver _iterar_blocos). É a unidade de trabalho de cada processo.
+
+    Returns:
+        tuple: (acumulador só com o histograma fino (faixa 'limites'), lista de momentos por
+            bloco, lista de momentos das médias dos pares antitéticos por bloco, lista de
+            (cenários, percentil 5) por bloco no hipercubo latino; as duas últimas ficam
+            vazias nos demais esquemas).
+    """
+    acumulador = Estatisticas.AcumuladorSimulacao(*limites)
+    momentos, momentos_pares, quantis_blocos = [], [], []
+    for momento, pares, quantil_bloco in _iterar_blocos(probabilidades, valores, blocos, acumulador, amostragem,
+                                                        inclinacao, modelo_fatores, precisao):
+        momentos.append(momento)
+        if pares is not None:
+            momentos_pares.append(pares)
+        if quantil_bloco is not None:
+            quantis_blocos.append(quantil_bloco)
+    return acumulador, momentos, momentos_pares, quantis_blocos
+
+def _incorporar(acumulador, parcial, momentos: list):
+    """Incorpora ao acumulador o resultado de _simular_blocos, na ordem dos blocos."""
+    acumulador.somar_histograma(parcial)
+    for momento in momentos:
+        acumulador.mesclar_momentos(*momento)
+
+def _preparar_amostragem(probabilidades: np.ndarray, valores: np.ndarray, amostragem: str,
+                         precisao: str = "dupla", fatores: dict = None) -> tuple:
+    """
+    Valida o esquema de amostragem e a precisão e, na amostragem por importância, devolve
+    as probabilidades inclinadas usadas nos sorteios e a inclinação (t, K(t)) dos pesos.
+    """
+    if amostragem not in Amostragem.AMOSTRAGENS:
+        raise ValueError(f"Amostragem desconhecida: '{amostragem}'. Use uma de {Amostragem.AMOSTRAGENS}.")
+    if precisao not in PRECISOES:
+        raise ValueError(f"Precisão desconhecida: '{precisao}'. Use uma de {PRECISOES}.")
+    if precisao == "compacta" and (amostragem == "lhs" or fatores):
+        raise ValueError("O núcleo compacto não suporta o hipercubo latino nem o modelo de fatores.")
+    if amostragem != "importancia":
+        return probabilidades, None
+    media, desvio = Analitico.momentos_carteira(probabilidades, valores)
+    t, cumulante, probabilidades_inclinadas = Amostragem.calcular_inclinacao(probabilidades, valores, media, desvio)
+    return probabilidades_inclinadas, (t, cumulante)
+
+def _preparar_fatores(df_carteira, probabilidades: np.ndarray, valores: np.ndarray, fatores: dict,
+                      amostragem: str) -> tuple:
+    """
+    Monta o modelo de fatores correlacionados, se pedido, e o desvio padrão da carteira
+    correlacionada (usado na faixa do sketch e nos diagnósticos).
+
+    Returns:
+        tuple: (modelo de fatores, desvio padrão), ou (None, desvio da carteira independente).
+    """
+    if not fatores:
+        return None, Analitico.momentos_carteira(probabilidades, valores)[1]
+    if amostragem not in Fatores.AMOSTRAGENS_FATORES:
+        raise ValueError(f"O modelo de fatores só aceita as amostragens {Fatores.AMOSTRAGENS_FATORES}.")
+    modelo = Fatores.preparar_modelo(df_carteira, probabilidades, valores, fatores)
+    return modelo, Fatores.desvio_carteira(modelo, max_elementos=MAX_ELEMENTOS_BLOCO)
+
+def _diagnostico_amostragem(acumulador, momentos_blocos: list, desvio: float, amostragem: str,
+                            momentos_pares: list = None, quantis_blocos: list = None) -> dict:
+    """
+    Tamanho amostral efetivo atingido. Na amostragem por importância: Kish (pesos) para
+    a média e o tamanho efetivo do percentil 5, alvo da inclinação. Na antitética: a
+    variância da carteira ('desvio'²) contra a variância das médias de todos os pares.
+    No hipercubo latino: a variância da carteira dividida pela variância da média
+    estimada pelos blocos e, para o percentil 5, a dispersão dos percentis 5 dos blocos.
+    """
+    diagnostico = {"amostragem": amostragem, "cenarios": acumulador.n}
+    if amostragem == "importancia":
+        diagnostico["tamanho_amostral_efetivo"] = acumulador.tamanho_amostral_efetivo
+        diagnostico["tamanho_amostral_efetivo_p5"] = acumulador.tamanho_amostral_efetivo_quantil(0.05)
+    elif amostragem == "antitetica":
+        diagnostico["tamanho_amostral_efetivo"] = Amostragem.tamanho_efetivo_antitetico(momentos_pares, desvio ** 2)
+    else:
+        diagnostico["tamanho_amostral_efetivo"] = Amostragem.tamanho_efetivo_por_blocos(momentos_blocos, desvio ** 2)
+        if quantis_blocos:
+            q = 0.05
+            # Densidade no percentil 5 pela diferença de quantis vizinhos do sketch.
+            intervalo = acumulador.quantil(q + 0.01) - acumulador.quantil(q - 0.01)
+            densidade = 0.02 / intervalo if intervalo > 0 else np.inf
+            diagnostico["tamanho_amostral_efetivo_p5"] = Amostragem.tamanho_efetivo_quantil_por_blocos(
+                quantis_blocos, q, densidade)
+    return diagnostico
+
+def _precisao_relativa(acumulador) -> float:
+    """Maior meia-largura de IC (média, p5, p95) dividida pela média da recuperação."""
+    referencia = max(abs(acumulador.media), np.finfo(float).tiny)
+    return max(acumulador.intervalos_confianca().values()) / referencia
+
+def _extrair_arrays(df_carteira) -> tuple:
+    """Extrai as probabilidades e os valores (em R$) da carteira como arrays NumPy."""
+    probabilidades = df_carteira['score_recuperacao'].to_numpy(dtype=np.float64)
+    valores = df_carteira['valor_divida_mil'].to_numpy(dtype=np.float64) * 1000 # Convertendo para valor real
+    return probabilidades, valores
+
+# --- Função Principal de Simulação ---
+
+def rodar_simulacao(df_carteira, n_simulacoes, tamanho_bloco=None, seed=None, modo="monte_carlo",
+                    tolerancia=TOLERANCIA_PADRAO, amostragem="simples", fatores=None, precisao="dupla"):
     """
     Roda uma simulação de Monte Carlo sobre uma carteira de prospects.
 
+    Os cenários são sorteados em blocos (matrizes 2-D) e reduzidos com um produto
+    matriz-vetor, o que evita o loop em Python por cenário.
+
+    Args:
+        df_carteira (pd.DataFrame): DataFrame com as colunas 'score_recuperacao' e 'valor_divida_mil'.
+        n_simulacoes (int): O número de cenários a serem simulados.
+        tamanho_bloco (int, optional): Cenários sorteados por bloco. Se omitido, é calculado
+            para que cada bloco tenha no máximo MAX_ELEMENTOS_BLOCO elementos.
+        seed (int, optional): Semente da simulação. A mesma semente reproduz os mesmos resultados.
+        modo (str): 'monte_carlo' (padrão), 'analitico', que calcula a distribuição sem
+            sorteios (ver Control.MonteCarlo.analitico) e ignora 'n_simulacoes', ou
+            'adaptativo', que simula bloco a bloco até que os intervalos de confiança
+            de 95% da média e dos percentis 5 e 95 fiquem abaixo de 'tolerancia'
+            (relativa à média), usando 'n_simulacoes' como teto.
+        tolerancia (float): Precisão relativa alvo do modo adaptativo.
+        amostragem (str): Esquema de redução de variância: 'simples' (padrão), 'antitetica',
+            'lhs' (hipercubo latino) ou 'importancia' (inclinada para baixa recuperação:
+            quantis até a mediana reponderados; média, desvio e quantis superiores pelos
+            momentos exatos). Ver Control.MonteCarlo.amostragem.
+        fatores (dict, optional): Coluna -> correlação latente dentro de cada grupo da coluna
+            (ex.: Fatores.FATORES_PADRAO, setor e região). Liga o modelo de fatores de
+            cópula gaussiana para cenários de estresse com inadimplência correlacionada.
+            Aceita apenas as amostragens 'simples' e 'antitetica'.
+        precisao (str): 'dupla' (padrão, float64) ou 'compacta', núcleo com limiares uint32,
+            bits aleatórios crus e somas em float32, mais rápido em carteiras grandes e com
+            erro limitado em relação ao float64 (ver _preparar_compacto). Não combina com
+            'lhs' nem com fatores.
+
+    Returns:
+        AcumuladorSimulacao: Estatísticas acumuladas (média, desvio, sketch de quantis e
+            histograma) do valor total recuperado em cada simulação, sem as amostras.
+            No modo 'adaptativo', o atributo 'diagnostico' traz os cenários usados e a precisão atingida;
+            com redução de variância, traz também o tamanho amostral efetivo.
+            No modo 'analitico', um dicionário com média, desvio padrão, percentis e erros.
+    """
+    probabilidades, valores = _extrair_arrays(df_carteira)
+
+    if modo == "analitico":
+        if fatores:
+            raise ValueError("O modo analítico supõe prospects independentes; use Monte Carlo com fatores.")
+        logger.info("Calculando a distribuição de recuperação pelo modo analítico...")
+        return Analitico.distribuicao_recuperacao(probabilidades, valores)
+    if modo not in ("monte_carlo", "adaptativo"):
+        raise ValueError(f"Modo de simulação desconhecido: '{modo}'.")
+
+    logger.info("Iniciando Simulação de Monte Carlo com %d cenários...", n_simulacoes)
+    with Telemetria.etapa("preparar_simulacao", len(probabilidades)):
+        tamanho_bloco = _definir_tamanho_bloco(len(probabilidades), n_simulacoes, tamanho_bloco)
+        blocos = _planejar_blocos(n_simulacoes, tamanho_bloco, seed)
+        probabilidades_sorteio, inclinacao = _preparar_amostragem(probabilidades, valores, amostragem, precisao, fatores)
+        modelo_fatores, desvio = _preparar_fatores(df_carteira, probabilidades, valores, fatores, amostragem)
+
+    acumulador = Estatisticas.criar_acumulador(probabilidades, valores, desvio)
+    acumulador.razao_verossimilhanca = inclinacao is not None
+    if inclinacao is not None:
+        acumulador.momentos_exatos = Analitico.momentos_carteira(probabilidades, valores)
+    momentos_blocos, momentos_pares, quantis_blocos = [], [], []
+    convergiu = False
+    # 'linhas' da etapa = cenários simulados.
+    with Telemetria.etapa("simular_cenarios") as etapa_simulacao:
+        # O histograma de cada bloco vai direto para o acumulador; os momentos são
+        # mesclados a cada bloco para que o critério adaptativo veja o estado atual.
+        for momento, pares, quantil_bloco in _iterar_blocos(probabilidades_sorteio, valores, blocos, acumulador,
+                                                            amostragem, inclinacao, modelo_fatores, precisao):
+            acumulador.mesclar_momentos(*momento)
+            momentos_blocos.append(momento)
+            if pares is not None:
+                momentos_pares.append(pares)
+            if quantil_bloco is not None:
+                quantis_blocos.append(quantil_bloco)
+            logger.debug("🎲 Simulando %d/%d", acumulador.n, n_simulacoes)
+            if modo == "adaptativo" and acumulador.n >= MIN_CENARIOS_ADAPTATIVO:
+                convergiu = _precisao_relativa(acumulador) <= tolerancia
+                if convergiu:
+                    break
+        etapa_simulacao.linhas = acumulador.n
+
+    if amostragem != "simples":
+        acumulador.diagnostico = _diagnostico_amostragem(acumulador, momentos_blocos, desvio, amostragem, momentos_pares,
+                                                         quantis_blocos)
+    if modo == "adaptativo":
+        acumulador.diagnostico = {
+            **(acumulador.diagnostico or {}),
+            "cenarios_usados": acumulador.n,
+            "cenarios_maximos": n_simulacoes,
+            "convergiu": convergiu,
+            "tolerancia": tolerancia,
+            "precisao": _precisao_relativa(acumulador),
+            "intervalos_confianca": acumulador.intervalos_confianca(),
+        }
+
+    logger.info("✅ Simulação concluída %d/%d", acumulador.n, n_simulacoes)
+    return acumulador
+
+def rodar_simulacao_paralela(df_carteira, n_simulacoes, n_workers=None, tamanho_bloco=None, seed=None,
+                             amostragem="simples", fatores=None, precisao="dupla"):
+    """
+    Roda a simulação de Monte Carlo distribuindo os blocos de cenários entre processos.
+
+    Cada bloco usa um fluxo aleatório independente derivado de 'seed', portanto o
+    resultado é idêntico ao de rodar_simulacao com a mesma semente, para qualquer
+    número de processos. Na amostragem por importância o histograma soma pesos
+    fracionários, e a ordem dessas somas pode alterar o último bit dos resultados.
+
     Args:
         df_carteira (pd.DataFrame): DataFrame com as colunas 'score_recuperacao' e 'valor_divida_mil'.
         n_simulacoes (int): O número de cenários a serem simulados.
+        n_workers (int, optional): Número de processos. Se omitido, usa todos os núcleos.
+        tamanho_bloco (int, optional): Cenários sorteados por bloco.
+        seed (int, optional): Semente da simulação.
+        amostragem (str): Esquema de redução de variância (ver rodar_simulacao).
+        fatores (dict, optional): Fatores de correlação (ver rodar_simulacao).
+        precisao (str): 'dupla' ou 'compacta' (ver rodar_simulacao).
 
     Returns:
-        list: Uma lista contendo o valor total recuperado para cada simulação.
-    """
-    print(f"Iniciando Simulação de Monte Carlo com {n_simulacoes} cenários...")
-    
-    # Extrair as probabilidades e valores para arrays NumPy (muito mais rápido)
-    probabilidades = df_carteira['score_recuperacao'].values
-    valores = df_carteira['valor_divida_mil'].values * 1000 # Convertendo para valor real
-    
-    resultados_simulacao = []
-    
-    for i in range(n_simulacoes):
-        if i == 0:
-            print(f"🎲 Simulando {i+1}/{n_simulacoes}")
-        elif i%1000 == 0:
-            print(f"🎲 Simulando {i}/{n_simulacoes}")
-            
-        # Gera um número aleatório (0 a 1) para cada prospect
-        random_rolls = np.random.rand(len(df_carteira))
-        
-        # Compara o número aleatório com a probabilidade de pagamento
-        # O resultado é um array de True/False (pagou / não pagou)
-        pagou = random_rolls < probabilidades
-        
-        # Soma o valor da dívida apenas dos que pagaram (onde 'pagou' é True)
-        valor_recuperado_nesta_simulacao = np.sum(valores[pagou])
-        
-        resultados_simulacao.append(valor_recuperado_nesta_simulacao)
-        
-    print(f"✅ Simulação concluída {n_simulacoes}/{n_simulacoes}")    
-    return resultados_simulacao
\ No newline at end of file
+        AcumuladorSimulacao: Estatísticas acumuladas do valor total recuperado em cada simulação.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    logger.info("Iniciando Simulação de Monte Carlo com %d cenários em %d processos...", n_simulacoes, n_workers)
+
+    probabilidades, valores = _extrair_arrays(df_carteira)
+    tamanho_bloco = _definir_tamanho_bloco(len(probabilidades), n_simulacoes, tamanho_bloco)
+    blocos = _planejar_blocos(n_simulacoes, tamanho_bloco, seed)
+    probabilidades_sorteio, inclinacao = _preparar_amostragem(probabilidades, valores, amostragem, precisao, fatores)
+    modelo_fatores, desvio = _preparar_fatores(df_carteira, probabilidades, valores, fatores, amostragem)
+
+    acumulador = Estatisticas.criar_acumulador(probabilidades, valores, desvio)
+    acumulador.razao_verossimilhanca = inclinacao is not None
+    if inclinacao is not None:
+        acumulador.momentos_exatos = Analitico.momentos_carteira(probabilidades, valores)
+    limites = (acumulador.limite_inferior, acumulador.limite_superior)
+    momentos_blocos, momentos_pares, quantis_blocos = [], [], []
+
+    # Cada processo recebe uma fatia contígua de blocos, preservando a ordem dos cenários.
+    fatias = [fatia.tolist() for fatia in np.array_split(np.arange(len(blocos)), min(n_workers, len(blocos)))]
+    with Telemetria.etapa("simular_cenarios", n_simulacoes), ProcessPoolExecutor(max_workers=len(fatias)) as executor:
+        tarefas = [
+            executor.submit(_simular_blocos, probabilidades_sorteio, valores, [blocos[i] for i in fatia],
+                            limites, amostragem, inclinacao, modelo_fatores, precisao)
+            for fatia in fatias
+        ]
+        for tarefa in tarefas:
+            parcial, momentos, pares, quantis = tarefa.result()
+            _incorporar(acumulador, parcial, momentos)
+            momentos_blocos.extend(momentos)
+            momentos_pares.extend(pares)
+            quantis_blocos.extend(quantis)
+
+    if amostragem != "simples":
+        acumulador.diagnostico = _diagnostico_amostragem(acumulador, momentos_blocos, desvio, amostragem, momentos_pares,
+                                                         quantis_blocos)
+
+    logger.info("✅ Simulação concluída %d/%d", n_simulacoes, n_simulacoes)
+    return acumulador
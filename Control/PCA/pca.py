@@ -4,6 +4,9 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
 from sklearn.impute import SimpleImputer # <-- IMPORTAÇÃO ESTRATÉGICA
 
+import Control.Exportacao.exportacao as Exportacao
+import Control.Telemetria.telemetria as Telemetria
+
 # --- Funções Auxiliares (Lógica Interna) ---
 
 def _preprocessar_para_pca(df_features: pd.DataFrame) -> pd.DataFrame:
@@ -54,13 +57,15 @@ def analise_pca(df_prospects: pd.DataFrame) -> pd.DataFrame:
     """
     # 1. Prepara os dados, removendo o identificador.
     df_features = df_prospects.drop('id_cliente', axis=1, errors='ignore')
-    df_processado = _preprocessar_para_pca(df_features)
+    with Telemetria.etapa("preprocessar", len(df_features)):
+        df_processado = _preprocessar_para_pca(df_features)
     
-    df_processado.to_csv("DF_PROCESSADO_PCA.csv")
+    Exportacao.exportar("DF_PROCESSADO_PCA", df_processado)
 
     # 2. Aplica o PCA para extrair os componentes.
     pca = PCA(n_components=2)
-    componentes_principais = pca.fit_transform(df_processado)
+    with Telemetria.etapa("ajustar_pca", len(df_processado)):
+        componentes_principais = pca.fit_transform(df_processado)
 
     # 3. Consolida o resultado.
     df_resultado = df_prospects.copy()
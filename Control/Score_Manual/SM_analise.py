@@ -1,11 +1,28 @@
 import numpy as np
-
-def calcular_estatisticas_simulacao(resultados, simulations_count_input):
-    # Análise estatística dos resultados
-    media_recuperacao = np.mean(resultados)
-    desvio_padrao = np.std(resultados)
-    percentil_5 = np.percentile(resultados, 5)  # Cenário pessimista (95% de chance de ser maior que isso)
-    percentil_95 = np.percentile(resultados, 95) # Cenário otimista (5% de chance de ser maior que isso)
+from scipy.stats import norm
+
+from Control.MonteCarlo.estatisticas import AcumuladorSimulacao, acumular_amostras
+
+def calcular_estatisticas_simulacao(resultados, simulations_count_input, modo="monte_carlo"):
+    # No modo analítico os momentos e percentis já chegam calculados (com seus erros).
+    if modo == "analitico":
+        media_recuperacao = resultados["media_recuperacao"]
+        desvio_padrao = resultados["desvio_padrao"]
+        percentil_5 = resultados["percentil_5"]
+        percentil_95 = resultados["percentil_95"]
+        histograma = None
+    else:
+        # A simulação entrega um acumulador; listas de resultados antigas são convertidas.
+        acumulador = resultados if isinstance(resultados, AcumuladorSimulacao) else acumular_amostras(resultados)
+        simulations_count_input = acumulador.n
+        # Análise estatística dos resultados
+        media_recuperacao = acumulador.media
+        desvio_padrao = acumulador.desvio_padrao
+        percentil_5 = acumulador.quantil(0.05)  # Cenário pessimista (95% de chance de ser maior que isso)
+        percentil_95 = acumulador.quantil(0.95) # Cenário otimista (5% de chance de ser maior que isso)
+        histograma = acumulador.histograma()
+        precisao = acumulador.intervalos_confianca()
+        diagnostico = acumulador.diagnostico
     dv_1 = media_recuperacao - desvio_padrao
     dv_11 = media_recuperacao + desvio_padrao
     dv_2 = media_recuperacao - (desvio_padrao * 2)
@@ -13,7 +30,7 @@ def calcular_estatisticas_simulacao(resultados, simulations_count_input):
     
     results = {
         "simulacoes": simulations_count_input,
-        "resultados": resultados,
+        "histograma": histograma,
         "media_recuperacao": media_recuperacao,
         "desvio_padrao": desvio_padrao,
         "percentil_5": percentil_5,
@@ -23,6 +40,19 @@ def calcular_estatisticas_simulacao(resultados, simulations_count_input):
         "2_DV": dv_2,
         "22_DV": dv_22
     }
+
+    if modo == "analitico":
+        results.update({
+            "modo": "analitico",
+            "metodo": resultados["metodo"],
+            "erro_percentil_5": resultados["erro_percentil_5"],
+            "erro_percentil_95": resultados["erro_percentil_95"],
+            "densidade": resultados["densidade"],
+        })
+    else:
+        # Meia-largura dos ICs de 95% e, no modo adaptativo, o diagnóstico de convergência.
+        results["precisao"] = precisao
+        results["diagnostico"] = diagnostico
     
     return results
 
@@ -41,6 +71,51 @@ def estimar_valor_carteira(ve, cop_percent, retorno_percent):
     
     return results
 
+def valores_cenarios(resultados, niveis, modo="monte_carlo"):
+    """
+    Valor recuperado em cada nível de probabilidade (ex.: 0.05, 0.5, 0.95) a partir de uma
+    única simulação. O Monte Carlo usa o sketch de quantis do acumulador; o modo analítico
+    usa a densidade devolvida por distribuicao_recuperacao ou, sem ela, a aproximação normal
+    com a média e o desvio exatos.
+    """
+    niveis = np.asarray(niveis, dtype=np.float64)
+    if modo != "analitico":
+        acumulador = resultados if isinstance(resultados, AcumuladorSimulacao) else acumular_amostras(resultados)
+        return acumulador.quantis(niveis)
+    densidade = resultados.get("densidade")
+    if densidade is not None:
+        acumulada = np.cumsum(densidade["probabilidades"])
+        indices = np.minimum(np.searchsorted(acumulada, niveis), len(acumulada) - 1)
+        return np.asarray(densidade["valores"])[indices]
+    return resultados["media_recuperacao"] + resultados["desvio_padrao"] * norm.ppf(niveis)
+
+def estimar_grade_precificacao(ves, cops_percent, retornos_percent):
+    """
+    Precifica de uma vez todas as combinações de valor esperado, custo de operação e
+    retorno desejado, com as mesmas fórmulas de estimar_valor_carteira aplicadas por broadcasting.
+
+    Args:
+        ves (array): Valores esperados (ex.: um por cenário/percentil).
+        cops_percent (array): Custos de operação em %.
+        retornos_percent (array): Retornos desejados em %.
+
+    Returns:
+        dict: Os eixos ('VE', 'COP_percent', 'retorno_percent') e as matrizes 'COP', 'RLE',
+            'PMV' e 'ROI' com formato (len(ves), len(cops_percent), len(retornos_percent)),
+            prontas para um mapa de calor por cenário.
+    """
+    ves = np.asarray(ves, dtype=np.float64)
+    cops_percent = np.asarray(cops_percent, dtype=np.float64)
+    retornos_percent = np.asarray(retornos_percent, dtype=np.float64)
+    grade = estimar_valor_carteira(ves[:, None, None], cops_percent[None, :, None], retornos_percent[None, None, :])
+    formato = (len(ves), len(cops_percent), len(retornos_percent))
+    return {
+        "VE": ves,
+        "COP_percent": cops_percent,
+        "retorno_percent": retornos_percent,
+        **{chave: np.broadcast_to(valor, formato) for chave, valor in grade.items()},
+    }
+
 
 #O Preço da Carteira é Presumido? Não, ele é o Resultado da Sua Análise!
 
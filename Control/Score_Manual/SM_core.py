@@ -1,112 +1,476 @@
 # Control/Score_Manual/SM_core.py
 
+import copy
 import json
+import logging
+import os
 from typing import Dict, Any
 
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.impute import SimpleImputer
+from scipy.stats import rankdata
+
+import Control.Cache.cache           as Cache
+import Control.Documento.documento   as Documento
+import Control.Exportacao.exportacao as Exportacao
+import Control.Telemetria.telemetria as Telemetria
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes ---
+CAMINHO_PESOS_PADRAO = "Control/Score_Manual/pesos.json"
+CAMINHO_PERFIL_PADRAO = "Control/Score_Manual/perfil_score.json"
+# Segmentos pontuados, na ordem em que aparecem no resultado.
+SEGMENTOS = Documento.TIPOS_PESSOA
+# Faixas de score dos ranks do relatório de score: [inferior, superior).
+LIMITES_RANKS = {"A": (0.75, np.inf), "B": (0.50, 0.75), "C": (0.25, 0.50), "D": (-np.inf, 0.25)}
+# Linhas por fatia na avaliação de várias configurações (a fatia de scores tem linhas x configurações).
+LINHAS_POR_FATIA_SENSIBILIDADE = 32_768
+# Máximo de prospects usados na correlação de Spearman (amostra fixa acima disso).
+AMOSTRA_SPEARMAN = 50_000
+
+# Pesos compilados por versão do arquivo de pesos.
+_cache_pesos = Cache.CacheLRU(max_itens=8)
+# Perfis de scoring lidos do disco, por versão do arquivo.
+_cache_perfis = Cache.CacheLRU(max_itens=8)
 
 # --- Funções Auxiliares (Lógica Interna) ---
 
-def _carregar_configuracao_pesos(caminho_pesos: str) -> Dict[str, Any]:
+def carregar_configuracao_pesos(caminho_pesos: str) -> Dict[str, Any]:
     """Carrega o arquivo JSON completo com as configurações de PF e PJ."""
     with open(caminho_pesos, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def _calcular_score_segmento(df_segmento: pd.DataFrame, config_pesos_segmento: Dict[str, Any]) -> pd.DataFrame:
-    """
-    Função core que calcula o score para um segmento específico (PF ou PJ),
-    agora com logging detalhado para monitoramento do processo.
-    """
-    if df_segmento.empty:
-        print("   [LOG] Segmento vazio, pulando processamento.")
-        return pd.DataFrame()
-
-    pesos_numericos = config_pesos_segmento.get('pesos_numericos', {})
-    pesos_categoricos = config_pesos_segmento.get('pesos_categoricos', {})
-    
-    # --- LOG: Identificação de Features ---
-    colunas_numericas_relevantes = list(pesos_numericos.keys())
-    colunas_categoricas_relevantes = list(set([k.rsplit('_', 1)[0] for k in pesos_categoricos.keys()]))
-    colunas_numericas_presentes = [col for col in colunas_numericas_relevantes if col in df_segmento.columns]
-    colunas_categoricas_presentes = [col for col in colunas_categoricas_relevantes if col in df_segmento.columns]
-    
-    print(f"   [LOG] Features Numéricas Identificadas: {colunas_numericas_presentes}")
-    print(f"   [LOG] Features Categóricas Identificadas: {colunas_categoricas_presentes}")
-    
-    df_features = df_segmento[colunas_numericas_presentes + colunas_categoricas_presentes].copy()
-
-    # --- Pré-processamento Robusto ---
-    if colunas_numericas_presentes:
-        imputer = SimpleImputer(strategy='mean')
-        df_features.loc[:, colunas_numericas_presentes] = imputer.fit_transform(df_features[colunas_numericas_presentes])
-        print("   [LOG] Imputação de dados numéricos ausentes concluída.")
-
-    df_categoricas_encoded = pd.get_dummies(df_features[colunas_categoricas_presentes])
-    
-    df_numericas_scaled = pd.DataFrame(index=df_features.index)
-    if colunas_numericas_presentes:
-        numeric_data = df_features[colunas_numericas_presentes]
-        colunas_com_variancia = numeric_data.columns[numeric_data.var() > 0]
-        
-        if not colunas_com_variancia.empty:
-            scaler = StandardScaler()
-            scaled_data = scaler.fit_transform(numeric_data[colunas_com_variancia])
-            df_numericas_scaled = pd.DataFrame(scaled_data, columns=colunas_com_variancia, index=df_features.index)
-            print("   [LOG] Padronização (scaling) das features numéricas concluída.")
-        else:
-            print("   [LOG] Nenhuma feature numérica com variância para padronizar.")
-
-    df_processado = pd.concat([df_numericas_scaled, df_categoricas_encoded], axis=1)
-    print(f"   [LOG] DataFrame final para scoring criado com {df_processado.shape[0]} linhas e {df_processado.shape[1]} colunas.")
-
-    # --- Cálculo do Score ---
-    score_bruto = pd.Series(0, index=df_processado.index, dtype=float)
-    todos_pesos = {**pesos_numericos, **pesos_categoricos}
-    for feature, peso in todos_pesos.items():
-        if feature in df_processado.columns:
-            score_bruto += df_processado[feature] * peso
-    
-    print(f"   [LOG] Score bruto calculado. Resumo: Mín={score_bruto.min():.2f}, Média={score_bruto.mean():.2f}, Máx={score_bruto.max():.2f}")
-            
-    if score_bruto.var() == 0:
-        probabilidade = np.full(shape=len(score_bruto), fill_value=0.5)
-        print("   [LOG] Variância do score é zero. Probabilidade definida como 0.5 para todos.")
-    else:
-        scaler_score = StandardScaler()
-        scores_padronizados = scaler_score.fit_transform(score_bruto.values.reshape(-1, 1))
-        probabilidade = 1 / (1 + np.exp(-scores_padronizados))
-        print("   [LOG] Score convertido para probabilidade via função sigmoide.")
-
-    df_resultado_segmento = df_segmento.copy()
-    df_resultado_segmento['score_ranking_bruto'] = score_bruto
-    df_resultado_segmento['score_recuperacao'] = probabilidade
-    
-    return df_resultado_segmento
-
-# --- Função Principal de Orquestração (Inalterada) ---
-def gerar_score_recuperacao(df_prospects: pd.DataFrame, caminho_pesos: str = "Control/Score_Manual/pesos.json") -> pd.DataFrame:
+def compilar_pesos(configuracao: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Compila a configuração de pesos em um vetor alinhado por segmento.
+
+    As posições do vetor 'pesos' seguem a ordem das colunas da matriz de features: primeiro
+    as numéricas, depois uma posição por categoria com peso ('estado_civil_CASADO' ->
+    coluna 'estado_civil', valor 'CASADO').
+
+    Returns:
+        dict: segmento -> {'numericas': [colunas], 'categoricas': {coluna: {valor: posição}},
+            'pesos': np.ndarray}.
+    """
+    compilado = {}
+    for segmento, config_segmento in configuracao.items():
+        pesos_numericos = config_segmento.get('pesos_numericos', {})
+        pesos = list(pesos_numericos.values())
+        categoricas = {}
+        for chave, peso in config_segmento.get('pesos_categoricos', {}).items():
+            coluna, categoria = chave.rsplit('_', 1)
+            categoricas.setdefault(coluna, {})[categoria] = len(pesos)
+            pesos.append(peso)
+        compilado[segmento] = {"numericas": list(pesos_numericos), "categoricas": categoricas,
+                               "pesos": np.array(pesos, dtype=np.float64)}
+    return compilado
+
+def carregar_pesos_compilados(caminho_pesos: str = CAMINHO_PESOS_PADRAO) -> Dict[str, Dict[str, Any]]:
+    """Carrega e compila o arquivo de pesos uma única vez por versão (mtime e tamanho) do arquivo."""
+    estado = os.stat(caminho_pesos)
+    chave = (caminho_pesos, estado.st_mtime_ns, estado.st_size)
+    return _cache_pesos.obter_ou_calcular(chave, lambda: compilar_pesos(carregar_configuracao_pesos(caminho_pesos)))
+
+def _valores_numericos(df_segmento: pd.DataFrame, numericas: list) -> np.ndarray:
+    """Matriz (linhas x features numéricas) em float64; colunas ausentes no DataFrame ficam vazias (NaN)."""
+    valores = np.full((len(df_segmento), len(numericas)), np.nan)
+    for indice, coluna in enumerate(numericas):
+        if coluna in df_segmento.columns:
+            valores[:, indice] = pd.to_numeric(df_segmento[coluna], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return valores
+
+def matriz_segmento(df_segmento: pd.DataFrame, compilado: Dict[str, Any], medias: np.ndarray,
+                    desvios: np.ndarray) -> np.ndarray:
+    """
+    Matriz de features do segmento, alinhada às linhas de compilado['pesos'].
+
+    A matriz é montada já contígua: as numéricas imputadas pela média e padronizadas, e
+    as categorias com peso em colunas indicadoras (1 quando a linha tem aquele valor),
+    sem get_dummies.
+    """
+    n_numericas = len(compilado["numericas"])
+    matriz = np.zeros((len(df_segmento), len(compilado["pesos"])))
+    valores = _valores_numericos(df_segmento, compilado["numericas"])
+    com_variancia = desvios > 0
+    matriz[:, :n_numericas] = np.where(com_variancia, (valores - medias) / np.where(com_variancia, desvios, 1), 0)
+    matriz[:, :n_numericas][np.isnan(valores)] = 0
+
+    for coluna, posicoes in compilado["categoricas"].items():
+        if coluna not in df_segmento.columns:
+            continue
+        # Traduz só os valores distintos da coluna para a posição da categoria (-1 = sem peso).
+        codigos, distintos = pd.factorize(df_segmento[coluna])
+        destino = np.array([posicoes.get(str(valor), -1) for valor in distintos] + [-1], dtype=np.intp)
+        colunas = destino[codigos]
+        linhas = np.flatnonzero(colunas >= 0)
+        matriz[linhas, colunas[linhas]] = 1.0
+    return matriz
+
+def score_bruto_segmento(df_segmento: pd.DataFrame, compilado: Dict[str, Any], medias: np.ndarray,
+                         desvios: np.ndarray) -> np.ndarray:
+    """Score bruto do segmento como um único produto matriz x vetor (ou matriz x matriz, com uma coluna de pesos por configuração)."""
+    return matriz_segmento(df_segmento, compilado, medias, desvios) @ compilado["pesos"]
+
+def _probabilidade(score_bruto: np.ndarray, media: float, desvio: float) -> np.ndarray:
+    """Sigmoide do score padronizado pela normalização do perfil; sem variância, todos recebem 0.5."""
+    if desvio == 0:
+        logger.warning("Variância do score é zero. Probabilidade definida como 0.5 para todos.")
+        return np.full(len(score_bruto), 0.5)
+    return 1 / (1 + np.exp(-(score_bruto - media) / desvio))
+
+def _particionar(df_prospects: pd.DataFrame) -> tuple:
+    """
+    Reordena a carteira uma única vez (PF e depois PJ, cada um na ordem de entrada;
+    linhas sem segmento são descartadas), com a coluna categórica 'tipo_pessoa'
+    (reaproveitada se a carteira já foi anotada por Documento.anotar_tipo_pessoa).
+
+    Returns:
+        tuple: (DataFrame reordenado, fronteiras), com o segmento i em [fronteiras[i], fronteiras[i + 1]).
+    """
+    codigos = Documento.tipo_pessoa(df_prospects).cat.codes.to_numpy()
+    ordem = np.argsort(codigos, kind='stable')
+    ordem = ordem[codigos[ordem] >= 0]
+    fronteiras = np.searchsorted(codigos[ordem], np.arange(len(SEGMENTOS) + 1))
+
+    df_final = df_prospects.take(ordem).reset_index(drop=True)
+    df_final['tipo_pessoa'] = pd.Categorical.from_codes(codigos[ordem], categories=list(SEGMENTOS))
+    return df_final, fronteiras
+
+def _segmentos(df_final: pd.DataFrame, fronteiras: np.ndarray, configuracao: Dict[str, Any]):
+    """Percorre os segmentos não vazios da carteira particionada: (segmento, pesos compilados, início, fim)."""
+    for indice, segmento in enumerate(SEGMENTOS):
+        inicio, fim = fronteiras[indice], fronteiras[indice + 1]
+        if fim > inicio:
+            yield segmento, configuracao.get(segmento) or compilar_pesos({segmento: {}})[segmento], inicio, fim
+
+# --- Perfil de Scoring ---
+# O perfil guarda, por segmento, os momentos (n, média, M2) de cada feature numérica
+# (só dos valores presentes), o total de linhas e os momentos do score bruto. A
+# padronização deixa de depender do lote pontuado: o perfil é ajustado uma vez (ou
+# atualizado lote a lote, juntando os momentos) e aplicado a qualquer quantidade de linhas.
+
+def mesclar_momentos(atual: tuple, valores: np.ndarray) -> tuple:
+    """
+    Junta (n, média, M2) de um lote de valores aos momentos acumulados (fórmula de Chan).
+    Com uma matriz, os momentos são por coluna.
+    """
+    n, media, m2 = atual
+    n_lote = len(valores)
+    if n_lote == 0:
+        return tuple(atual)
+    media_lote = valores.mean(axis=0)
+    m2_lote = np.sum((valores - media_lote) ** 2, axis=0)
+    total = n + n_lote
+    delta = media_lote - media
+    return total, media + delta * n_lote / total, m2 + m2_lote + delta ** 2 * n * n_lote / total
+
+def assinatura_pesos(configuracao: Dict[str, Any]) -> str:
+    """Impressão digital dos pesos compilados; um perfil só vale para os pesos com que foi ajustado."""
+    return Cache.impressao_digital(*[(segmento, compilado["numericas"], compilado["categoricas"], compilado["pesos"].tolist())
+                                     for segmento, compilado in sorted(configuracao.items())])
+
+def perfil_vazio(caminho_pesos: str = CAMINHO_PESOS_PADRAO) -> Dict[str, Any]:
+    """Perfil sem nenhuma linha acumulada, para os pesos informados."""
+    return {
+        "assinatura_pesos": assinatura_pesos(carregar_pesos_compilados(caminho_pesos)),
+        "segmentos": {segmento: {"linhas": 0, "numericas": {}, "score": (0, 0.0, 0.0)} for segmento in SEGMENTOS},
+    }
+
+def _acumular_features(perfil_segmento: Dict[str, Any], df_segmento: pd.DataFrame, compilado: Dict[str, Any]):
+    valores = _valores_numericos(df_segmento, compilado["numericas"])
+    perfil_segmento["linhas"] += len(valores)
+    for indice, coluna in enumerate(compilado["numericas"]):
+        presentes = valores[~np.isnan(valores[:, indice]), indice]
+        perfil_segmento["numericas"][coluna] = mesclar_momentos(
+            perfil_segmento["numericas"].get(coluna, (0, 0.0, 0.0)), presentes)
+
+def estatisticas_segmento(perfil_segmento: Dict[str, Any], compilado: Dict[str, Any]) -> tuple:
+    """
+    Média e desvio padrão de cada feature numérica, alinhados a compilado['numericas'].
+
+    O desvio é o populacional após imputar os ausentes pela média (a imputação mantém a
+    média e não soma nada ao M2, então basta dividir pelo total de linhas). Features sem
+    valores ou sem variância recebem desvio 0 e ficam fora do score.
+    """
+    linhas = perfil_segmento["linhas"]
+    momentos = [perfil_segmento["numericas"].get(coluna, (0, 0.0, 0.0)) for coluna in compilado["numericas"]]
+    medias = np.array([media for _, media, _ in momentos], dtype=np.float64)
+    desvios = np.array([np.sqrt(m2 / linhas) if n > 0 and linhas > 1 else 0.0 for n, _, m2 in momentos],
+                       dtype=np.float64)
+    return medias, desvios
+
+def normalizacao_score(perfil_segmento: Dict[str, Any]) -> tuple:
+    """Média e desvio padrão (populacional) do score bruto acumulado no segmento."""
+    n, media, m2 = perfil_segmento["score"]
+    return media, float(np.sqrt(m2 / n)) if n else 0.0
+
+def acumular_features(perfil: Dict[str, Any], df_prospects: pd.DataFrame, caminho_pesos: str = CAMINHO_PESOS_PADRAO):
+    """Junta ao perfil (no lugar) os momentos das features numéricas de um lote."""
+    configuracao = carregar_pesos_compilados(caminho_pesos)
+    df_final, fronteiras = _particionar(df_prospects)
+    for segmento, compilado, inicio, fim in _segmentos(df_final, fronteiras, configuracao):
+        _acumular_features(perfil["segmentos"][segmento], df_final.iloc[inicio:fim], compilado)
+
+def acumular_scores(perfil: Dict[str, Any], df_prospects: pd.DataFrame, caminho_pesos: str = CAMINHO_PESOS_PADRAO):
+    """Junta ao perfil (no lugar) os momentos do score bruto de um lote, padronizado pelas features atuais do perfil."""
+    configuracao = carregar_pesos_compilados(caminho_pesos)
+    df_final, fronteiras = _particionar(df_prospects)
+    for segmento, compilado, inicio, fim in _segmentos(df_final, fronteiras, configuracao):
+        perfil_segmento = perfil["segmentos"][segmento]
+        score = score_bruto_segmento(df_final.iloc[inicio:fim], compilado, *estatisticas_segmento(perfil_segmento, compilado))
+        perfil_segmento["score"] = mesclar_momentos(perfil_segmento["score"], score)
+
+def atualizar_perfil(perfil: Dict[str, Any], df_prospects: pd.DataFrame,
+                     caminho_pesos: str = CAMINHO_PESOS_PADRAO) -> Dict[str, Any]:
+    """
+    Novo perfil com um lote a mais: primeiro os momentos das features, depois os do score
+    bruto do lote, já padronizado com as features atualizadas. Partindo de um perfil vazio,
+    reproduz exatamente as estatísticas que seriam ajustadas no próprio lote.
+    """
+    perfil = copy.deepcopy(perfil)
+    acumular_features(perfil, df_prospects, caminho_pesos)
+    acumular_scores(perfil, df_prospects, caminho_pesos)
+    return perfil
+
+def ajustar_perfil(df_prospects: pd.DataFrame, caminho_pesos: str = CAMINHO_PESOS_PADRAO) -> Dict[str, Any]:
+    """Ajusta um perfil de scoring a uma carteira de referência."""
+    return atualizar_perfil(perfil_vazio(caminho_pesos), df_prospects, caminho_pesos)
+
+def salvar_perfil(perfil: Dict[str, Any], caminho_perfil: str = CAMINHO_PERFIL_PADRAO) -> str:
+    """Grava o perfil em JSON (por padrão ao lado do pesos.json)."""
+    with open(caminho_perfil, 'w', encoding='utf-8') as f:
+        json.dump(perfil, f, indent=4)
+    return caminho_perfil
+
+def carregar_perfil(caminho_perfil: str = CAMINHO_PERFIL_PADRAO) -> Dict[str, Any]:
+    """Carrega o perfil uma única vez por versão (mtime e tamanho) do arquivo."""
+    estado = os.stat(caminho_perfil)
+    chave = (caminho_perfil, estado.st_mtime_ns, estado.st_size)
+
+    def carregar():
+        with open(caminho_perfil, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    return _cache_perfis.obter_ou_calcular(chave, carregar)
+
+def carregar_perfil_valido(caminho_perfil: str = CAMINHO_PERFIL_PADRAO, caminho_pesos: str = CAMINHO_PESOS_PADRAO):
+    """O perfil gravado, ou None se não houver arquivo ou se ele foi ajustado com outros pesos."""
+    if not caminho_perfil or not os.path.exists(caminho_perfil):
+        return None
+    perfil = carregar_perfil(caminho_perfil)
+    if perfil.get("assinatura_pesos") != assinatura_pesos(carregar_pesos_compilados(caminho_pesos)):
+        logger.warning("Perfil '%s' foi ajustado com outros pesos e será ignorado.", caminho_perfil)
+        return None
+    return perfil
+
+def _pontuar_particao(df_final: pd.DataFrame, fronteiras: np.ndarray, configuracao: Dict[str, Any],
+                      perfil: Dict[str, Any], ajustar: bool = False):
+    """
+    Preenche o score bruto e a probabilidade de cada segmento da carteira particionada.
+    Com 'ajustar', o perfil (vazio) é ajustado no próprio lote antes de pontuá-lo.
+    """
+    score_bruto = np.zeros(len(df_final))
+    probabilidade = np.zeros(len(df_final))
+    for segmento, compilado, inicio, fim in _segmentos(df_final, fronteiras, configuracao):
+        with Telemetria.etapa(f"pontuar_{segmento}", fim - inicio):
+            df_segmento = df_final.iloc[inicio:fim]
+            perfil_segmento = perfil["segmentos"][segmento]
+            if ajustar:
+                _acumular_features(perfil_segmento, df_segmento, compilado)
+            score_bruto[inicio:fim] = score_bruto_segmento(df_segmento, compilado,
+                                                           *estatisticas_segmento(perfil_segmento, compilado))
+            if ajustar:
+                perfil_segmento["score"] = mesclar_momentos(perfil_segmento["score"], score_bruto[inicio:fim])
+            probabilidade[inicio:fim] = _probabilidade(score_bruto[inicio:fim], *normalizacao_score(perfil_segmento))
+    df_final['score_ranking_bruto'] = score_bruto
+    df_final['score_recuperacao'] = probabilidade
+
+def aplicar_perfil(df_prospects: pd.DataFrame, perfil: Dict[str, Any],
+                   caminho_pesos: str = CAMINHO_PESOS_PADRAO) -> pd.DataFrame:
+    """
+    Pontua um lote (de qualquer tamanho, inclusive uma linha) com as estatísticas do
+    perfil, sem reajustá-las.
+
+    Returns:
+        pd.DataFrame: O lote particionado (PF e depois PJ) com 'tipo_pessoa', 'score_ranking_bruto' e 'score_recuperacao'.
+    """
+    configuracao = carregar_pesos_compilados(caminho_pesos)
+    df_final, fronteiras = _particionar(df_prospects)
+    _pontuar_particao(df_final, fronteiras, configuracao, perfil)
+    return df_final
+
+# --- Função Principal de Orquestração ---
+def gerar_score_recuperacao(df_prospects: pd.DataFrame, caminho_pesos: str = CAMINHO_PESOS_PADRAO,
+                            caminho_perfil: str = CAMINHO_PERFIL_PADRAO) -> pd.DataFrame:
     """
     Orquestra o processo de scoring, segmentando os prospects em PF e PJ.
+
+    A carteira é reordenada uma única vez (PF e depois PJ, cada um na ordem de entrada;
+    linhas sem segmento são descartadas) e cada segmento é uma fatia contígua dela. A
+    padronização usa o perfil de scoring gravado em 'caminho_perfil', de modo que o score
+    de um prospect não depende dos demais do lote; sem perfil válido (ou com
+    caminho_perfil=None), as estatísticas são ajustadas no próprio lote.
     """
-    configuracao_completa = _carregar_configuracao_pesos(caminho_pesos)
-    df_trabalho = df_prospects.copy()
+    configuracao = carregar_pesos_compilados(caminho_pesos)
+    perfil = carregar_perfil_valido(caminho_perfil, caminho_pesos)
+    ajustar = perfil is None
+    if ajustar:
+        perfil = perfil_vazio(caminho_pesos)
+
+    with Telemetria.etapa("particionar", len(df_prospects)):
+        df_final, fronteiras = _particionar(df_prospects)
+    for indice, segmento in enumerate(SEGMENTOS):
+        logger.info("Processando %d %s com o modelo %s...", fronteiras[indice + 1] - fronteiras[indice],
+                    'CPFs' if segmento == 'pf' else 'CNPJs', segmento.upper())
+    _pontuar_particao(df_final, fronteiras, configuracao, perfil, ajustar)
+    if logger.isEnabledFor(logging.DEBUG):
+        for segmento, _, inicio, fim in _segmentos(df_final, fronteiras, configuracao):
+            score_bruto = df_final['score_ranking_bruto'].to_numpy()[inicio:fim]
+            logger.debug("Score bruto %s calculado. Resumo: Mín=%.2f, Média=%.2f, Máx=%.2f", segmento.upper(),
+                         score_bruto.min(), score_bruto.mean(), score_bruto.max())
+
+    Exportacao.exportar("DF_FINAL", df_final)
+
+    with Telemetria.etapa("ordenar", len(df_final)):
+        return df_final.sort_values(by='score_recuperacao', ascending=False)
+
+# --- Análise de Sensibilidade dos Pesos ---
+
+def compilar_pilha_pesos(configuracoes: list) -> Dict[str, Dict[str, Any]]:
+    """
+    Compila várias configurações de pesos (no formato do pesos.json) sobre as mesmas
+    features: por segmento, a união das numéricas e das categorias com peso em qualquer
+    configuração, e uma matriz 'pesos' (features x configurações) com zero onde a
+    configuração não usa a feature.
+    """
+    compilados = [compilar_pesos(configuracao) for configuracao in configuracoes]
+    pilha = {}
+    for segmento in SEGMENTOS:
+        por_configuracao = [compilado.get(segmento) or compilar_pesos({segmento: {}})[segmento] for compilado in compilados]
+        numericas = list(dict.fromkeys(coluna for compilado in por_configuracao for coluna in compilado["numericas"]))
+        categoricas, posicao = {}, len(numericas)
+        for compilado in por_configuracao:
+            for coluna, posicoes in compilado["categoricas"].items():
+                for valor in posicoes:
+                    if valor not in categoricas.setdefault(coluna, {}):
+                        categoricas[coluna][valor] = posicao
+                        posicao += 1
+
+        pesos = np.zeros((posicao, len(compilados)))
+        for indice, compilado in enumerate(por_configuracao):
+            for posicao_original, coluna in enumerate(compilado["numericas"]):
+                pesos[numericas.index(coluna), indice] = compilado["pesos"][posicao_original]
+            for coluna, posicoes in compilado["categoricas"].items():
+                for valor, posicao_original in posicoes.items():
+                    pesos[categoricas[coluna][valor], indice] = compilado["pesos"][posicao_original]
+        pilha[segmento] = {"numericas": numericas, "categoricas": categoricas, "pesos": pesos}
+    return pilha
+
+def _fatias(n_linhas: int, linhas_por_fatia: int):
+    for inicio in range(0, n_linhas, linhas_por_fatia):
+        yield slice(inicio, min(inicio + linhas_por_fatia, n_linhas))
+
+def avaliar_configuracoes(df_prospects: pd.DataFrame, configuracoes, caminho_pesos: str = CAMINHO_PESOS_PADRAO,
+                          linhas_por_fatia: int = LINHAS_POR_FATIA_SENSIBILIDADE,
+                          amostra_spearman: int = AMOSTRA_SPEARMAN, seed: int = 0) -> pd.DataFrame:
+    """
+    Pontua a carteira com K configurações de pesos de uma vez e resume cada uma.
+
+    A matriz de features de cada segmento é montada uma única vez (com a união das
+    features de todas as configurações) e multiplicada pela matriz de pesos (features x
+    K), fatia a fatia. Todas as configurações, inclusive a base, são padronizadas na
+    própria carteira avaliada (como gerar_score_recuperacao sem perfil), para que as
+    diferenças venham só dos pesos.
+
+    Args:
+        df_prospects (pd.DataFrame): A carteira.
+        configuracoes (dict | list): Configurações no formato do pesos.json, por nome (ou em lista).
+        caminho_pesos (str): Configuração base, a primeira linha do resultado ('base').
+        amostra_spearman (int): Acima dessa quantidade de prospects, a correlação usa uma amostra fixa.
+
+    Returns:
+        pd.DataFrame: Uma linha por configuração: 'valor_esperado' (soma de score x valor da
+            dívida, em R$), 'variacao_valor_esperado' (em relação à base), contagem e valor
+            (R$) de cada rank A-D e 'spearman' (correlação de postos dos scores com a base).
+    """
+    if not isinstance(configuracoes, dict):
+        configuracoes = {f"configuracao_{indice + 1}": configuracao for indice, configuracao in enumerate(configuracoes)}
+    nomes = ['base'] + list(configuracoes)
+    pilha = compilar_pilha_pesos([carregar_configuracao_pesos(caminho_pesos)] + list(configuracoes.values()))
+    k = len(nomes)
+    # Limites inferiores dos ranks C, B e A: a contagem de cada rank sai da diferença entre "acima de" consecutivos.
+    limites = [LIMITES_RANKS[rank][0] for rank in ('C', 'B', 'A')]
+
+    df_final, fronteiras = _particionar(df_prospects)
+    valores_divida = pd.to_numeric(df_final['valor_divida_mil'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    valores_divida = np.nan_to_num(valores_divida) * 1000
+    rng = np.random.default_rng(seed)
+    amostra = np.zeros(len(df_final), dtype=bool)
+    amostra[rng.choice(len(df_final), size=min(amostra_spearman, len(df_final)), replace=False)] = True
+
+    valor_esperado = np.zeros(k)
+    contagem_acima = np.zeros((len(limites), k))
+    valor_acima = np.zeros((len(limites), k))
+    scores_amostra = []
+    for segmento, compilado, inicio, fim in _segmentos(df_final, fronteiras, pilha):
+        df_segmento = df_final.iloc[inicio:fim]
+        perfil_segmento = {"linhas": 0, "numericas": {}, "score": (0, 0.0, 0.0)}
+        _acumular_features(perfil_segmento, df_segmento, compilado)
+        matriz = matriz_segmento(df_segmento, compilado, *estatisticas_segmento(perfil_segmento, compilado))
+        pesos = compilado["pesos"]
+
+        # Média e desvio do score bruto (matriz @ pesos) de cada configuração, direto da
+        # média e da covariância das features, sem calcular os scores.
+        medias_features = matriz.mean(axis=0)
+        centrada = matriz - medias_features
+        covariancia = centrada.T @ centrada / len(matriz)
+        media = medias_features @ pesos
+        desvio = np.sqrt(np.maximum(np.einsum('fk,fg,gk->k', pesos, covariancia, pesos), 0))
+        sem_variancia = desvio == 0
+        desvio[sem_variancia] = 1
+
+        valores_segmento = valores_divida[inicio:fim]
+        amostra_segmento = amostra[inicio:fim]
+        for fatia in _fatias(len(matriz), linhas_por_fatia):
+            # Sigmoide do score padronizado, calculada no lugar (linhas x configurações).
+            probabilidade = matriz[fatia] @ pesos
+            probabilidade -= media
+            probabilidade /= desvio
+            np.negative(probabilidade, out=probabilidade)
+            np.exp(probabilidade, out=probabilidade)
+            probabilidade += 1
+            np.reciprocal(probabilidade, out=probabilidade)
+            probabilidade[:, sem_variancia] = 0.5
 
-    df_trabalho['tipo_pessoa'] = df_trabalho['documento'].str.replace(r'\D', '', regex=True).str.len().map({11: 'pf', 14: 'pj'})
+            valor_esperado += valores_segmento[fatia] @ probabilidade
+            for indice, limite in enumerate(limites):
+                acima = probabilidade >= limite
+                contagem_acima[indice] += np.count_nonzero(acima, axis=0)
+                valor_acima[indice] += valores_segmento[fatia] @ acima.astype(np.float64)
+            scores_amostra.append(probabilidade[amostra_segmento[fatia]])
 
-    df_pf = df_trabalho[df_trabalho['tipo_pessoa'] == 'pf'].copy()
-    df_pj = df_trabalho[df_trabalho['tipo_pessoa'] == 'pj'].copy()
+    # Correlação de Spearman: correlação de Pearson dos postos (com empates pela média).
+    scores_amostra = np.concatenate(scores_amostra) if scores_amostra else np.zeros((0, k))
+    postos = rankdata(np.ascontiguousarray(scores_amostra.T), axis=1)
+    centrados = postos - postos.mean(axis=1, keepdims=True)
+    normas = np.sqrt((centrados ** 2).sum(axis=1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spearman = centrados @ centrados[0] / (normas * normas[0])
 
-    print(f"Processando {len(df_pf)} CPFs com o modelo PF...")
-    resultado_pf = _calcular_score_segmento(df_pf, configuracao_completa.get('pf', {}))
-    
-    print(f"Processando {len(df_pj)} CNPJs com o modelo PJ...")
-    resultado_pj = _calcular_score_segmento(df_pj, configuracao_completa.get('pj', {}))
+    total_contagem = len(df_final)
+    total_valor = valores_divida.sum()
+    # Prospects e valor acima de cada limite (C, B, A), com o total da carteira abaixo de todos.
+    contagem_acima = np.vstack([np.full(k, total_contagem), contagem_acima, np.zeros(k)])
+    valor_acima = np.vstack([np.full(k, total_valor), valor_acima, np.zeros(k)])
 
-    df_final = pd.concat([resultado_pf, resultado_pj], ignore_index=True)
-    
-    df_final.to_csv("DF_FINAL.csv")
-    
-    return df_final.sort_values(by='score_recuperacao', ascending=False)
\ No newline at end of file
+    resultado = pd.DataFrame({'valor_esperado': valor_esperado,
+                              'variacao_valor_esperado': valor_esperado - valor_esperado[0]},
+                             index=pd.Index(nomes, name='configuracao'))
+    for posicao, rank in enumerate(('D', 'C', 'B', 'A')):
+        resultado[f'rank_{rank}_contagem'] = (contagem_acima[posicao] - contagem_acima[posicao + 1]).astype(np.int64)
+        resultado[f'rank_{rank}_valor'] = valor_acima[posicao] - valor_acima[posicao + 1]
+    resultado['spearman'] = spearman
+    return resultado[['valor_esperado', 'variacao_valor_esperado']
+                     + [f'rank_{rank}_{medida}' for rank in LIMITES_RANKS for medida in ('contagem', 'valor')]
+                     + ['spearman']]
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+import Control.Servico.servidor as Servidor
+
+# --- Constantes do Gerador de Carga ---
+PEDIDOS_PADRAO = 2000
+CONEXOES_PADRAO = 32
+
+# --- Cliente HTTP ---
+
+class ConexaoScore:
+    """Conexão HTTP/1.1 persistente (keep-alive) com o serviço de score."""
+
+    def __init__(self, host: str = Servidor.HOST_PADRAO, porta: int = Servidor.PORTA_PADRAO):
+        self.host = host
+        self.porta = porta
+        self._leitor = None
+        self._escritor = None
+
+    async def abrir(self):
+        self._leitor, self._escritor = await asyncio.open_connection(self.host, self.porta)
+
+    async def fechar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+            await self._escritor.wait_closed()
+
+    async def pedir(self, metodo: str, rota: str, conteudo=None) -> tuple:
+        """Envia um pedido e devolve (status, resposta JSON)."""
+        corpo = b"" if conteudo is None else json.dumps(conteudo).encode()
+        self._escritor.write(f"{metodo} {rota} HTTP/1.1\r\nHost: {self.host}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(corpo)}\r\n\r\n".encode() + corpo)
+        await self._escritor.drain()
+
+        status = int((await self._leitor.readline()).split()[1])
+        tamanho = 0
+        while True:
+            linha = await self._leitor.readline()
+            if linha in (b"\r\n", b"\n", b""):
+                break
+            nome, _, valor = linha.decode("latin-1").partition(":")
+            if nome.strip().lower() == "content-length":
+                tamanho = int(valor)
+        return status, json.loads(await self._leitor.readexactly(tamanho))
+
+# --- Gerador de Carga ---
+
+async def gerar_carga(registros: list, n_pedidos: int = PEDIDOS_PADRAO, conexoes: int = CONEXOES_PADRAO,
+                      host: str = Servidor.HOST_PADRAO, porta: int = Servidor.PORTA_PADRAO) -> Dict[str, Any]:
+    """
+    Envia 'n_pedidos' pedidos de um prospect cada, por 'conexoes' conexões simultâneas,
+    ciclando pelos 'registros'.
+
+    Returns:
+        dict: Latência p50/p99 (ms) medida no cliente, pedidos por segundo, erros e as
+            métricas informadas pelo servidor ('servidor').
+    """
+    latencias = np.empty(n_pedidos)
+    erros = 0
+    proximo = 0
+
+    async def trabalhador():
+        nonlocal erros, proximo
+        conexao = ConexaoScore(host, porta)
+        await conexao.abrir()
+        try:
+            while proximo < n_pedidos:
+                indice, proximo = proximo, proximo + 1
+                inicio = time.perf_counter()
+                status, _ = await conexao.pedir("POST", "/score", registros[indice % len(registros)])
+                latencias[indice] = (time.perf_counter() - inicio) * 1000
+                erros += status != 200
+        finally:
+            await conexao.fechar()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(min(conexoes, n_pedidos))))
+    segundos = time.perf_counter() - inicio
+
+    conexao = ConexaoScore(host, porta)
+    await conexao.abrir()
+    _, metricas_servidor = await conexao.pedir("GET", "/metricas")
+    await conexao.fechar()
+
+    p50, p99 = np.percentile(latencias, [50, 99])
+    return {
+        "pedidos": n_pedidos,
+        "conexoes": conexoes,
+        "erros": erros,
+        "segundos": segundos,
+        "pedidos_por_segundo": n_pedidos / segundos,
+        "latencia_p50_ms": float(p50),
+        "latencia_p99_ms": float(p99),
+        "servidor": metricas_servidor,
+    }
+
+def carregar_registros(caminho: str, limite: int = 1000) -> list:
+    """Lê até 'limite' prospects de um CSV como dicionários prontos para JSON (ausentes viram null)."""
+    df = pd.read_csv(caminho, nrows=limite)
+    return json.loads(df.to_json(orient="records"))
+
+# --- Execução ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de carga local para o serviço de score.")
+    parser.add_argument("--dados", default="base_full.csv")
+    parser.add_argument("--host", default=Servidor.HOST_PADRAO)
+    parser.add_argument("--porta", type=int, default=Servidor.PORTA_PADRAO)
+    parser.add_argument("--pedidos", type=int, default=PEDIDOS_PADRAO)
+    parser.add_argument("--conexoes", type=int, default=CONEXOES_PADRAO)
+    args = parser.parse_args()
+    resultado = asyncio.run(gerar_carga(carregar_registros(args.dados), args.pedidos, args.conexoes,
+                                        args.host, args.porta))
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
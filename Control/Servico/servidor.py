@@ -0,0 +1,325 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+import Control.Zoro              as Zoro
+import Control.XGboost.encoder  as Encoder
+import Control.XGboost.registro as Registro
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes do Serviço ---
+HOST_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8765
+# Janela de espera (ms) para juntar pedidos concorrentes em um mesmo lote.
+ESPERA_MAXIMA_MS = 5.0
+# Máximo de prospects por lote enviado ao modelo.
+LOTE_MAXIMO = 256
+# Quantas latências recentes entram no cálculo dos percentis.
+JANELA_LATENCIAS = 10_000
+# Tamanho máximo aceito para o corpo de um pedido (bytes).
+MAX_CORPO = 1024 * 1024
+
+_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+# --- Validação ---
+
+class ProspectInvalido(ValueError):
+    """Prospect com valor que o modelo não aceita; vira 400 para quem o enviou."""
+
+def colunas_numericas_modelo(caminho_modelo: str) -> list:
+    """Colunas numéricas que o modelo lê dos prospects."""
+    artefatos = Registro.carregar_artefatos(caminho_modelo)
+    encoder = artefatos.get('encoder') or Encoder.compilar_encoder(artefatos['columns'])
+    return list(encoder["numericas"])
+
+def validar_prospect(registro: Dict[str, Any], colunas_numericas: list) -> Dict[str, Any]:
+    """
+    Converte as colunas numéricas do prospect para float (texto numérico é aceito; null
+    vira ausente) antes de ele entrar em um lote, para que um prospect inválido não
+    derrube os demais pedidos do mesmo micro-lote.
+
+    Raises:
+        ProspectInvalido: Se alguma coluna numérica tiver um valor não numérico.
+    """
+    convertido = dict(registro)
+    for coluna in colunas_numericas:
+        valor = registro.get(coluna)
+        if valor is None:
+            continue
+        if isinstance(valor, bool) or not isinstance(valor, (int, float, str)):
+            raise ProspectInvalido(f"Coluna '{coluna}': valor não numérico {valor!r}.")
+        try:
+            convertido[coluna] = float(valor)
+        except ValueError:
+            raise ProspectInvalido(f"Coluna '{coluna}': valor não numérico {valor!r}.") from None
+    return convertido
+
+# --- Métricas ---
+
+class Metricas:
+    """Latências (ms) dos pedidos mais recentes e tamanhos dos lotes processados."""
+
+    def __init__(self, janela: int = JANELA_LATENCIAS):
+        self.latencias = deque(maxlen=janela)
+        self.pedidos = 0
+        self.erros = 0
+        self.lotes = 0
+        self.prospects = 0
+
+    def registrar_pedido(self, latencia_ms: float, erro: bool = False):
+        self.pedidos += 1
+        self.erros += erro
+        self.latencias.append(latencia_ms)
+
+    def registrar_lote(self, tamanho: int):
+        self.lotes += 1
+        self.prospects += tamanho
+
+    def resumo(self) -> Dict[str, Any]:
+        """Contagens, p50/p99 da latência (ms) e tamanho médio do lote."""
+        latencias = np.fromiter(self.latencias, dtype=np.float64)
+        p50, p99 = np.percentile(latencias, [50, 99]) if len(latencias) else (float("nan"), float("nan"))
+        return {
+            "pedidos": self.pedidos,
+            "erros": self.erros,
+            "lotes": self.lotes,
+            "lote_medio": self.prospects / self.lotes if self.lotes else 0.0,
+            "latencia_p50_ms": float(p50),
+            "latencia_p99_ms": float(p99),
+        }
+
+# --- Micro-lotes ---
+
+class AgrupadorLotes:
+    """
+    Junta os prospects de pedidos concorrentes em micro-lotes.
+
+    O primeiro prospect que chega abre uma janela de 'espera_ms'; o lote é enviado ao
+    modelo quando a janela fecha ou quando atinge 'lote_maximo'. A predição roda fora do
+    loop de eventos (em uma thread), então novos pedidos continuam sendo recebidos e
+    formam o próximo lote enquanto o atual é pontuado. Se o lote falhar, os prospects
+    são pontuados um a um e só os que falharem recebem o erro.
+    """
+
+    def __init__(self, caminho_modelo: str, espera_ms: float = ESPERA_MAXIMA_MS, lote_maximo: int = LOTE_MAXIMO,
+                 threads_modelo: int = 1, metricas: Metricas = None):
+        self.caminho_modelo = caminho_modelo
+        self.espera = espera_ms / 1000
+        self.lote_maximo = lote_maximo
+        self.threads_modelo = threads_modelo
+        self.metricas = metricas or Metricas()
+        self._fila = asyncio.Queue()
+        self._tarefa = None
+
+    def iniciar(self):
+        self._tarefa = asyncio.create_task(self._processar())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+
+    async def pontuar(self, registros: list) -> list:
+        """Agenda os prospects (dicionários coluna -> valor) e devolve os seus scores."""
+        futuros = []
+        for registro in registros:
+            futuro = asyncio.get_running_loop().create_future()
+            self._fila.put_nowait((registro, futuro))
+            futuros.append(futuro)
+        return await asyncio.gather(*futuros)
+
+    def _pontuar_lote(self, registros: list) -> np.ndarray:
+        """Pontua o lote pelo Zoro; o modelo fica residente no registro de artefatos."""
+        df_lote = pd.DataFrame.from_records(registros)
+        df_resultado, _ = Zoro.score_xgboost_lote(df_lote, self.caminho_modelo, n_jobs=1,
+                                                  linhas_por_fatia=max(len(df_lote), 1),
+                                                  threads_por_fatia=self.threads_modelo)
+        return df_resultado['score_recuperacao'].sort_index().to_numpy(dtype=np.float64)
+
+    async def _processar(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self._fila.get()]
+            prazo = loop.time() + self.espera
+            while len(lote) < self.lote_maximo:
+                restante = prazo - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(await asyncio.wait_for(self._fila.get(), restante))
+                except asyncio.TimeoutError:
+                    break
+
+            registros, futuros = zip(*lote)
+            try:
+                scores = await asyncio.to_thread(self._pontuar_lote, list(registros))
+            except Exception:
+                await self._pontuar_individualmente(registros, futuros)
+                continue
+            self.metricas.registrar_lote(len(lote))
+            for futuro, score in zip(futuros, scores):
+                if not futuro.done():
+                    futuro.set_result(float(score))
+
+    async def _pontuar_individualmente(self, registros: tuple, futuros: tuple):
+        """Isola a falha de um lote: cada prospect é pontuado sozinho e só os que falham recebem o erro."""
+        for registro, futuro in zip(registros, futuros):
+            try:
+                score = (await asyncio.to_thread(self._pontuar_lote, [registro]))[0]
+            except Exception as erro:
+                if not futuro.done():
+                    futuro.set_exception(erro)
+                continue
+            self.metricas.registrar_lote(1)
+            if not futuro.done():
+                futuro.set_result(float(score))
+
+# --- HTTP ---
+
+async def _ler_pedido(leitor: asyncio.StreamReader):
+    """Lê um pedido HTTP/1.1: (método, rota, cabeçalhos, corpo), ou None se a conexão fechou."""
+    linha = await leitor.readline()
+    if not linha:
+        return None
+    metodo, rota, _ = linha.decode("latin-1").split(" ", 2)
+    cabecalhos = {}
+    while True:
+        linha = await leitor.readline()
+        if linha in (b"\r\n", b"\n", b""):
+            break
+        nome, _, valor = linha.decode("latin-1").partition(":")
+        cabecalhos[nome.strip().lower()] = valor.strip()
+    tamanho = int(cabecalhos.get("content-length", 0))
+    if tamanho > MAX_CORPO:
+        raise ValueError(413)
+    corpo = await leitor.readexactly(tamanho) if tamanho else b""
+    return metodo.upper(), rota.split("?", 1)[0], cabecalhos, corpo
+
+def _resposta(status: int, conteudo: Dict[str, Any], manter_conexao: bool) -> bytes:
+    corpo = json.dumps(conteudo, ensure_ascii=False).encode()
+    cabecalho = (f"HTTP/1.1 {status} {_STATUS[status]}\r\n"
+                 f"Content-Type: application/json; charset=utf-8\r\n"
+                 f"Content-Length: {len(corpo)}\r\n"
+                 f"Connection: {'keep-alive' if manter_conexao else 'close'}\r\n\r\n")
+    return cabecalho.encode() + corpo
+
+class ServicoScore:
+    """
+    Servidor HTTP/JSON de score XGBoost.
+
+    Rotas:
+        POST /score: um prospect (objeto JSON) ou uma lista de prospects, com as mesmas
+            colunas da carteira. Responde {"score": x} ou {"scores": [...]}, na ordem enviada.
+        GET /metricas: latência p50/p99 (ms), pedidos, lotes e tamanho médio do lote.
+        GET /saude: status e modelo carregado.
+    """
+
+    def __init__(self, caminho_modelo: str, host: str = HOST_PADRAO, porta: int = PORTA_PADRAO,
+                 espera_ms: float = ESPERA_MAXIMA_MS, lote_maximo: int = LOTE_MAXIMO, threads_modelo: int = 1):
+        self.caminho_modelo = caminho_modelo
+        self.host = host
+        self.porta = porta
+        self.metricas = Metricas()
+        self.agrupador = AgrupadorLotes(caminho_modelo, espera_ms, lote_maximo, threads_modelo, self.metricas)
+        self.colunas_numericas = []
+        self._servidor = None
+
+    async def iniciar(self):
+        # Carrega o modelo antes do primeiro pedido.
+        Zoro.versao_modelo_xgboost(self.caminho_modelo)
+        self.colunas_numericas = colunas_numericas_modelo(self.caminho_modelo)
+        self.agrupador.iniciar()
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.porta)
+        self.porta = self._servidor.sockets[0].getsockname()[1]
+
+    async def parar(self):
+        self._servidor.close()
+        await self._servidor.wait_closed()
+        await self.agrupador.parar()
+
+    async def servir(self):
+        await self.iniciar()
+        logger.info("Serviço de score em http://%s:%s (modelo: %s)", self.host, self.porta, self.caminho_modelo)
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+    async def _rotear(self, metodo: str, rota: str, corpo: bytes) -> tuple:
+        if metodo == "GET" and rota == "/metricas":
+            return 200, self.metricas.resumo()
+        if metodo == "GET" and rota == "/saude":
+            return 200, {"status": "ok", "modelo": self.caminho_modelo,
+                         "versao": Zoro.versao_modelo_xgboost(self.caminho_modelo)}
+        if metodo == "POST" and rota == "/score":
+            try:
+                conteudo = json.loads(corpo or b"null")
+            except json.JSONDecodeError:
+                return 400, {"erro": "Corpo JSON inválido."}
+            unico = isinstance(conteudo, dict)
+            if not unico and not (isinstance(conteudo, list) and all(isinstance(item, dict) for item in conteudo)):
+                return 400, {"erro": "Envie um prospect (objeto) ou uma lista de prospects."}
+            try:
+                registros = [validar_prospect(registro, self.colunas_numericas)
+                             for registro in ([conteudo] if unico else conteudo)]
+            except ProspectInvalido as erro:
+                return 400, {"erro": str(erro)}
+            scores = await self.agrupador.pontuar(registros)
+            return 200, {"score": scores[0]} if unico else {"scores": scores}
+        return 404, {"erro": f"Rota não encontrada: {metodo} {rota}"}
+
+    async def _atender(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    pedido = await _ler_pedido(leitor)
+                except ValueError as erro:
+                    status = erro.args[0] if erro.args and erro.args[0] in _STATUS else 400
+                    escritor.write(_resposta(status, {"erro": "Pedido inválido."}, False))
+                    break
+                if pedido is None:
+                    break
+                metodo, rota, cabecalhos, corpo = pedido
+                inicio = time.perf_counter()
+                try:
+                    status, conteudo = await self._rotear(metodo, rota, corpo)
+                except Exception as erro:
+                    status, conteudo = 500, {"erro": str(erro)}
+                if rota == "/score":
+                    self.metricas.registrar_pedido((time.perf_counter() - inicio) * 1000, status != 200)
+                manter_conexao = cabecalhos.get("connection", "").lower() != "close"
+                escritor.write(_resposta(status, conteudo, manter_conexao))
+                await escritor.drain()
+                if not manter_conexao:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+# --- Execução ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP de score XGBoost com micro-lotes.")
+    parser.add_argument("--modelo", default="modelo_score_recuperacao_with_columns_v1.pkl")
+    parser.add_argument("--host", default=HOST_PADRAO)
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--espera-ms", type=float, default=ESPERA_MAXIMA_MS)
+    parser.add_argument("--lote-maximo", type=int, default=LOTE_MAXIMO)
+    parser.add_argument("--threads-modelo", type=int, default=1)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    servico = ServicoScore(args.modelo, args.host, args.porta, args.espera_ms, args.lote_maximo, args.threads_modelo)
+    try:
+        asyncio.run(servico.servir())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
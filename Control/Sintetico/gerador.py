@@ -0,0 +1,234 @@
+import argparse
+import time
+import unicodedata
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+import Control.Documento.documento as Documento
+import Control.Streaming.streaming as Streaming
+
+# --- Constantes do Gerador ---
+# Mesmo layout de colunas da base_full.csv.
+COLUNAS = ['id_cliente', 'valor_divida_mil', 'nome_completo', 'data_nascimento', 'idade', 'estado_civil', 'profissao',
+           'renda_mensal', 'razao_social', 'capital_social', 'faturamento_anual_mil', 'numero_funcionarios',
+           'ramo_atuacao_cliente', 'socios', 'tempo_inadimplencia_dias', 'email', 'telefone', 'endereco',
+           'possui_outras_dividas', 'possui_protestos', 'documento']
+LINHAS_POR_BLOCO = 500_000
+# Proporção de pessoas físicas na base real (551 de 1080).
+FRACAO_PF = 0.51
+ID_INICIAL = 1000
+# Data de referência para idade e nascimento.
+DATA_REFERENCIA = np.datetime64('2025-10-01')
+
+PRIMEIROS_NOMES = ['Ana', 'Ana Clara', 'Beatriz', 'Bruno', 'Caio', 'Camila', 'Cauê', 'Cecília', 'Daniel', 'Davi',
+                   'Eduarda', 'Enzo', 'Felipe', 'Francisco', 'Gabriel', 'Giovanna', 'Heitor', 'Helena', 'Isadora',
+                   'João Pedro', 'Júlia', 'Larissa', 'Leonardo', 'Luiza', 'Lucas', 'Manuela', 'Marina', 'Mateus',
+                   'Natália', 'Otávio', 'Pedro', 'Rafael', 'Samuel', 'Sophia', 'Thiago', 'Valentina', 'Vitor',
+                   'Yasmin']
+SOBRENOMES = ['Albuquerque', 'Almeida', 'Aragão', 'Araújo', 'Azevedo', 'Barbosa', 'Camargo', 'Cardoso', 'Castro',
+              'Cavalcanti', 'Cirino', 'Correia', 'da Costa', 'da Cruz', 'da Mata', 'da Rocha', 'da Rosa', 'Dias',
+              'Farias', 'Garcia', 'Lopes', 'Martins', 'Moreira', 'Nascimento', 'Novaes', 'Oliveira', 'Pereira',
+              'Porto', 'Ramos', 'Rios', 'Sá', 'Sampaio', 'Santos', 'Siqueira', 'Silveira', 'Souza', 'Teixeira']
+ESTADOS_CIVIS = ['SOLTEIRO', 'CASADO', 'DIVORCIADO', 'VIUVO']
+PROFISSOES = ['Adestrador de animais', 'Advogado', 'Afiador de ferramentas', 'Agrônomo', 'Analista de sistemas',
+              'Arquiteto', 'Auxiliar administrativo', 'Comerciante', 'Contador', 'Corretor de imóveis', 'Costureira',
+              'Editor de mesa de corte', 'Educador', 'Eletricista', 'Embalsamador', 'Enfermeiro', 'Engenheiro civil',
+              'Engenheiro de som', 'Farmacêutico', 'Gandula', 'Gerente de riscos em seguros', 'Jornalista',
+              'Mecânico', 'Motorista', 'Nutricionista', 'Pedreiro', 'Pizzaiolo', 'Professor', 'Técnico tributarista',
+              'Vendedor', 'Vistoriador de sinistros']
+RAMOS_ATUACAO = ['SERVICOS', 'VAREJO', 'AGRONEGOCIO', 'TECNOLOGIA', 'INDUSTRIA']
+SUFIXOS_EMPRESA = ['', ' - ME', ' - EI', ' Ltda.', ' S.A.', ' e Filhos']
+LOGRADOUROS = ['Rua', 'Avenida', 'Travessa', 'Praça', 'Estrada', 'Alameda', 'Largo', 'Sítio', 'Campo', 'Condomínio']
+UFS = ['AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA', 'PB', 'PE', 'PI', 'PR',
+       'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO']
+DDDS = [11, 21, 27, 31, 41, 47, 48, 51, 61, 62, 65, 67, 71, 79, 81, 84, 85, 91, 92, 98]
+DOMINIOS_EMAIL = ['@example.com', '@example.org', '@example.net']
+# Formatos de telefone encontrados na base ('#' = dígito do DDD seguido do número).
+MOLDES_TELEFONE = ['## #### ####', '## ####-####', '(0##) #### ####', '(0##) ####-####', '+55 ## #### ####',
+                   '+55 ## ####-####', '+55 (0##) #### ####', '+55 (0##) ####-####']
+MOLDE_CPF = '###.###.###-##'
+MOLDE_CNPJ = '##.###.###/####-##'
+
+# --- Funções Auxiliares ---
+
+def _sem_acentos(texto: str) -> str:
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode().lower().replace(' ', '')
+
+def _combinar(*listas) -> np.ndarray:
+    """Todas as concatenações (produto cartesiano) das listas, para sortear por índice sem montar texto linha a linha."""
+    combinacoes = np.array([''])
+    for lista in listas:
+        combinacoes = np.char.add(combinacoes[:, None], np.array(lista)[None, :]).ravel()
+    return combinacoes.astype(object)
+
+# Vocabulários combinados uma única vez (poucos milhares de textos).
+_NOMES = _combinar(PRIMEIROS_NOMES, [' '], SOBRENOMES)
+_EMAILS = _combinar([_sem_acentos(n) for n in PRIMEIROS_NOMES], [_sem_acentos(s) for s in SOBRENOMES] + [''],
+                    DOMINIOS_EMAIL)
+_EMPRESAS = _combinar(SOBRENOMES, [''] + [' ' + s for s in SOBRENOMES], SUFIXOS_EMPRESA)
+_RUAS = _combinar(LOGRADOUROS, [' '], SOBRENOMES, [', '])
+_CIDADES = _combinar([', '], SOBRENOMES, [' - '], UFS)
+
+def _preencher_molde(digitos: np.ndarray, molde: str) -> np.ndarray:
+    """
+    Escreve os dígitos (matriz linhas x posições '#') no molde, montando os textos como
+    bytes de uma vez, sem laço em Python.
+    """
+    caracteres = np.frombuffer(molde.encode(), dtype=np.uint8)
+    saida = np.tile(caracteres, (len(digitos), 1))
+    saida[:, caracteres == ord('#')] = digitos + ord('0')
+    return saida.view(f'S{len(caracteres)}').ravel().astype(str).astype(object)
+
+def _digitos(numeros: np.ndarray, quantidade: int) -> np.ndarray:
+    """Matriz com os 'quantidade' dígitos decimais de cada número (mais significativo primeiro)."""
+    return (numeros[:, None] // 10 ** np.arange(quantidade - 1, -1, -1)) % 10
+
+def _documentos(ids: np.ndarray, pessoa_fisica: np.ndarray, multiplicador: int, deslocamento: int) -> np.ndarray:
+    """
+    CPF (pessoa física) ou CNPJ da matriz (filial 0001), com dígitos verificadores válidos.
+
+    A raiz é (id * multiplicador + deslocamento) mod 10^9 (CPF) ou 10^8 (CNPJ); com o
+    multiplicador primo com 10, ids distintos geram raízes distintas.
+    """
+    documentos = np.empty(len(ids), dtype=object)
+    for fisica, modulo, n_raiz, pesos, molde in ((True, 10 ** 9, 9, Documento.PESOS_CPF, MOLDE_CPF),
+                                                  (False, 10 ** 8, 8, Documento.PESOS_CNPJ, MOLDE_CNPJ)):
+        linhas = pessoa_fisica == fisica
+        digitos = _digitos((ids[linhas] * multiplicador + deslocamento) % modulo, n_raiz)
+        if fisica:
+            # CPFs com todos os dígitos iguais são inválidos: troca o último dígito da raiz.
+            repetidos = (digitos == digitos[:, :1]).all(axis=1)
+            digitos[repetidos, -1] = (digitos[repetidos, -1] + 1) % 10
+        else:
+            digitos = np.hstack([digitos, np.tile([0, 0, 0, 1], (len(digitos), 1))])
+        digitos = np.hstack([digitos, Documento.digito_verificador(digitos, pesos[0])[:, None]])
+        digitos = np.hstack([digitos, Documento.digito_verificador(digitos, pesos[1])[:, None]])
+        documentos[linhas] = _preencher_molde(digitos, molde)
+    return documentos
+
+def _telefones(rng: np.random.Generator, n: int) -> np.ndarray:
+    ddd = np.array(DDDS)[rng.integers(0, len(DDDS), n)]
+    digitos = np.hstack([_digitos(ddd, 2), rng.integers(0, 10, (n, 8))])
+    formatos = rng.integers(0, len(MOLDES_TELEFONE), n)
+    telefones = np.empty(n, dtype=object)
+    for indice, molde in enumerate(MOLDES_TELEFONE):
+        linhas = formatos == indice
+        telefones[linhas] = _preencher_molde(digitos[linhas], molde)
+    return telefones
+
+def _multiplicador(seed: int) -> tuple:
+    """Multiplicador (primo com 10) e deslocamento das raízes dos documentos, derivados da semente."""
+    rng = np.random.default_rng([seed, 2 ** 31])
+    multiplicador = int(rng.integers(10 ** 7, 10 ** 8))
+    while multiplicador % 2 == 0 or multiplicador % 5 == 0:
+        multiplicador += 1
+    return multiplicador, int(rng.integers(0, 10 ** 8))
+
+# --- Geração ---
+
+def gerar_bloco(rng: np.random.Generator, ids: np.ndarray, fracao_pf: float = FRACAO_PF,
+                documentos: tuple = (7_777_777, 0)) -> pd.DataFrame:
+    """
+    Gera um bloco de prospects PF/PJ com o layout e as distribuições da base_full.csv.
+
+    Colunas de pessoa física (nome, nascimento, idade, estado civil, profissão, renda)
+    ficam vazias para PJ, e as de empresa (razão social, capital, faturamento,
+    funcionários, ramo, sócios) ficam vazias para PF, como na base real.
+
+    Args:
+        rng (np.random.Generator): Gerador do bloco.
+        ids (np.ndarray): 'id_cliente' de cada linha.
+        fracao_pf (float): Probabilidade de cada prospect ser pessoa física.
+        documentos (tuple): Multiplicador e deslocamento das raízes de CPF/CNPJ (ver _documentos).
+    """
+    n = len(ids)
+    pf = rng.random(n) < fracao_pf
+    pj = ~pf
+    n_pf, n_pj = int(pf.sum()), int(pj.sum())
+
+    def coluna(valores_pf=None, valores_pj=None, tipo=object):
+        saida = np.full(n, None if tipo is object else np.nan, dtype=tipo)
+        if valores_pf is not None:
+            saida[pf] = valores_pf
+        if valores_pj is not None:
+            saida[pj] = valores_pj
+        return saida
+
+    dias_vida = rng.uniform(18 * 365.25, 82 * 365.25, n_pf)
+    nascimento = DATA_REFERENCIA - dias_vida.astype('timedelta64[D]')
+    n_socios = rng.integers(1, 5, n_pj)
+    socios = _NOMES[rng.integers(0, len(_NOMES), n_pj)]
+    for ordem in range(2, 5):
+        mais = n_socios >= ordem
+        socios[mais] = socios[mais] + ', ' + _NOMES[rng.integers(0, len(_NOMES), int(mais.sum()))]
+
+    df_bloco = pd.DataFrame({
+        'id_cliente': ids,
+        'valor_divida_mil': rng.lognormal(np.log(190), 1.5, n).round(2),
+        'nome_completo': coluna(_NOMES[rng.integers(0, len(_NOMES), n_pf)]),
+        'data_nascimento': coluna(np.datetime_as_string(nascimento, unit='D').astype(object)),
+        'idade': coluna(np.floor(dias_vida / 365.25), tipo=np.float64),
+        'estado_civil': coluna(np.array(ESTADOS_CIVIS, dtype=object)[rng.integers(0, len(ESTADOS_CIVIS), n_pf)]),
+        'profissao': coluna(np.array(PROFISSOES, dtype=object)[rng.integers(0, len(PROFISSOES), n_pf)]),
+        'renda_mensal': coluna(rng.lognormal(np.log(2960), 0.85, n_pf).round(2), tipo=np.float64),
+        'razao_social': coluna(None, _EMPRESAS[rng.integers(0, len(_EMPRESAS), n_pj)]),
+        'capital_social': coluna(None, rng.uniform(5e4, 5e6, n_pj).round(2), tipo=np.float64),
+        'faturamento_anual_mil': coluna(None, rng.lognormal(np.log(91), 1.26, n_pj).round(5), tipo=np.float64),
+        'numero_funcionarios': coluna(None, rng.integers(2, 500, n_pj), tipo=np.float64),
+        'ramo_atuacao_cliente': coluna(None, np.array(RAMOS_ATUACAO, dtype=object)[rng.integers(0, len(RAMOS_ATUACAO), n_pj)]),
+        'socios': coluna(None, socios),
+        'tempo_inadimplencia_dias': rng.integers(30, 2001, n),
+        'email': _EMAILS[rng.integers(0, len(_EMAILS), n)],
+        'telefone': _telefones(rng, n),
+        'endereco': (_RUAS[rng.integers(0, len(_RUAS), n)] + rng.integers(1, 999, n).astype(str).astype(object)
+                     + _CIDADES[rng.integers(0, len(_CIDADES), n)]),
+        'possui_outras_dividas': np.where(rng.random(n) < 0.5, 'SIM', 'NAO').astype(object),
+        'possui_protestos': np.where(rng.random(n) < 0.5, 'SIM', 'NAO').astype(object),
+        'documento': _documentos(ids, pf, *documentos),
+    })
+    return df_bloco[COLUNAS]
+
+def gerar_carteira(caminho: str, n_linhas: int = 1_000_000, linhas_por_bloco: int = LINHAS_POR_BLOCO, seed: int = 0,
+                   fracao_pf: float = FRACAO_PF, id_inicial: int = ID_INICIAL) -> Dict[str, Any]:
+    """
+    Grava uma carteira sintética de prospects PF/PJ em blocos (Parquet ou CSV, pela extensão),
+    sem manter a carteira inteira em memória.
+
+    Cada bloco usa o gerador (seed, índice do bloco): a mesma semente e o mesmo tamanho de
+    bloco geram o mesmo arquivo. Os 'id_cliente' são sequenciais a partir de 'id_inicial' e
+    os CPFs/CNPJs são válidos e únicos (até 10^8 prospects por tipo).
+
+    Returns:
+        dict: 'caminho', 'linhas', 'segundos' e 'linhas_por_segundo'.
+    """
+    inicio = time.perf_counter()
+    documentos = _multiplicador(seed)
+    escritor = Streaming.EscritorBlocos(caminho)
+    try:
+        for indice, comeco in enumerate(range(0, n_linhas, linhas_por_bloco)):
+            rng = np.random.default_rng([seed, indice])
+            ids = np.arange(id_inicial + comeco, id_inicial + min(comeco + linhas_por_bloco, n_linhas), dtype=np.int64)
+            escritor.escrever(gerar_bloco(rng, ids, fracao_pf, documentos))
+    finally:
+        escritor.fechar()
+    segundos = time.perf_counter() - inicio
+    return {"caminho": caminho, "linhas": n_linhas, "segundos": segundos, "linhas_por_segundo": n_linhas / segundos}
+
+# --- Execução ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera uma carteira sintética de prospects PF/PJ.")
+    parser.add_argument("caminho", help="Arquivo de saída (.parquet ou .csv)")
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--linhas-por-bloco", type=int, default=LINHAS_POR_BLOCO)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fracao-pf", type=float, default=FRACAO_PF)
+    args = parser.parse_args()
+    resultado = gerar_carteira(args.caminho, args.linhas, args.linhas_por_bloco, args.seed, args.fracao_pf)
+    print(f"✅ {resultado['linhas']} prospects gravados em '{resultado['caminho']}' "
+          f"({resultado['linhas_por_segundo']:,.0f} linhas/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import os
+from typing import Dict, Any, Iterator
+
+import numpy as np
+import pandas as pd
+
+import Control.Score_Manual.SM_core as SM
+import Control.XGboost.encoder      as Encoder
+import Control.XGboost.model_run    as XGRun
+import Control.XGboost.registro     as Registro
+
+# --- Constantes do Scoring em Fluxo ---
+# Linhas lidas, pontuadas e gravadas por vez.
+LINHAS_POR_BLOCO = 100_000
+# Tamanho padrão do ranking dos maiores scores mantido durante o fluxo.
+TOP_K_PADRAO = 100
+# Faixas de score dos ranks (as mesmas do relatório de score).
+LIMITES_RANKS = SM.LIMITES_RANKS
+# Colunas de texto da carteira. No CSV são lidas sempre como texto: um bloco em que
+# uma delas vem toda vazia (ex.: 'razao_social' num bloco só de PF) seria lido como float.
+COLUNAS_TEXTO = ('nome_completo', 'data_nascimento', 'estado_civil', 'profissao', 'razao_social',
+                 'ramo_atuacao_cliente', 'socios', 'email', 'telefone', 'endereco', 'possui_outras_dividas',
+                 'possui_protestos', 'documento', 'porte_cliente', 'score_risco_interno', 'regiao', 'tipo_pessoa')
+
+# --- Leitura e Escrita em Blocos ---
+
+def _formato(caminho: str) -> str:
+    """'parquet' para arquivos .parquet/.pq e 'csv' para os demais."""
+    return "parquet" if os.path.splitext(caminho)[1].lower() in (".parquet", ".pq") else "csv"
+
+def ler_em_blocos(caminho: str, linhas_por_bloco: int = LINHAS_POR_BLOCO, colunas: list = None) -> Iterator[pd.DataFrame]:
+    """
+    Lê um CSV ou Parquet em blocos de até 'linhas_por_bloco' linhas, sem carregar o
+    arquivo inteiro. 'colunas' restringe a leitura às colunas informadas (as ausentes são ignoradas).
+    No CSV, as COLUNAS_TEXTO têm o tipo fixo (texto) em todos os blocos.
+    """
+    if _formato(caminho) == "parquet":
+        import pyarrow.parquet as pq
+        arquivo = pq.ParquetFile(caminho)
+        if colunas is not None:
+            colunas = [c for c in colunas if c in arquivo.schema_arrow.names]
+        for lote in arquivo.iter_batches(batch_size=linhas_por_bloco, columns=colunas):
+            yield lote.to_pandas()
+    else:
+        usar = None if colunas is None else (lambda coluna: coluna in colunas)
+        yield from pd.read_csv(caminho, chunksize=linhas_por_bloco, usecols=usar,
+                               dtype={coluna: "str" for coluna in COLUNAS_TEXTO})
+
+class EscritorBlocos:
+    """
+    Grava os blocos pontuados incrementalmente em CSV (acrescentando ao arquivo) ou em
+    Parquet (um row group por bloco), conforme a extensão do caminho.
+
+    No Parquet, o esquema é fixado pelo primeiro bloco (colunas só com ausentes viram
+    texto) e cada bloco seguinte é convertido para ele: colunas só com ausentes recebem
+    o tipo do esquema e as demais são convertidas pelo Arrow (ex.: inteiro para float).
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.formato = _formato(caminho)
+        self._escritor = None
+        self._esquema = None
+        self._primeiro = True
+
+    def escrever(self, df_bloco: pd.DataFrame):
+        """Acrescenta um bloco ao arquivo de saída."""
+        if self.formato == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._escritor is None:
+                tabela = pa.Table.from_pandas(df_bloco, preserve_index=False)
+                # Colunas vazias no primeiro bloco viram texto, para aceitar valores nos seguintes.
+                self._esquema = pa.schema([campo.with_type(pa.string()) if pa.types.is_null(campo.type) else campo
+                                           for campo in tabela.schema]).remove_metadata()
+                self._escritor = pq.ParquetWriter(self.caminho, self._esquema)
+            self._escritor.write_table(self._conformar(pa.Table.from_pandas(df_bloco, preserve_index=False)))
+        else:
+            df_bloco.to_csv(self.caminho, mode="w" if self._primeiro else "a", header=self._primeiro, index=False)
+        self._primeiro = False
+
+    def _conformar(self, tabela):
+        """Converte um bloco (tabela Arrow) para o esquema do arquivo."""
+        import pyarrow as pa
+        if tabela.schema.remove_metadata().equals(self._esquema):
+            return tabela
+        colunas = []
+        for campo in self._esquema:
+            if campo.name not in tabela.column_names:
+                raise ValueError(f"O bloco não tem a coluna '{campo.name}' do arquivo '{self.caminho}'.")
+            coluna = tabela.column(campo.name)
+            if coluna.type == campo.type:
+                colunas.append(coluna)
+            elif coluna.null_count == len(coluna):
+                colunas.append(pa.nulls(len(coluna), campo.type))
+            else:
+                try:
+                    colunas.append(coluna.cast(campo.type))
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as erro:
+                    raise ValueError(f"Coluna '{campo.name}' tem tipo {coluna.type} no bloco, mas {campo.type} "
+                                     f"no arquivo '{self.caminho}' (se for texto, inclua-a em COLUNAS_TEXTO).") from erro
+        return pa.Table.from_arrays(colunas, schema=self._esquema)
+
+    def fechar(self):
+        """Finaliza o arquivo (necessário para o Parquet)."""
+        if self._escritor is not None:
+            self._escritor.close()
+            self._escritor = None
+
+# --- Agregados da Carteira ---
+
+class ResumoCarteira:
+    """
+    Agregados calculados bloco a bloco, sem guardar a carteira inteira: quantidade,
+    valor total, valor esperado (soma de score x valor), ranks A-D (quantidade e valor)
+    e os 'top_k' prospects de maior score (ranking limitado, em vez de uma ordenação global).
+
+    Com 'guardar_carteira', mantém também só as colunas usadas pela simulação
+    (score_recuperacao e valor_divida_mil), 16 bytes por prospect.
+    """
+
+    def __init__(self, top_k: int = TOP_K_PADRAO, guardar_carteira: bool = True):
+        self.top_k = top_k
+        self.prospects = 0
+        self.valor_total_mil = 0.0
+        self.valor_esperado_mil = 0.0
+        self.ranks = {rank: {"contagem": 0, "valor_mil": 0.0} for rank in LIMITES_RANKS}
+        self.top = None
+        self._partes_carteira = [] if guardar_carteira else None
+
+    def atualizar(self, df_bloco: pd.DataFrame):
+        """Incorpora um bloco já pontuado."""
+        if df_bloco.empty:
+            return
+        scores = df_bloco['score_recuperacao'].to_numpy(dtype=np.float64)
+        valores = df_bloco['valor_divida_mil'].to_numpy(dtype=np.float64)
+        self.prospects += len(df_bloco)
+        self.valor_total_mil += float(np.nansum(valores))
+        self.valor_esperado_mil += float(np.nansum(scores * valores))
+        for rank, (inferior, superior) in LIMITES_RANKS.items():
+            mascara = (scores >= inferior) & (scores < superior)
+            self.ranks[rank]["contagem"] += int(mascara.sum())
+            self.ranks[rank]["valor_mil"] += float(np.nansum(valores[mascara]))
+
+        # Só os k maiores do bloco disputam com o ranking atual.
+        if self.top_k > 0:
+            k = min(self.top_k, len(scores))
+            candidatos = np.argpartition(-scores, k - 1)[:k]
+            top = pd.concat([self.top, df_bloco.iloc[candidatos]], ignore_index=True) if self.top is not None \
+                else df_bloco.iloc[candidatos].reset_index(drop=True)
+            self.top = top.nlargest(self.top_k, 'score_recuperacao').reset_index(drop=True)
+
+        if self._partes_carteira is not None:
+            self._partes_carteira.append(np.column_stack([scores, valores]))
+
+    def carteira(self) -> pd.DataFrame:
+        """Carteira compacta (score e valor) pronta para a simulação de Monte Carlo."""
+        if not self._partes_carteira:
+            return pd.DataFrame({'score_recuperacao': [], 'valor_divida_mil': []})
+        dados = np.concatenate(self._partes_carteira)
+        self._partes_carteira = [dados]
+        return pd.DataFrame({'score_recuperacao': dados[:, 0], 'valor_divida_mil': dados[:, 1]})
+
+    def resultado(self) -> Dict[str, Any]:
+        """Resumo final: totais, ranks, top-K e (se guardada) a carteira compacta."""
+        return {
+            "prospects": self.prospects,
+            "valor_total": self.valor_total_mil * 1000,
+            "valor_esperado": self.valor_esperado_mil * 1000,
+            "ranks": {rank: {"contagem": dados["contagem"], "valor": dados["valor_mil"] * 1000}
+                      for rank, dados in self.ranks.items()},
+            "top_k": self.top if self.top is not None else pd.DataFrame(),
+            "carteira": self.carteira() if self._partes_carteira is not None else None,
+        }
+
+# --- Funções Auxiliares (Score Manual) ---
+
+def _colunas_manual(configuracao: Dict[str, Any]) -> list:
+    """Todas as colunas que o score manual lê, em qualquer segmento (pesos compilados)."""
+    colunas = {'documento', 'valor_divida_mil'}
+    for compilado in configuracao.values():
+        colunas.update(compilado["numericas"])
+        colunas.update(compilado["categoricas"])
+    return list(colunas)
+
+def ajustar_score_manual(caminho_entrada: str, caminho_pesos: str = SM.CAMINHO_PESOS_PADRAO,
+                         linhas_por_bloco: int = LINHAS_POR_BLOCO) -> Dict[str, Any]:
+    """
+    Ajusta o perfil de scoring do SM_core a um arquivo maior que a memória, em duas
+    leituras: a primeira junta os momentos das features numéricas e a segunda os do score
+    bruto, já padronizado com as features do arquivo inteiro. O resultado é o mesmo de
+    SM.ajustar_perfil com o arquivo carregado em memória.
+
+    Returns:
+        dict: O perfil de scoring (ver SM.salvar_perfil).
+    """
+    colunas = _colunas_manual(SM.carregar_pesos_compilados(caminho_pesos))
+    perfil = SM.perfil_vazio(caminho_pesos)
+    for df_bloco in ler_em_blocos(caminho_entrada, linhas_por_bloco, colunas):
+        SM.acumular_features(perfil, df_bloco, caminho_pesos)
+    for df_bloco in ler_em_blocos(caminho_entrada, linhas_por_bloco, colunas):
+        SM.acumular_scores(perfil, df_bloco, caminho_pesos)
+    return perfil
+
+# --- Funções Principais de Scoring em Fluxo ---
+
+def _processar(blocos_pontuados: Iterator[pd.DataFrame], caminho_saida: str, top_k: int, guardar_carteira: bool) -> Dict[str, Any]:
+    """Grava cada bloco pontuado (se houver saída) e alimenta o resumo da carteira."""
+    resumo = ResumoCarteira(top_k, guardar_carteira)
+    escritor = EscritorBlocos(caminho_saida) if caminho_saida else None
+    try:
+        for df_bloco in blocos_pontuados:
+            if escritor is not None:
+                escritor.escrever(df_bloco)
+            resumo.atualizar(df_bloco)
+    finally:
+        if escritor is not None:
+            escritor.fechar()
+    resultado = resumo.resultado()
+    resultado["caminho_saida"] = caminho_saida
+    return resultado
+
+def pontuar_arquivo_xgboost(caminho_entrada: str, caminho_artefatos_modelo: str, caminho_saida: str = None,
+                            linhas_por_bloco: int = LINHAS_POR_BLOCO, top_k: int = TOP_K_PADRAO,
+                            guardar_carteira: bool = True, n_jobs: int = 1,
+                            threads_por_fatia: int = None) -> Dict[str, Any]:
+    """
+    Pontua com o XGBoost um arquivo de carteira (CSV ou Parquet) maior que a memória.
+
+    Cada bloco é codificado direto na matriz do modelo, pontuado e gravado em
+    'caminho_saida' (na ordem de entrada, com a coluna 'score_recuperacao'); a memória
+    usada depende do tamanho do bloco, não do arquivo.
+
+    Args:
+        caminho_entrada (str): Arquivo .csv ou .parquet com os prospects.
+        caminho_artefatos_modelo (str): Artefato do modelo (ver Control.XGboost.registro).
+        caminho_saida (str, optional): Arquivo .csv ou .parquet para os prospects pontuados.
+        linhas_por_bloco (int): Linhas por bloco.
+        top_k (int): Quantos prospects de maior score manter no ranking.
+        guardar_carteira (bool): Se mantém score e valor de cada prospect para a simulação.
+        n_jobs, threads_por_fatia (int): Paralelismo da predição de cada bloco (ver model_run.prever_em_lote).
+
+    Returns:
+        dict: 'prospects', 'valor_total', 'valor_esperado' (R$), 'ranks' (A-D, contagem e valor),
+            'top_k' (DataFrame), 'carteira' (score e valor, ou None) e 'caminho_saida'.
+            O scoring XGBoost inclui também a 'vazao' (linhas por segundo na predição).
+    """
+    artefatos = Registro.carregar_artefatos(caminho_artefatos_modelo)
+    encoder = artefatos.get('encoder') or Encoder.compilar_encoder(artefatos['columns'])
+    modelo = artefatos['model']
+
+    vazao = {"linhas": 0, "segundos": 0.0}
+
+    def blocos_pontuados():
+        matriz = None
+        for df_bloco in ler_em_blocos(caminho_entrada, linhas_por_bloco):
+            matriz = Encoder.codificar(df_bloco, encoder, matriz)
+            df_bloco['score_recuperacao'], relatorio = XGRun.prever_em_lote(
+                modelo, matriz, n_jobs, threads_por_fatia=threads_por_fatia)
+            vazao["linhas"] += relatorio["linhas"]
+            vazao["segundos"] += relatorio["segundos"]
+            yield df_bloco
+
+    resultado = _processar(blocos_pontuados(), caminho_saida, top_k, guardar_carteira)
+    resultado["vazao"] = vazao["linhas"] / vazao["segundos"] if vazao["segundos"] > 0 else float("inf")
+    return resultado
+
+def pontuar_arquivo_manual(caminho_entrada: str, caminho_saida: str = None, caminho_pesos: str = SM.CAMINHO_PESOS_PADRAO,
+                           linhas_por_bloco: int = LINHAS_POR_BLOCO, top_k: int = TOP_K_PADRAO,
+                           guardar_carteira: bool = True,
+                           caminho_perfil: str = SM.CAMINHO_PERFIL_PADRAO) -> Dict[str, Any]:
+    """
+    Pontua com o Score Manual um arquivo de carteira (CSV ou Parquet) maior que a memória.
+
+    Com um perfil de scoring válido em 'caminho_perfil', o arquivo é lido uma única vez.
+    Sem ele (ou com caminho_perfil=None), o perfil é antes ajustado ao próprio arquivo
+    (duas leituras a mais, ver ajustar_score_manual), como o SM_core faz com o lote em
+    memória. O resultado é o mesmo do SM_core, exceto pela ordem (a de entrada, com PF e
+    PJ separados dentro de cada bloco); linhas que não são PF nem PJ são descartadas.
+
+    Args e Returns: como em pontuar_arquivo_xgboost, com 'caminho_pesos' e 'caminho_perfil' no lugar do modelo.
+    """
+    perfil = SM.carregar_perfil_valido(caminho_perfil, caminho_pesos)
+    if perfil is None:
+        perfil = ajustar_score_manual(caminho_entrada, caminho_pesos, linhas_por_bloco)
+    blocos_pontuados = (SM.aplicar_perfil(df_bloco, perfil, caminho_pesos)
+                        for df_bloco in ler_em_blocos(caminho_entrada, linhas_por_bloco))
+    return _processar(blocos_pontuados, caminho_saida, top_k, guardar_carteira)
@@ -0,0 +1,217 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# --- Rastro de Etapas ---
+# Cada etapa cronometrada registra início, duração, linhas processadas e (opcionalmente)
+# o pico de memória alocada pelo Python durante a etapa, medido com o tracemalloc.
+# Etapas abertas dentro de outras viram filhas dela. A coleta é por contexto (thread ou
+# tarefa asyncio), então sessões simultâneas do Streamlit não se misturam; fora de uma
+# coleta, 'etapa' só mede o tempo para o log de depuração.
+
+class Etapa:
+    """Uma etapa cronometrada do rastro."""
+
+    __slots__ = ("id", "pai", "nome", "nivel", "inicio_ns", "duracao_ns", "linhas", "memoria_inicial",
+                 "pico_memoria", "thread")
+
+    def __init__(self, id_etapa: int, pai, nome: str, nivel: int, linhas: int = None):
+        self.id = id_etapa
+        self.pai = pai
+        self.nome = nome
+        self.nivel = nivel
+        self.inicio_ns = time.perf_counter_ns()
+        self.duracao_ns = None
+        self.linhas = linhas
+        self.memoria_inicial = None
+        self.pico_memoria = None
+        self.thread = threading.get_ident()
+
+    def para_dict(self, origem_ns: int) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "pai": self.pai,
+            "nome": self.nome,
+            "nivel": self.nivel,
+            "inicio_ms": (self.inicio_ns - origem_ns) / 1e6,
+            "duracao_ms": (self.duracao_ns or 0) / 1e6,
+            "linhas": int(self.linhas) if self.linhas is not None else None,
+            "pico_memoria_bytes": self.pico_memoria,
+            "thread": self.thread,
+        }
+
+class Rastro:
+    """
+    Etapas registradas durante uma coleta, exportáveis em JSON ou no formato de trace do
+    Chrome (chrome://tracing ou ui.perfetto.dev).
+    """
+
+    def __init__(self, memoria: bool = False):
+        self.memoria = memoria
+        self.etapas = []
+        self.origem_ns = time.perf_counter_ns()
+        self.inicio = time.time()
+        self._trava = threading.Lock()
+
+    def _registrar(self, etapa: Etapa):
+        with self._trava:
+            self.etapas.append(etapa)
+
+    def para_dict(self) -> Dict[str, Any]:
+        return {
+            "inicio": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.inicio)),
+            "memoria": self.memoria,
+            "etapas": [etapa.para_dict(self.origem_ns) for etapa in sorted(self.etapas, key=lambda e: e.inicio_ns)],
+        }
+
+    def para_chrome(self) -> Dict[str, Any]:
+        """Eventos completos ('X') em microssegundos, com linhas e pico de memória nos argumentos."""
+        eventos = []
+        for etapa in sorted(self.etapas, key=lambda e: e.inicio_ns):
+            argumentos = {"linhas": int(etapa.linhas)} if etapa.linhas is not None else {}
+            if etapa.pico_memoria is not None:
+                argumentos["pico_memoria_bytes"] = etapa.pico_memoria
+            eventos.append({"name": etapa.nome, "cat": "zoro", "ph": "X", "pid": os.getpid(), "tid": etapa.thread,
+                            "ts": (etapa.inicio_ns - self.origem_ns) / 1e3, "dur": (etapa.duracao_ns or 0) / 1e3,
+                            "args": argumentos})
+        return {"traceEvents": eventos, "displayTimeUnit": "ms"}
+
+    def salvar_json(self, caminho: str) -> str:
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.para_dict(), f, indent=2, ensure_ascii=False)
+        return caminho
+
+    def salvar_chrome(self, caminho: str) -> str:
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(self.para_chrome(), f)
+        return caminho
+
+    def resumo(self) -> pd.DataFrame:
+        """
+        Uma linha por etapa, na ordem em que começaram: nome (recuado pelo nível), duração,
+        fração do tempo total das etapas de primeiro nível, linhas, vazão e pico de memória (MB).
+        """
+        linhas = [etapa.para_dict(self.origem_ns) for etapa in sorted(self.etapas, key=lambda e: e.inicio_ns)]
+        if not linhas:
+            return pd.DataFrame(columns=["etapa", "nivel", "duracao_ms", "percentual", "linhas", "linhas_por_segundo",
+                                         "pico_memoria_mb"])
+        df = pd.DataFrame(linhas)
+        total_ms = df.loc[df["nivel"] == 0, "duracao_ms"].sum()
+        segundos = df["duracao_ms"] / 1000
+        linhas_etapa = pd.to_numeric(df["linhas"], errors="coerce")
+        return pd.DataFrame({
+            "etapa": ["  " * nivel + nome for nivel, nome in zip(df["nivel"], df["nome"])],
+            "nivel": df["nivel"],
+            "duracao_ms": df["duracao_ms"].round(2),
+            "percentual": (100 * df["duracao_ms"] / total_ms).round(1) if total_ms > 0 else np.nan,
+            "linhas": linhas_etapa.astype("Int64"),
+            "linhas_por_segundo": (linhas_etapa / segundos.where(segundos > 0)).round(0),
+            "pico_memoria_mb": pd.to_numeric(df["pico_memoria_bytes"], errors="coerce") / (1024 * 1024),
+        })
+
+_rastro_atual = contextvars.ContextVar("rastro_zoro", default=None)
+_pilha_atual = contextvars.ContextVar("pilha_etapas_zoro", default=())
+_contador = iter(range(1, 1 << 62))
+_trava_contador = threading.Lock()
+
+def _proximo_id() -> int:
+    with _trava_contador:
+        return next(_contador)
+
+# --- Coleta ---
+
+@contextmanager
+def coletar(memoria: bool = False):
+    """
+    Coleta as etapas executadas dentro do bloco e devolve o Rastro.
+
+    Com 'memoria', liga o tracemalloc (se ainda não estiver ligado) para medir o pico de
+    memória de cada etapa; o tracemalloc deixa o código bem mais lento, então os tempos
+    medidos assim servem para comparar etapas entre si, não como valores absolutos. O
+    pico é global ao processo: etapas em threads simultâneas entram umas nas outras.
+    """
+    rastro = Rastro(memoria)
+    ligou_tracemalloc = memoria and not tracemalloc.is_tracing()
+    if ligou_tracemalloc:
+        tracemalloc.start()
+    token_rastro = _rastro_atual.set(rastro)
+    token_pilha = _pilha_atual.set(())
+    try:
+        yield rastro
+    finally:
+        _pilha_atual.reset(token_pilha)
+        _rastro_atual.reset(token_rastro)
+        if ligou_tracemalloc:
+            tracemalloc.stop()
+
+def rastro_atual():
+    """O Rastro da coleta em andamento no contexto atual, ou None."""
+    return _rastro_atual.get()
+
+@contextmanager
+def etapa(nome: str, linhas: int = None):
+    """
+    Cronometra uma etapa (aninhada na etapa aberta, se houver). O objeto devolvido aceita
+    'linhas' depois de aberto, quando a quantidade só é conhecida no final.
+    """
+    rastro = _rastro_atual.get()
+    pilha = _pilha_atual.get()
+    atual = Etapa(_proximo_id(), pilha[-1].id if pilha else None, nome, len(pilha), linhas)
+    medir_memoria = rastro is not None and rastro.memoria and tracemalloc.is_tracing()
+    if medir_memoria:
+        memoria_atual, pico = tracemalloc.get_traced_memory()
+        if pilha:
+            # O pico da etapa-mãe até aqui fica guardado antes de o contador ser zerado.
+            pilha[-1].pico_memoria = max(pilha[-1].pico_memoria or 0, pico - pilha[-1].memoria_inicial)
+        atual.memoria_inicial = memoria_atual
+        tracemalloc.reset_peak()
+    token = _pilha_atual.set(pilha + (atual,))
+    try:
+        yield atual
+    finally:
+        atual.duracao_ns = time.perf_counter_ns() - atual.inicio_ns
+        _pilha_atual.reset(token)
+        if medir_memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            atual.pico_memoria = max(atual.pico_memoria or 0, pico - atual.memoria_inicial)
+            if pilha:
+                mae = pilha[-1]
+                mae.pico_memoria = max(mae.pico_memoria or 0, atual.memoria_inicial + atual.pico_memoria - mae.memoria_inicial)
+            tracemalloc.reset_peak()
+        if rastro is not None:
+            rastro._registrar(atual)
+        logger.debug("Etapa '%s': %.1f ms%s", nome, atual.duracao_ns / 1e6,
+                     f" ({atual.linhas} linhas)" if atual.linhas is not None else "")
+
+def _contar_linhas(valor):
+    """Linhas de um DataFrame, Series ou array; None para os demais valores."""
+    if isinstance(valor, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(valor)
+    return None
+
+def cronometrar(nome: str = None):
+    """
+    Decorador que transforma a função em uma etapa. As linhas são as do primeiro
+    argumento (DataFrame, Series ou array), quando houver.
+    """
+    def decorador(funcao):
+        nome_etapa = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            with etapa(nome_etapa, _contar_linhas(args[0]) if args else None):
+                return funcao(*args, **kwargs)
+        return envoltorio
+    return decorador
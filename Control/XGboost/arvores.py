@@ -0,0 +1,165 @@
+import json
+import os
+from typing import Dict, Any
+
+import numpy as np
+import pandas as pd
+
+import Control.Cache.cache     as Cache
+import Control.XGboost.encoder as Encoder
+
+# --- Árvores Compiladas ---
+# O booster é exportado em arrays planos (um nó por posição, todas as árvores em
+# sequência) e avaliado só com NumPy: carregar o .npz não importa o xgboost nem
+# desserializa o XGBClassifier. Nas folhas, os dois filhos apontam para a própria
+# folha, então todas as linhas descem o mesmo número de níveis sem tratamento especial.
+
+# Linhas avaliadas por vez (a matriz de nós tem linhas x árvores posições; lotes
+# pequenos mantêm os índices no cache do processador).
+LINHAS_POR_LOTE = 1024
+# Objetivos com saída logística (probabilidade = sigmoide da margem).
+OBJETIVOS_SUPORTADOS = ('binary:logistic',)
+
+# Florestas já carregadas, indexadas por caminho, mtime e tamanho do arquivo.
+_cache_florestas = Cache.CacheLRU(max_itens=8)
+
+# --- Exportação ---
+
+def _margem_base(aprendiz: Dict[str, Any]) -> float:
+    """Margem inicial: o base_score é gravado como probabilidade ('[5.48E-1]' nas versões 2.1+)."""
+    base = float(aprendiz["learner_model_param"]["base_score"].strip("[]"))
+    return float(np.log(base / (1 - base)))
+
+def exportar_arvores(caminho_artefatos: str, caminho_saida: str = None) -> str:
+    """
+    Converte o booster de um artefato .pkl em arrays NumPy (.npz, ao lado do .pkl por padrão).
+
+    Cada nó guarda a feature, o limiar (float32, como no XGBoost), o filho da esquerda, o
+    da direita, o filho seguido quando o valor é ausente e o valor da folha. 'raizes'
+    indica o primeiro nó de cada árvore. Só esta etapa precisa do xgboost instalado.
+
+    Returns:
+        str: Caminho do arquivo .npz.
+    """
+    import Control.XGboost.registro as Registro
+    artefatos = Registro.carregar_artefatos(caminho_artefatos)
+    booster = artefatos['model'].get_booster()
+    aprendiz = json.loads(booster.save_raw("json"))["learner"]
+    if aprendiz["objective"]["name"] not in OBJETIVOS_SUPORTADOS:
+        raise ValueError(f"Objetivo não suportado: {aprendiz['objective']['name']}")
+
+    arvores = aprendiz["gradient_booster"]["model"]["trees"]
+    # Modelos com early stopping no sklearn preveem só até a melhor rodada.
+    melhor_rodada = booster.attr("best_iteration")
+    if melhor_rodada is not None:
+        arvores = arvores[:int(melhor_rodada) + 1]
+
+    features, limiares, esquerda, direita, ausente, folhas, raizes, profundidade = [], [], [], [], [], [], [], 0
+    inicio = 0
+    for arvore in arvores:
+        filhos_esquerda = np.array(arvore["left_children"], dtype=np.int64)
+        filhos_direita = np.array(arvore["right_children"], dtype=np.int64)
+        folha = filhos_esquerda < 0
+        nos = np.arange(len(filhos_esquerda))
+        condicoes = np.array(arvore["split_conditions"], dtype=np.float32)
+        filhos_esquerda = np.where(folha, nos, filhos_esquerda) + inicio
+        filhos_direita = np.where(folha, nos, filhos_direita) + inicio
+
+        features.append(np.where(folha, 0, arvore["split_indices"]))
+        limiares.append(np.where(folha, np.float32(0), condicoes))
+        esquerda.append(filhos_esquerda)
+        direita.append(filhos_direita)
+        ausente.append(np.where(np.array(arvore["default_left"], dtype=bool), filhos_esquerda, filhos_direita))
+        folhas.append(np.where(folha, condicoes, np.float32(0)))
+        raizes.append(inicio)
+
+        niveis = np.zeros(len(nos), dtype=np.int64)
+        for no in nos:
+            if not folha[no]:
+                niveis[arvore["left_children"][no]] = niveis[arvore["right_children"][no]] = niveis[no] + 1
+        profundidade = max(profundidade, int(niveis.max()))
+        inicio += len(nos)
+
+    caminho_saida = caminho_saida or os.path.splitext(caminho_artefatos)[0] + ".npz"
+    np.savez(
+        caminho_saida,
+        feature=np.concatenate(features).astype(np.int32),
+        limiar=np.concatenate(limiares).astype(np.float32),
+        esquerda=np.concatenate(esquerda).astype(np.int32),
+        direita=np.concatenate(direita).astype(np.int32),
+        ausente=np.concatenate(ausente).astype(np.int32),
+        folha=np.concatenate(folhas).astype(np.float32),
+        raizes=np.array(raizes, dtype=np.int32),
+        profundidade=np.int32(profundidade),
+        margem_base=np.float64(_margem_base(aprendiz)),
+        colunas=np.array(artefatos['columns'], dtype=str),
+    )
+    return caminho_saida
+
+# --- Avaliação ---
+
+def carregar_arvores(caminho: str) -> Dict[str, Any]:
+    """
+    Carrega as árvores exportadas (uma vez por versão do arquivo) e compila o encoder
+    a partir das colunas gravadas.
+    """
+    estado = os.stat(caminho)
+    chave = (caminho, estado.st_mtime_ns, estado.st_size)
+
+    def carregar():
+        with np.load(caminho) as arquivo:
+            floresta = {nome: arquivo[nome] for nome in arquivo.files}
+        floresta["profundidade"] = int(floresta["profundidade"])
+        floresta["margem_base"] = float(floresta["margem_base"])
+        floresta["colunas"] = floresta["colunas"].tolist()
+        floresta["encoder"] = Encoder.compilar_encoder(floresta["colunas"])
+        # Filhos intercalados: o próximo nó é filhos[2 * nó + (vai para a direita)].
+        floresta["filhos"] = np.column_stack([floresta["esquerda"], floresta["direita"]]).ravel()
+        return floresta
+
+    return _cache_florestas.obter_ou_calcular(chave, carregar)
+
+def prever_margem(floresta: Dict[str, Any], matriz: np.ndarray) -> np.ndarray:
+    """
+    Soma das folhas de todas as árvores mais a margem base, para cada linha da matriz
+    (float32, na ordem das colunas do treino).
+
+    Todas as árvores avançam juntas um nível por iteração: o valor da feature de cada nó
+    atual é lido da linha, comparado com o limiar (x < limiar vai para a esquerda; ausente
+    segue o filho padrão) e o nó é trocado pelo filho correspondente.
+    """
+    matriz = np.ascontiguousarray(matriz, dtype=np.float32)
+    margens = np.empty(len(matriz), dtype=np.float64)
+    feature, limiar, filhos, ausente = floresta["feature"], floresta["limiar"], floresta["filhos"], floresta["ausente"]
+    for comeco in range(0, len(matriz), LINHAS_POR_LOTE):
+        lote = matriz[comeco:comeco + LINHAS_POR_LOTE]
+        # Posição do início de cada linha na matriz achatada.
+        inicio_linhas = (np.arange(len(lote), dtype=np.int64) * matriz.shape[1])[:, None]
+        nos = np.broadcast_to(floresta["raizes"], (len(lote), len(floresta["raizes"])))
+        for _ in range(floresta["profundidade"]):
+            valores = lote.ravel().take(inicio_linhas + feature.take(nos))
+            proximos = filhos.take(2 * nos + ~(valores < limiar.take(nos)))
+            ausentes = np.isnan(valores)
+            nos = np.where(ausentes, ausente.take(nos), proximos) if ausentes.any() else proximos
+        margens[comeco:comeco + len(lote)] = floresta["folha"].take(nos).sum(axis=1, dtype=np.float64)
+    return margens + floresta["margem_base"]
+
+def prever(floresta: Dict[str, Any], matriz: np.ndarray) -> np.ndarray:
+    """Probabilidade de recuperação (classe 1) de cada linha, como o predict_proba[:, 1]."""
+    return 1.0 / (1.0 + np.exp(-prever_margem(floresta, matriz)))
+
+def gerar_score_carteira(df_prospects: pd.DataFrame, caminho_arvores: str) -> pd.DataFrame:
+    """
+    Mesmo resultado do model_run.gerar_score_carteira, a partir das árvores exportadas.
+
+    Args:
+        df_prospects (pd.DataFrame): O DataFrame contendo os dados dos prospects.
+        caminho_arvores (str): Arquivo .npz gerado por exportar_arvores.
+
+    Returns:
+        pd.DataFrame: O DataFrame original com a coluna 'score_recuperacao', ordenado do maior para o menor score.
+    """
+    floresta = carregar_arvores(caminho_arvores)
+    df_resultado = df_prospects.copy()
+    df_resultado['score_recuperacao'] = prever(floresta, Encoder.codificar(df_prospects, floresta["encoder"]))
+    return df_resultado.sort_values(by='score_recuperacao', ascending=False)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Any
+
+# --- Constantes do Encoder ---
+# Colunas categóricas codificadas em one-hot no treino (ver model_training.processamento_treino).
+COLUNAS_CATEGORICAS = ['porte_cliente', 'ramo_atuacao_cliente', 'score_risco_interno', 'regiao']
+
+# --- Compilação ---
+
+def compilar_encoder(colunas_do_treino: list, colunas_categoricas: list = COLUNAS_CATEGORICAS) -> Dict[str, Any]:
+    """
+    Compila a lista de colunas do treino em um mapa de codificação.
+
+    Cada coluna 'categoria_valor' gerada pelo get_dummies vira uma entrada
+    categoria -> {valor: índice da coluna}; as demais colunas são numéricas e guardam
+    apenas o seu índice. Assim a predição escreve direto na matriz do modelo.
+
+    Returns:
+        dict: 'n_colunas', 'numericas' (coluna -> índice) e 'categoricas'
+            (coluna -> {valor: índice}).
+    """
+    numericas, categoricas = {}, {}
+    for indice, coluna in enumerate(colunas_do_treino):
+        categoria = next((c for c in colunas_categoricas if coluna.startswith(f"{c}_")), None)
+        if categoria is None:
+            numericas[coluna] = indice
+        else:
+            categoricas.setdefault(categoria, {})[coluna[len(categoria) + 1:]] = indice
+    return {"n_colunas": len(colunas_do_treino), "numericas": numericas, "categoricas": categoricas}
+
+# --- Codificação ---
+
+def codificar(df: pd.DataFrame, encoder: Dict[str, Any], saida: np.ndarray = None) -> np.ndarray:
+    """
+    Monta a matriz float32 (prospects x colunas do modelo) lendo só as colunas usadas.
+
+    Equivale a get_dummies + reindex(fill_value=0): colunas numéricas são copiadas,
+    cada categoria conhecida marca 1 na sua coluna, e categorias desconhecidas, valores
+    ausentes e colunas que faltam no DataFrame ficam em 0.
+
+    Args:
+        df (pd.DataFrame): Prospects.
+        encoder (dict): Mapa gerado por compilar_encoder.
+        saida (np.ndarray, optional): Matriz pré-alocada (float32) para reaproveitar entre lotes.
+    """
+    formato = (len(df), encoder["n_colunas"])
+    if saida is None or saida.shape != formato:
+        saida = np.zeros(formato, dtype=np.float32)
+    else:
+        saida.fill(0)
+
+    for coluna, indice in encoder["numericas"].items():
+        if coluna in df.columns:
+            saida[:, indice] = df[coluna].to_numpy(dtype=np.float32, na_value=np.nan)
+
+    for coluna, indices_por_valor in encoder["categoricas"].items():
+        if coluna not in df.columns:
+            continue
+        # Fatoriza a coluna e traduz só os valores distintos (como texto, igual aos nomes
+        # de coluna do get_dummies); ausentes (-1) e desconhecidos apontam para -1.
+        codigos, distintos = pd.factorize(df[coluna])
+        destino = np.array([indices_por_valor.get(str(valor), -1) for valor in distintos] + [-1], dtype=np.intp)
+        colunas = destino[codigos]
+        linhas = np.flatnonzero(colunas >= 0)
+        saida[linhas, colunas[linhas]] = 1.0
+    return saida
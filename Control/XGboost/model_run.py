@@ -1,35 +1,114 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
-import joblib
+import xgboost as xgb
 from typing import Dict, Any
 
+import Control.Cache.cache      as Cache
+import Control.XGboost.encoder  as Encoder
+import Control.XGboost.registro as Registro
+import Control.Telemetria.telemetria as Telemetria
+
+# --- Constantes da Inferência em Lote ---
+# Linhas por fatia enviada a cada tarefa de predição.
+LINHAS_POR_FATIA = 50_000
+
+# --- Constantes das Contribuições ---
+# Coluna com a margem inicial do modelo (parte do score que não depende do prospect).
+COLUNA_BASE = 'base'
+# Contribuições já calculadas, por versão do modelo e colunas usadas (ver gerar_contribuicoes).
+_cache_contribuicoes = Cache.CacheLRU(max_itens=8, max_bytes=256 * 1024 * 1024)
+
 def _carregar_artefatos_modelo(caminho_artefatos: str) -> Dict[str, Any]:
     """
     Carrega os artefatos do modelo (objeto do modelo e lista de colunas) de um arquivo .pkl.
+    O registro desserializa cada versão do arquivo uma única vez por processo.
     """
-    return joblib.load(caminho_artefatos)
+    return Registro.carregar_artefatos(caminho_artefatos)
 
-def _preparar_dados_para_predicao(df: pd.DataFrame, colunas_do_treino: list) -> pd.DataFrame:
+def _preparar_dados_para_predicao(df: pd.DataFrame, artefatos: Dict[str, Any]) -> np.ndarray:
     """
-    Realiza o one-hot encoding e alinha as colunas do DataFrame de prospects
-    com as colunas esperadas pelo modelo.
+    Monta a matriz de entrada do modelo (float32, na ordem das colunas do treino)
+    com o encoder compilado do artefato, lendo apenas as colunas que o modelo usa.
     """
-    # Define as colunas categóricas esperadas. É mais robusto definir explicitamente
-    # do que inferir, para garantir consistência com o treino.
-    colunas_categoricas = ['porte_cliente', 'ramo_atuacao_cliente', 'score_risco_interno', 'regiao']
-    
-    # Garante que apenas as colunas categóricas existentes no DataFrame sejam processadas.
-    colunas_para_encode = [col for col in colunas_categoricas if col in df.columns]
-    
-    df_encoded = pd.get_dummies(df, columns=colunas_para_encode)
-    
-    # Remove o identificador, se existir.
-    X_prospects = df_encoded.drop('id_cliente', axis=1, errors='ignore')
-    
-    # Alinha as colunas com o modelo, preenchendo com 0 as que não existem nos dados de entrada.
-    # Isso garante que o modelo sempre receba o formato de dados que ele espera.
-    X_prospects_aligned = X_prospects.reindex(columns=colunas_do_treino, fill_value=0)
-    
-    return X_prospects_aligned
+    encoder = artefatos.get('encoder') or Encoder.compilar_encoder(artefatos['columns'])
+    return Encoder.codificar(df, encoder)
+
+def prever_em_lote(modelo, matriz: np.ndarray, n_jobs: int = 1, linhas_por_fatia: int = LINHAS_POR_FATIA,
+                   threads_por_fatia: int = None) -> tuple:
+    """
+    Prediz a probabilidade de recuperação (classe 1) de uma matriz já codificada, dividida
+    em fatias de linhas processadas por 'n_jobs' threads.
+
+    Usa o inplace_predict do booster sobre fatias (views) da matriz float32, sem cópia
+    nem DataFrame. O booster é copiado com 'nthread' = 'threads_por_fatia', de modo que o
+    total de threads fica limitado a n_jobs x threads_por_fatia (sem disputar a CPU com
+    outras carteiras pontuadas ao mesmo tempo). Com threads_por_fatia=None, o XGBoost usa
+    o padrão dele (todos os núcleos), indicado apenas para n_jobs=1.
+
+    Returns:
+        tuple: (probabilidades na ordem original das linhas, relatório de vazão com linhas,
+            segundos, linhas por segundo, fatias, n_jobs e threads por fatia).
+    """
+    inicio = time.perf_counter()
+    booster = modelo.get_booster()
+    if threads_por_fatia is not None:
+        booster = booster.copy()
+        booster.set_param({"nthread": threads_por_fatia})
+    faixas = [(i, min(i + linhas_por_fatia, len(matriz))) for i in range(0, len(matriz), max(1, linhas_por_fatia))]
+    probabilidades = np.empty(len(matriz), dtype=np.float32)
+
+    def prever(faixa):
+        comeco, fim = faixa
+        probabilidades[comeco:fim] = booster.inplace_predict(matriz[comeco:fim], missing=modelo.missing,
+                                                             validate_features=False)
+
+    if n_jobs > 1 and len(faixas) > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            list(executor.map(prever, faixas))
+    else:
+        for faixa in faixas:
+            prever(faixa)
+
+    segundos = time.perf_counter() - inicio
+    relatorio = {
+        "linhas": len(matriz),
+        "segundos": segundos,
+        "linhas_por_segundo": len(matriz) / segundos if segundos > 0 else float("inf"),
+        "fatias": len(faixas),
+        "n_jobs": n_jobs,
+        "threads_por_fatia": threads_por_fatia,
+    }
+    return probabilidades, relatorio
+
+def gerar_score_lote(df_prospects: pd.DataFrame, caminho_artefatos_modelo: str, n_jobs: int = 1,
+                     linhas_por_fatia: int = LINHAS_POR_FATIA, threads_por_fatia: int = 1) -> tuple:
+    """
+    Modo em lote do gerar_score_carteira, com controle explícito de paralelismo.
+
+    Args:
+        df_prospects (pd.DataFrame): O DataFrame contendo os dados dos prospects.
+        caminho_artefatos_modelo (str): O caminho para o arquivo .pkl que contém o modelo e as colunas.
+        n_jobs (int): Threads de predição, cada uma com uma fatia por vez.
+        linhas_por_fatia (int): Linhas por fatia.
+        threads_por_fatia (int): Threads internas do XGBoost em cada fatia.
+
+    Returns:
+        tuple: (DataFrame com 'score_recuperacao', ordenado como em gerar_score_carteira,
+            relatório de vazão de prever_em_lote).
+    """
+    artefatos = _carregar_artefatos_modelo(caminho_artefatos_modelo)
+    with Telemetria.etapa("codificar", len(df_prospects)):
+        X_prospects = _preparar_dados_para_predicao(df_prospects, artefatos)
+    with Telemetria.etapa("prever", len(df_prospects)):
+        scores_recuperacao, relatorio = prever_em_lote(artefatos['model'], X_prospects, n_jobs, linhas_por_fatia,
+                                                       threads_por_fatia)
+
+    df_resultado = df_prospects.copy()
+    df_resultado['score_recuperacao'] = scores_recuperacao
+    return df_resultado.sort_values(by='score_recuperacao', ascending=False), relatorio
 
 def gerar_score_carteira(df_prospects: pd.DataFrame, caminho_artefatos_modelo: str) -> pd.DataFrame:
     """
@@ -45,13 +124,14 @@ def gerar_score_carteira(df_prospects: pd.DataFrame, caminho_artefatos_modelo: s
     # A leitura do CSV foi removida. A função agora recebe o DataFrame diretamente.
     artefatos = _carregar_artefatos_modelo(caminho_artefatos_modelo)
     modelo_carregado = artefatos['model']
-    colunas_do_treino = artefatos['columns']
 
     # Prepara os dados de entrada para terem a mesma estrutura dos dados de treino.
-    X_prospects_aligned = _preparar_dados_para_predicao(df_prospects, colunas_do_treino)
+    with Telemetria.etapa("codificar", len(df_prospects)):
+        X_prospects_aligned = _preparar_dados_para_predicao(df_prospects, artefatos)
 
     # Gera as probabilidades de recuperação (classe 1).
-    scores_recuperacao = modelo_carregado.predict_proba(X_prospects_aligned)[:, 1]
+    with Telemetria.etapa("prever", len(df_prospects)):
+        scores_recuperacao = modelo_carregado.predict_proba(X_prospects_aligned)[:, 1]
 
     # Consolida o resultado no DataFrame original.
     df_resultado = df_prospects.copy()
@@ -59,6 +139,71 @@ def gerar_score_carteira(df_prospects: pd.DataFrame, caminho_artefatos_modelo: s
 
     return df_resultado.sort_values(by='score_recuperacao', ascending=False)
 
+# --- Contribuições por Feature ---
+
+def _matriz_agrupamento(encoder: Dict[str, Any]) -> tuple:
+    """
+    Matriz (colunas do modelo + base) x (colunas originais + base) que soma as colunas
+    one-hot de cada categoria, para agregar as contribuições com um único produto.
+    """
+    originais = list(encoder["numericas"]) + list(encoder["categoricas"]) + [COLUNA_BASE]
+    agrupamento = np.zeros((encoder["n_colunas"] + 1, len(originais)))
+    for coluna, indice in encoder["numericas"].items():
+        agrupamento[indice, originais.index(coluna)] = 1.0
+    for coluna, indices_por_valor in encoder["categoricas"].items():
+        agrupamento[list(indices_por_valor.values()), originais.index(coluna)] = 1.0
+    agrupamento[-1, -1] = 1.0
+    return agrupamento, originais
+
+def gerar_contribuicoes(df_prospects: pd.DataFrame, caminho_artefatos_modelo: str,
+                        aproximado: bool = False) -> pd.DataFrame:
+    """
+    Contribuição de cada feature original para o score de cada prospect, na escala da
+    margem (log-odds): a soma da linha é o logit do 'score_recuperacao'.
+
+    Usa a saída nativa do booster (pred_contribs, valores SHAP exatos das árvores) para a
+    carteira inteira de uma vez, e soma as colunas one-hot de volta na categoria de origem
+    (ex.: 'porte_cliente'). O resultado de cada linha fica em cache pela impressão digital
+    das colunas que o modelo usa e pela versão do modelo: reexibir a carteira ou um
+    subconjunto dela só calcula as linhas novas.
+
+    Args:
+        df_prospects (pd.DataFrame): O DataFrame contendo os dados dos prospects.
+        caminho_artefatos_modelo (str): O caminho para o arquivo .pkl que contém o modelo e as colunas.
+        aproximado (bool): Usa a atribuição aproximada do XGBoost (caminho da decisão em cada
+            árvore), cerca de 100x mais rápida que o SHAP exato em carteiras grandes. A soma da
+            linha continua igual ao logit do score, mas a divisão entre as colunas muda.
+
+    Returns:
+        pd.DataFrame: Mesmo índice de df_prospects, uma coluna por feature original e a 'base'.
+    """
+    artefatos = _carregar_artefatos_modelo(caminho_artefatos_modelo)
+    encoder = artefatos.get('encoder') or Encoder.compilar_encoder(artefatos['columns'])
+    agrupamento, originais = _matriz_agrupamento(encoder)
+    usadas = [coluna for coluna in originais if coluna in df_prospects.columns]
+
+    # Uma tabela por (versão do modelo, colunas presentes): hash da linha -> contribuições.
+    chave = (Registro.impressao_artefato(caminho_artefatos_modelo), tuple(usadas), aproximado)
+    tabela = _cache_contribuicoes.obter(chave) or {"hashes": pd.Index([], dtype=np.uint64),
+                                                   "valores": np.empty((0, len(originais)))}
+    hashes = pd.util.hash_pandas_object(df_prospects[usadas], index=False).to_numpy()
+    posicoes = tabela["hashes"].get_indexer(hashes)
+
+    novos = np.unique(hashes[posicoes < 0])
+    if len(novos):
+        _, primeiras = np.unique(hashes, return_index=True)
+        primeiras = primeiras[np.isin(hashes[primeiras], novos)]
+        matriz = Encoder.codificar(df_prospects.iloc[primeiras], encoder)
+        dados = xgb.DMatrix(matriz, missing=artefatos['model'].missing)
+        contribuicoes = artefatos['model'].get_booster().predict(dados, pred_contribs=True, approx_contribs=aproximado,
+                                                                 validate_features=False)
+        tabela = {"hashes": tabela["hashes"].append(pd.Index(hashes[primeiras])),
+                  "valores": np.vstack([tabela["valores"], contribuicoes @ agrupamento])}
+        _cache_contribuicoes.guardar(chave, tabela, tabela["valores"].nbytes + tabela["hashes"].nbytes)
+        posicoes = tabela["hashes"].get_indexer(hashes)
+
+    return pd.DataFrame(tabela["valores"][posicoes], index=df_prospects.index, columns=originais)
+
 # # --- Exemplo de Uso (para teste do módulo) ---
 # if __name__ == '__main__':
 #     # Simula um DataFrame de entrada, como no app.py
@@ -1,14 +1,50 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 import xgboost as xgb
 import joblib # Usaremos joblib para salvar e carregar o modelo
 import datetime
 
+import Control.XGboost.encoder     as Encoder
+import Control.XGboost.registro    as Registro
+import Control.Streaming.streaming as Streaming
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes do Pipeline de Treino ---
+# Coluna com o desfecho (1 = pagou) na base histórica.
+COLUNA_ALVO = 'status_final_pago'
+# Colunas numéricas usadas como features (as categóricas estão em Encoder.COLUNAS_CATEGORICAS).
+COLUNAS_NUMERICAS = ['valor_divida_mil', 'tempo_inadimplencia_dias']
+# Linhas lidas da base histórica por vez.
+LINHAS_POR_BLOCO_TREINO = 100_000
+# Fração das linhas separada para validação (early stopping e AUC).
+FRACAO_VALIDACAO = 0.2
+RODADAS_MAXIMAS = 1000
+# Rodadas sem melhora da AUC de validação antes de parar.
+PACIENCIA = 30
+# Parâmetros comuns a todas as configurações.
+PARAMETROS_BASE = {'objective': 'binary:logistic', 'eval_metric': 'auc', 'tree_method': 'hist', 'max_bin': 256}
+# Configurações avaliadas na busca de hiperparâmetros.
+GRADE_PADRAO = [
+    {'max_depth': 3, 'eta': 0.10, 'min_child_weight': 1, 'subsample': 0.8, 'colsample_bytree': 0.8},
+    {'max_depth': 4, 'eta': 0.05, 'min_child_weight': 5, 'subsample': 0.8, 'colsample_bytree': 0.8},
+    {'max_depth': 6, 'eta': 0.05, 'min_child_weight': 5, 'subsample': 0.8, 'colsample_bytree': 0.8},
+    {'max_depth': 8, 'eta': 0.03, 'min_child_weight': 10, 'subsample': 0.7, 'colsample_bytree': 0.7},
+]
+
+# Matrizes de treino e validação de cada processo da busca (montadas uma vez por processo).
+_matrizes_trabalhador = None
+
 def gerar_dados_ficticios():
     # --- ETAPA 1: SIMULAR O CENÁRIO PASSADO (TREINAMENTO DO MODELO) ---
     # Esta parte gera a base histórica e treina o modelo, como fizemos antes.
 
-    print("--- ETAPA 1: Treinando o modelo com dados históricos ---")
+    logger.info("--- ETAPA 1: Treinando o modelo com dados históricos ---")
 
     # Gerar a base de dados histórica fictícia
     num_amostras_treino = 10000
@@ -26,11 +62,7 @@ def gerar_dados_ficticios():
 
 def processamento_treino(dados_treinamento, num_amostras_treino):
     df_treino = pd.DataFrame(dados_treinamento)
-    prob_base = 0.5 - df_treino['valor_divida_mil'] * 0.001 - df_treino['tempo_inadimplencia_dias'] * 0.0002
-    porte_map = {'Pequeno': -0.1, 'Médio': 0.05, 'Grande': 0.2}
-    score_map = {'A': 0.3, 'B': 0.15, 'C': 0.0, 'D': -0.2, 'F': -0.4}
-    prob_base += df_treino['porte_cliente'].map(porte_map) + df_treino['score_risco_interno'].map(score_map)
-    prob_final_sigmoid = 1 / (1 + np.exp(-(prob_base + np.random.normal(0, 0.1, size=num_amostras_treino))))
+    prob_final_sigmoid = _probabilidade_pagamento(df_treino, np.random.normal(0, 0.1, size=num_amostras_treino))
     df_treino['status_final_pago'] = (prob_final_sigmoid > np.random.rand(num_amostras_treino)).astype(int)
 
     # Pré-processamento e Treinamento
@@ -43,22 +75,235 @@ def processamento_treino(dados_treinamento, num_amostras_treino):
     return model, X_train
     
 def salvar_modelo_treinado(model, X_train):
+    return salvar_artefato(model, X_train.columns.tolist())
+
+def salvar_artefato(modelo, colunas: list, metadados: dict = None, diretorio: str = ".") -> str:
+    """
+    Grava o artefato versionado (modelo, colunas, encoder e metadados do treino) como
+    'modelo_score_recuperacao_with_columns_v<N>_<YYMMDDHHMM>.pkl', com N = próxima versão do diretório.
+
+    Returns:
+        str: Caminho do arquivo gravado.
+    """
+    versao = Registro.proxima_versao(diretorio)
+    agora = datetime.datetime.now()
     artefatos_modelo = {
-        'model': model,
-        'columns': X_train.columns.tolist() # Salvamos a lista de nomes das colunas
+        'model': modelo,
+        'columns': colunas, # Salvamos a lista de nomes das colunas
+        'encoder': Encoder.compilar_encoder(colunas), # Mapa categoria -> coluna usado na predição
+        'metadados': {'versao': versao, 'gravado_em': agora.isoformat(timespec='seconds'), **(metadados or {})},
     }
-    
-    # Pega a data de hoje
-    data_hoje = datetime.date.today()
-    # Formata a data no formato YYMMDD
-    data_formatada = data_hoje.strftime("%y%m%d%H%M")
 
     # Salvar o dicionário (os "artefatos") em um único arquivo
-    caminho_modelo = f'modelo_score_recuperacao_with_columns_v1_{data_formatada}.pkl'
+    caminho_modelo = os.path.join(diretorio, f'modelo_score_recuperacao_with_columns_v{versao}_{agora.strftime("%y%m%d%H%M")}.pkl')
     joblib.dump(artefatos_modelo, caminho_modelo) # Agora salvamos o dicionário
+    return caminho_modelo
 
-    # print(f"Artefatos do modelo (modelo + colunas) salvos em '{caminho_modelo}'")
-    
 def treinar_modelo(dados_treinamento, num_amostras_treino):
     model, X_train = processamento_treino(dados_treinamento, num_amostras_treino)
-    salvar_modelo_treinado(model, X_train)
\ No newline at end of file
+    return salvar_modelo_treinado(model, X_train)
+
+# --- Base Histórica em Disco ---
+
+def _probabilidade_pagamento(df: pd.DataFrame, ruido: np.ndarray) -> np.ndarray:
+    """Probabilidade de pagamento usada para rotular a base fictícia (mesma regra de processamento_treino)."""
+    prob_base = 0.5 - df['valor_divida_mil'] * 0.001 - df['tempo_inadimplencia_dias'] * 0.0002
+    porte_map = {'Pequeno': -0.1, 'Médio': 0.05, 'Grande': 0.2}
+    score_map = {'A': 0.3, 'B': 0.15, 'C': 0.0, 'D': -0.2, 'F': -0.4}
+    prob_base += df['porte_cliente'].map(porte_map) + df['score_risco_interno'].map(score_map)
+    return (1 / (1 + np.exp(-(prob_base + ruido)))).to_numpy()
+
+def gerar_base_historica(caminho: str, num_amostras: int = 1_000_000, linhas_por_bloco: int = LINHAS_POR_BLOCO_TREINO,
+                         seed: int = 0) -> str:
+    """
+    Grava em disco (CSV ou Parquet, em blocos) uma base histórica fictícia rotulada, com
+    as mesmas distribuições de gerar_dados_ficticios, para treinar com bases grandes.
+    """
+    escritor = Streaming.EscritorBlocos(caminho)
+    try:
+        for indice, inicio in enumerate(range(0, num_amostras, linhas_por_bloco)):
+            rng = np.random.default_rng([seed, indice])
+            n = min(linhas_por_bloco, num_amostras - inicio)
+            df_bloco = pd.DataFrame({
+                'id_cliente': np.arange(inicio + 1, inicio + n + 1),
+                'valor_divida_mil': rng.lognormal(mean=3.5, sigma=1.5, size=n).round(2),
+                'tempo_inadimplencia_dias': rng.integers(30, 1800, size=n),
+                'porte_cliente': rng.choice(['Pequeno', 'Médio', 'Grande'], size=n, p=[0.5, 0.4, 0.1]),
+                'ramo_atuacao_cliente': rng.choice(['Produtor', 'Cooperativa', 'Distribuidor', 'Indústria'], size=n, p=[0.4, 0.3, 0.2, 0.1]),
+                'score_risco_interno': rng.choice(['A', 'B', 'C', 'D', 'F'], size=n, p=[0.1, 0.2, 0.4, 0.2, 0.1]),
+                'regiao': rng.choice(['Sul', 'Sudeste', 'Centro-Oeste', 'Nordeste', 'Norte'], size=n, p=[0.3, 0.3, 0.2, 0.1, 0.1]),
+            })
+            probabilidade = _probabilidade_pagamento(df_bloco, rng.normal(0, 0.1, size=n))
+            df_bloco[COLUNA_ALVO] = (probabilidade > rng.random(n)).astype(int)
+            escritor.escrever(df_bloco)
+    finally:
+        escritor.fechar()
+    return caminho
+
+# --- Pipeline de Treino em Blocos ---
+
+def montar_colunas_treino(caminho_base: str, linhas_por_bloco: int = LINHAS_POR_BLOCO_TREINO) -> list:
+    """
+    Lê só as colunas categóricas da base, em blocos, e monta a lista de colunas do modelo
+    na mesma ordem do get_dummies: numéricas e depois 'categoria_valor' em ordem alfabética.
+    """
+    distintos = {coluna: set() for coluna in Encoder.COLUNAS_CATEGORICAS}
+    for df_bloco in Streaming.ler_em_blocos(caminho_base, linhas_por_bloco, colunas=Encoder.COLUNAS_CATEGORICAS):
+        for coluna in df_bloco.columns:
+            distintos[coluna].update(df_bloco[coluna].dropna().astype(str).unique())
+    return COLUNAS_NUMERICAS + [f"{coluna}_{valor}" for coluna in Encoder.COLUNAS_CATEGORICAS
+                                for valor in sorted(distintos[coluna])]
+
+class IteradorBase(xgb.DataIter):
+    """
+    Entrega a base histórica ao XGBoost bloco a bloco, já codificada pelo encoder.
+
+    Cada linha vai para validação com probabilidade 'fracao_validacao', por um sorteio
+    fixo por bloco (semente, índice do bloco): os iteradores de treino e de validação
+    percorrem o mesmo arquivo e separam exatamente as mesmas linhas.
+    """
+
+    def __init__(self, caminho_base: str, encoder: dict, colunas: list, parte: str = 'treino',
+                 fracao_validacao: float = FRACAO_VALIDACAO, linhas_por_bloco: int = LINHAS_POR_BLOCO_TREINO,
+                 seed: int = 0):
+        self.caminho_base = caminho_base
+        self.encoder = encoder
+        self.colunas = colunas
+        self.parte = parte
+        self.fracao_validacao = fracao_validacao
+        self.linhas_por_bloco = linhas_por_bloco
+        self.seed = seed
+        self.linhas = 0
+        self._blocos = None
+        self._indice = 0
+        super().__init__()
+
+    def reset(self):
+        self._blocos = None
+        self._indice = 0
+        self.linhas = 0
+
+    def next(self, input_data) -> bool:
+        if self._blocos is None:
+            leitura = COLUNAS_NUMERICAS + Encoder.COLUNAS_CATEGORICAS + [COLUNA_ALVO]
+            self._blocos = Streaming.ler_em_blocos(self.caminho_base, self.linhas_por_bloco, colunas=leitura)
+        while True:
+            df_bloco = next(self._blocos, None)
+            if df_bloco is None:
+                return False
+            indice, self._indice = self._indice, self._indice + 1
+            validacao = np.random.default_rng([self.seed, indice]).random(len(df_bloco)) < self.fracao_validacao
+            selecao = (validacao if self.parte == 'validacao' else ~validacao) & df_bloco[COLUNA_ALVO].notna().to_numpy()
+            if selecao.any():
+                break
+        df_bloco = df_bloco[selecao]
+        self.linhas += len(df_bloco)
+        input_data(data=Encoder.codificar(df_bloco, self.encoder), label=df_bloco[COLUNA_ALVO].to_numpy(dtype=np.float32),
+                   feature_names=self.colunas)
+        return True
+
+def _montar_matrizes(caminho_base: str, colunas: list, fracao_validacao: float, linhas_por_bloco: int, seed: int) -> tuple:
+    """
+    QuantileDMatrix de treino e de validação a partir dos iteradores: o XGBoost guarda só
+    os bins do histograma (1 byte por célula), nunca a base inteira em float.
+    """
+    encoder = Encoder.compilar_encoder(colunas)
+    iterador_treino = IteradorBase(caminho_base, encoder, colunas, 'treino', fracao_validacao, linhas_por_bloco, seed)
+    iterador_validacao = IteradorBase(caminho_base, encoder, colunas, 'validacao', fracao_validacao, linhas_por_bloco, seed)
+    dtreino = xgb.QuantileDMatrix(iterador_treino, max_bin=PARAMETROS_BASE['max_bin'])
+    dvalidacao = xgb.QuantileDMatrix(iterador_validacao, ref=dtreino)
+    return dtreino, dvalidacao
+
+def _inicializar_trabalhador(*argumentos):
+    global _matrizes_trabalhador
+    _matrizes_trabalhador = _montar_matrizes(*argumentos)
+
+def _avaliar_configuracao(parametros: dict, threads: int, rodadas_maximas: int, paciencia: int, seed: int,
+                          matrizes: tuple = None) -> dict:
+    """
+    Treina uma configuração com early stopping na AUC de validação e devolve a AUC, a
+    melhor rodada e o modelo (bytes) já cortado na melhor rodada.
+    """
+    dtreino, dvalidacao = matrizes or _matrizes_trabalhador
+    inicio = time.perf_counter()
+    booster = xgb.train({**PARAMETROS_BASE, **parametros, 'nthread': threads, 'seed': seed}, dtreino,
+                        num_boost_round=rodadas_maximas, evals=[(dvalidacao, 'validacao')],
+                        early_stopping_rounds=paciencia, verbose_eval=False)
+    melhor_rodada = booster.best_iteration
+    return {
+        'parametros': parametros,
+        'auc_validacao': float(booster.best_score),
+        'melhor_rodada': melhor_rodada,
+        'segundos': time.perf_counter() - inicio,
+        'linhas': (dtreino.num_row(), dvalidacao.num_row()),
+        'modelo': bytes(booster[:melhor_rodada + 1].save_raw()),
+    }
+
+def treinar_pipeline(caminho_base: str, grade: list = None, n_workers: int = 1,
+                     fracao_validacao: float = FRACAO_VALIDACAO, linhas_por_bloco: int = LINHAS_POR_BLOCO_TREINO,
+                     rodadas_maximas: int = RODADAS_MAXIMAS, paciencia: int = PACIENCIA, seed: int = 0,
+                     diretorio: str = ".") -> str:
+    """
+    Treina o modelo de score a partir de uma base histórica em disco (CSV ou Parquet),
+    sem carregá-la inteira na memória.
+
+    A base é lida em blocos por um iterador do XGBoost e quantizada em QuantileDMatrix
+    (método 'hist'). Cada configuração da grade treina com early stopping na AUC de uma
+    parte de validação separada de forma determinística. Com n_workers > 1 as
+    configurações são distribuídas entre processos; cada processo monta as matrizes uma
+    vez e usa os núcleos restantes como threads do XGBoost.
+
+    Args:
+        caminho_base (str): Base histórica com as features e a coluna 'status_final_pago'.
+        grade (list, optional): Configurações (dicionários de parâmetros do XGBoost). Padrão: GRADE_PADRAO.
+        n_workers (int): Processos da busca de hiperparâmetros.
+        fracao_validacao (float): Fração das linhas usada na validação.
+        linhas_por_bloco (int): Linhas lidas por vez.
+        rodadas_maximas (int): Limite de árvores.
+        paciencia (int): Rodadas sem melhora antes de parar.
+        seed (int): Semente da separação de validação e do XGBoost.
+        diretorio (str): Onde gravar o artefato.
+
+    Returns:
+        str: Caminho do artefato versionado, com a AUC de validação e o tempo de treino nos metadados.
+    """
+    inicio = time.perf_counter()
+    # Cria o destino antes do treino, para não perder a busca inteira por um diretório ausente.
+    os.makedirs(diretorio, exist_ok=True)
+    grade = grade or GRADE_PADRAO
+    colunas = montar_colunas_treino(caminho_base, linhas_por_bloco)
+    argumentos_matrizes = (caminho_base, colunas, fracao_validacao, linhas_por_bloco, seed)
+    n_workers = max(1, min(n_workers, len(grade)))
+    threads = max(1, (os.cpu_count() or 1) // n_workers)
+
+    logger.info("Treinando %d configurações em %d processo(s) (%d thread(s) cada)...", len(grade), n_workers, threads)
+    if n_workers == 1:
+        matrizes = _montar_matrizes(*argumentos_matrizes)
+        resultados = [_avaliar_configuracao(parametros, threads, rodadas_maximas, paciencia, seed, matrizes)
+                      for parametros in grade]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_inicializar_trabalhador,
+                                 initargs=argumentos_matrizes) as executor:
+            tarefas = [executor.submit(_avaliar_configuracao, parametros, threads, rodadas_maximas, paciencia, seed)
+                       for parametros in grade]
+            resultados = [tarefa.result() for tarefa in tarefas]
+
+    melhor = max(resultados, key=lambda resultado: resultado['auc_validacao'])
+    modelo = xgb.XGBClassifier()
+    modelo.load_model(bytearray(melhor['modelo']))
+
+    metadados = {
+        'caminho_base': caminho_base,
+        'segundos_treino': time.perf_counter() - inicio,
+        'auc_validacao': melhor['auc_validacao'],
+        'melhor_rodada': melhor['melhor_rodada'],
+        'parametros': {**PARAMETROS_BASE, **melhor['parametros']},
+        'fracao_validacao': fracao_validacao,
+        'linhas_treino': melhor['linhas'][0],
+        'linhas_validacao': melhor['linhas'][1],
+        'busca': [{chave: resultado[chave] for chave in ('parametros', 'auc_validacao', 'melhor_rodada', 'segundos')}
+                  for resultado in resultados],
+    }
+    caminho_modelo = salvar_artefato(modelo, colunas, metadados, diretorio)
+    logger.info("✅ Modelo salvo em '%s' (AUC de validação %.4f)", caminho_modelo, melhor['auc_validacao'])
+    return caminho_modelo
@@ -0,0 +1,110 @@
+import glob
+import hashlib
+import io
+import os
+import re
+import threading
+from typing import Dict, Any
+
+import joblib
+
+import Control.Cache.cache     as Cache
+import Control.XGboost.encoder as Encoder
+
+# --- Constantes do Registro ---
+# Artefatos (modelo + colunas) gravados por model_training.salvar_modelo_treinado.
+PADRAO_ARTEFATOS = "modelo_score_recuperacao_with_columns_v*.pkl"
+# Extrai a versão e o carimbo de data (YYMMDDHHMM) do nome do arquivo.
+_REGEX_VERSAO = re.compile(r"_v(?P<versao>\d+)(?:_(?P<data>\d{10}))?\.pkl$")
+
+# Artefatos já desserializados, indexados pelo hash do conteúdo.
+_cache_artefatos = Cache.CacheLRU(max_itens=8)
+# Caminho -> (mtime_ns, tamanho, hash): evita reler o arquivo quando ele não mudou.
+_assinaturas = {}
+_trava = threading.Lock()
+
+# --- Funções Auxiliares ---
+
+def _desserializar(origem) -> Dict[str, Any]:
+    """
+    Carrega o artefato e, se ele for anterior ao encoder compilado, compila o encoder
+    a partir das colunas, uma única vez por versão.
+    """
+    artefatos = joblib.load(origem)
+    if isinstance(artefatos, dict) and 'columns' in artefatos and 'encoder' not in artefatos:
+        artefatos['encoder'] = Encoder.compilar_encoder(artefatos['columns'])
+    return artefatos
+
+def _rotulo(caminho: str) -> str:
+    """Rótulo exibido no app: 'V1' ou, para versões datadas, 'V1 · 18/10/25 14:30'."""
+    correspondencia = _REGEX_VERSAO.search(os.path.basename(caminho))
+    if correspondencia is None:
+        return os.path.basename(caminho)
+    rotulo = f"V{correspondencia['versao']}"
+    data = correspondencia["data"]
+    if data:
+        rotulo += f" · {data[4:6]}/{data[2:4]}/{data[0:2]} {data[6:8]}:{data[8:10]}"
+    return rotulo
+
+def impressao_artefato(caminho: str) -> str:
+    """
+    Hash (BLAKE2b) do conteúdo do artefato. O arquivo só é relido quando o mtime ou o
+    tamanho mudam; caso contrário, devolve o hash já calculado.
+    """
+    estado = os.stat(caminho)
+    assinatura = (estado.st_mtime_ns, estado.st_size)
+    with _trava:
+        conhecido = _assinaturas.get(caminho)
+    if conhecido is not None and conhecido[:2] == assinatura:
+        return conhecido[2]
+    with open(caminho, "rb") as arquivo:
+        conteudo = arquivo.read()
+    resumo = hashlib.blake2b(conteudo, digest_size=20).hexdigest()
+    with _trava:
+        _assinaturas[caminho] = (*assinatura, resumo)
+    if resumo not in _cache_artefatos:
+        _cache_artefatos.guardar(resumo, _desserializar(io.BytesIO(conteudo)))
+    return resumo
+
+# --- Funções Principais do Registro ---
+
+def carregar_artefatos(caminho: str) -> Dict[str, Any]:
+    """
+    Devolve os artefatos do modelo (dicionário com 'model' e 'columns'), desserializando
+    o arquivo uma única vez por processo.
+
+    A chave é o caminho, o mtime e o hash do conteúdo: se o arquivo for regravado, a nova
+    versão é carregada na próxima chamada, sem reiniciar o app. Os artefatos são
+    compartilhados entre as chamadas e não devem ser alterados.
+    """
+    resumo = impressao_artefato(caminho)
+    artefatos = _cache_artefatos.obter(resumo)
+    if artefatos is None:
+        # Despejado do cache: carrega de novo.
+        artefatos = _desserializar(caminho)
+        _cache_artefatos.guardar(resumo, artefatos)
+    return artefatos
+
+def proxima_versao(diretorio: str = ".") -> int:
+    """Número da próxima versão de artefato no diretório (1 se ainda não houver nenhuma)."""
+    versoes = [int(correspondencia["versao"])
+               for caminho in glob.glob(os.path.join(diretorio, PADRAO_ARTEFATOS))
+               if (correspondencia := _REGEX_VERSAO.search(os.path.basename(caminho))) is not None]
+    return max(versoes, default=0) + 1
+
+def listar_versoes(diretorio: str = ".") -> Dict[str, str]:
+    """
+    Lista os artefatos disponíveis no diretório, do modelo base ao treino mais recente.
+
+    Returns:
+        dict: Rótulo da versão -> caminho do arquivo, em ordem de exibição.
+    """
+    caminhos = [os.path.normpath(caminho) for caminho in glob.glob(os.path.join(diretorio, PADRAO_ARTEFATOS))]
+
+    def ordem(caminho):
+        correspondencia = _REGEX_VERSAO.search(os.path.basename(caminho))
+        if correspondencia is None:
+            return (1, 0, "", caminho)
+        return (0, int(correspondencia["versao"]), correspondencia["data"] or "", caminho)
+
+    return {_rotulo(caminho): caminho for caminho in sorted(caminhos, key=ordem)}
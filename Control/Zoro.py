@@ -1,3 +1,5 @@
+import logging
+
 import pandas as pd
 import streamlit as st
 
@@ -5,14 +7,29 @@ import streamlit as st
 import Control.MonteCarlo.montecarlo    as MonteCarlo
 import Control.XGboost.model_run        as XGRun
 import Control.XGboost.model_training   as XGTraining
+import Control.XGboost.registro         as Registro
+import Control.XGboost.arvores          as Arvores
 import Control.PCA.pca                  as PCA
 import Control.Score_Manual.SM_core     as SM
+import Control.Cache.cache              as Cache
+import Control.Streaming.streaming      as Streaming
+import Control.Exportacao.exportacao    as Exportacao
+import Control.Telemetria.telemetria    as Telemetria
+
+logger = logging.getLogger(__name__)
+
+# Resultados de simulação já calculados, reaproveitados quando só os parâmetros de
+# precificação mudam (cada rerun do Streamlit chama a simulação de novo).
+_cache_simulacoes = Cache.CacheLRU(max_itens=32, max_bytes=128 * 1024 * 1024)
 
 # --- Funções Expostas para a Camada de Visualização (app.py) ---
 
 # O decorador @st.cache_data agora operará sobre o conteúdo do DataFrame.
 # Se o DataFrame de entrada não mudar, o resultado em cache será retornado.
+# Cada função é uma etapa da telemetria (ver Telemetria.coletar): chamadas atendidas pelo
+# cache do Streamlit não entram no rastro.
 
+@Telemetria.cronometrar()
 def score_xgboost(df_prospects: pd.DataFrame, caminho_artefatos_modelo: str) -> pd.DataFrame:
     """
     Gera o score de recuperação usando um modelo XGBoost treinado.
@@ -21,14 +38,107 @@ def score_xgboost(df_prospects: pd.DataFrame, caminho_artefatos_modelo: str) ->
     """
     return XGRun.gerar_score_carteira(df_prospects, caminho_artefatos_modelo)
 
+@Telemetria.cronometrar()
+def score_xgboost_lote(df_prospects: pd.DataFrame, caminho_artefatos_modelo: str, n_jobs: int = 1,
+                       linhas_por_fatia: int = XGRun.LINHAS_POR_FATIA, threads_por_fatia: int = 1) -> tuple:
+    """
+    Score XGBoost em lote com paralelismo controlado: 'n_jobs' threads, cada uma com
+    'threads_por_fatia' threads do XGBoost, sobre fatias de 'linhas_por_fatia' linhas.
+    Retorna: o DataFrame pontuado e o relatório de vazão (linhas por segundo).
+    """
+    return XGRun.gerar_score_lote(df_prospects, caminho_artefatos_modelo, n_jobs, linhas_por_fatia, threads_por_fatia)
+
+@Telemetria.cronometrar()
+def explicar_score_xgboost(df_prospects: pd.DataFrame, caminho_artefatos_modelo: str,
+                           aproximado: bool = False) -> pd.DataFrame:
+    """
+    Calcula quanto cada coluna do prospect puxou o score XGBoost para cima ou para baixo.
+    'aproximado' troca o SHAP exato pela atribuição rápida do XGBoost (carteiras muito grandes).
+    Retorna: um DataFrame (mesmo índice) com a contribuição de cada coluna em log-odds e a 'base' do modelo.
+    """
+    return XGRun.gerar_contribuicoes(df_prospects, caminho_artefatos_modelo, aproximado)
+
+@Telemetria.cronometrar()
+def exportar_modelo_compilado(caminho_artefatos_modelo: str, caminho_saida: str = None) -> str:
+    """
+    Exporta as árvores do modelo XGBoost para arrays NumPy (.npz).
+    Retorna: o caminho do .npz, avaliado sem xgboost por score_xgboost_compilado.
+    """
+    return Arvores.exportar_arvores(caminho_artefatos_modelo, caminho_saida)
+
+@Telemetria.cronometrar()
+def score_xgboost_compilado(df_prospects: pd.DataFrame, caminho_arvores: str) -> pd.DataFrame:
+    """
+    Gera o score de recuperação a partir das árvores exportadas (mesmo resultado de score_xgboost).
+    Retorna: um DataFrame com a coluna de score.
+    """
+    return Arvores.gerar_score_carteira(df_prospects, caminho_arvores)
+
+def listar_modelos_xgboost(diretorio: str = ".") -> dict:
+    """
+    Lista as versões de modelo XGBoost disponíveis, incluindo as gravadas por um
+    treino recente (sem reiniciar o app).
+    Retorna: um dicionário rótulo da versão -> caminho do artefato.
+    """
+    return Registro.listar_versoes(diretorio)
+
+def versao_modelo_xgboost(caminho_artefatos_modelo: str) -> str:
+    """
+    Retorna: o hash do conteúdo do artefato, que muda quando o arquivo é regravado.
+    """
+    return Registro.impressao_artefato(caminho_artefatos_modelo)
+
+@Telemetria.cronometrar()
 def score_manual(df_prospects: pd.DataFrame) -> pd.DataFrame:
     """
-    Gera o score de recuperação usando o modelo de pesos manuais.
+    Gera o score de recuperação usando o modelo de pesos manuais, padronizado pelo
+    perfil de scoring gravado (ver ajustar_perfil_score_manual).
     Recebe: um DataFrame de prospects.
     Retorna: um DataFrame com a coluna de score.
     """
     return SM.gerar_score_recuperacao(df_prospects)
 
+@Telemetria.cronometrar()
+def avaliar_pesos_manuais(df_prospects: pd.DataFrame, configuracoes) -> pd.DataFrame:
+    """
+    Compara variações do pesos.json sem rodar o score manual uma vez para cada: todas as
+    configurações são pontuadas juntas, em um produto matriz x matriz.
+    Recebe: a carteira e as configurações (dicionário nome -> configuração, ou lista).
+    Retorna: um DataFrame com o valor esperado, os ranks A-D e a correlação de Spearman com a base, por configuração.
+    """
+    return SM.avaliar_configuracoes(df_prospects, configuracoes)
+
+@Telemetria.cronometrar()
+def score_xgboost_arquivo(caminho_entrada: str, caminho_artefatos_modelo: str, caminho_saida: str = None,
+                          **opcoes) -> dict:
+    """
+    Versão em fluxo do score_xgboost para carteiras maiores que a memória.
+    Recebe: um arquivo CSV/Parquet de prospects e, opcionalmente, o arquivo de saída
+    (CSV/Parquet) gravado bloco a bloco. 'opcoes': linhas_por_bloco, top_k, guardar_carteira.
+    Retorna: o resumo da carteira (totais, valor esperado, ranks, top-K e a carteira
+    compacta para rodar_simulacao_montecarlo).
+    """
+    return Streaming.pontuar_arquivo_xgboost(caminho_entrada, caminho_artefatos_modelo, caminho_saida, **opcoes)
+
+@Telemetria.cronometrar()
+def score_manual_arquivo(caminho_entrada: str, caminho_saida: str = None, **opcoes) -> dict:
+    """
+    Versão em fluxo do score_manual para carteiras maiores que a memória (ver score_xgboost_arquivo).
+    """
+    return Streaming.pontuar_arquivo_manual(caminho_entrada, caminho_saida, **opcoes)
+
+@Telemetria.cronometrar()
+def ajustar_perfil_score_manual(caminho_base: str, caminho_perfil: str = SM.CAMINHO_PERFIL_PADRAO, **opcoes) -> str:
+    """
+    Ajusta o perfil de scoring do score manual (médias, desvios e normalização do score
+    por segmento) a uma carteira de referência em arquivo e o grava ao lado do pesos.json.
+    Depois disso, score_manual e score_manual_arquivo pontuam qualquer lote, inclusive
+    um único prospect, sem reajustar as estatísticas. 'opcoes': caminho_pesos, linhas_por_bloco.
+    Retorna: o caminho do perfil gravado.
+    """
+    return SM.salvar_perfil(Streaming.ajustar_score_manual(caminho_base, **opcoes), caminho_perfil)
+
+@Telemetria.cronometrar()
 def analise_pca(df_prospects: pd.DataFrame) -> pd.DataFrame:
     """
     Executa a Análise de Componentes Principais sobre os dados dos prospects.
@@ -37,18 +147,75 @@ def analise_pca(df_prospects: pd.DataFrame) -> pd.DataFrame:
     """
     return PCA.analise_pca(df_prospects)
 
-def rodar_simulacao_montecarlo(df_final: pd.DataFrame, n_simulacoes: int = 10000) -> list:
+@Telemetria.cronometrar()
+def rodar_simulacao_montecarlo(df_final: pd.DataFrame, n_simulacoes: int = 10000,
+                               seed: int = None, n_workers: int = 1, modo: str = "monte_carlo",
+                               tolerancia: float = MonteCarlo.TOLERANCIA_PADRAO,
+                               amostragem: str = "simples", fatores: dict = None, precisao: str = "dupla"):
     """
     Executa a simulação de Monte Carlo sobre um DataFrame já com scores.
-    Esta função já estava correta, recebendo um DataFrame.
+    Com n_workers > 1 os cenários são distribuídos entre processos; a mesma
+    'seed' gera os mesmos resultados para qualquer número de processos. Só o
+    modo 'monte_carlo' é paralelo: o 'adaptativo' avalia a convergência bloco a bloco
+    e roda em um único processo (n_workers > 1 é ignorado, com um aviso no log).
+    Com modo='analitico' a distribuição é calculada sem sorteios; com
+    modo='adaptativo' a simulação para ao atingir 'tolerancia' (n_simulacoes vira o teto).
+    'amostragem' escolhe o esquema de redução de variância ('simples', 'antitetica',
+    'lhs' ou 'importancia'). 'fatores' (coluna -> correlação, ex.: setor e região) liga o
+    modelo de fatores com inadimplência correlacionada, para cenários de estresse.
+    precisao='compacta' usa o núcleo de baixa precisão (uint32/float32), mais rápido em carteiras grandes.
+    Com 'seed' definida (ou no modo analítico, que é determinístico) o resultado fica
+    em cache, indexado pela impressão digital dos scores, valores e parâmetros.
+    Recebe: um DataFrame com 'score_recuperacao' e 'valor_divida_mil'.
+    Retorna: um AcumuladorSimulacao com as estatísticas dos cenários
+    (ou o dicionário do modo analítico). O resultado pode vir do cache e não deve ser alterado.
     """
-    return MonteCarlo.rodar_simulacao(df_final, n_simulacoes)
+    if modo == "adaptativo" and (n_workers is None or n_workers > 1):
+        logger.warning("O modo adaptativo roda em um único processo; n_workers=%s será ignorado.", n_workers)
+
+    def simular():
+        if modo != "monte_carlo" or (n_workers is not None and n_workers <= 1):
+            return MonteCarlo.rodar_simulacao(df_final, n_simulacoes, seed=seed, modo=modo,
+                                              tolerancia=tolerancia, amostragem=amostragem, fatores=fatores,
+                                              precisao=precisao)
+        return MonteCarlo.rodar_simulacao_paralela(df_final, n_simulacoes, n_workers=n_workers,
+                                                   seed=seed, amostragem=amostragem, fatores=fatores,
+                                                   precisao=precisao)
+
+    if seed is None and modo != "analitico":
+        return simular()
+    colunas = ['score_recuperacao', 'valor_divida_mil'] + [c for c in (fatores or {}) if c in df_final.columns]
+    # O número de processos fica fora da chave: o resultado não depende dele.
+    chave = Cache.impressao_digital(df_final[colunas], n_simulacoes, seed, modo, tolerancia, amostragem,
+                                    sorted((fatores or {}).items()), precisao)
+    return _cache_simulacoes.obter_ou_calcular(chave, simular)
 
 # --- Funções de Suporte (Ex: Treinamento, podem ser mantidas como estão se for um processo offline) ---
 
-def treinar_modelo(caminho_base_treinamento: str, numero_de_amostras: int = 54000) -> str:
+@Telemetria.cronometrar()
+def treinar_modelo(caminho_base_treinamento: str, *, n_workers: int = 1, grade: list = None, seed: int = 0,
+                   diretorio: str = ".") -> str:
     """
     Orquestra o treinamento de um novo modelo XGBoost.
-    Por ser uma operação distinta e offline, pode continuar recebendo um caminho de arquivo.
+    Por ser uma operação distinta e offline, recebe o caminho da base histórica (CSV ou Parquet),
+    lida em blocos, e busca os hiperparâmetros da 'grade' em 'n_workers' processos.
+    Os parâmetros são só nomeados: a forma antiga treinar_modelo(caminho, numero_de_amostras)
+    falha em vez de virar o número de processos.
+    Retorna: o caminho do artefato versionado, que já aparece em listar_modelos_xgboost.
+    """
+    return XGTraining.treinar_pipeline(caminho_base_treinamento, grade=grade, n_workers=n_workers, seed=seed,
+                                       diretorio=diretorio)
+
+def configurar_exportacao(diretorio: str, formato: str = "parquet", compressao: str = Exportacao.COMPRESSAO_PADRAO):
     """
-    return XGTraining.treinar_modelo(caminho_base_treinamento, numero_de_amostras)
\ No newline at end of file
+    Liga a exportação dos DataFrames intermediários (DF_FINAL do score manual e
+    DF_PROCESSADO_PCA), desligada por padrão. Os arquivos (Parquet ou Arrow IPC,
+    comprimidos, com nomes únicos por execução) são gravados em 'diretorio' por uma
+    thread de fundo, sem atrasar o scoring.
+    Retorna: o exportador (com 'gravados', 'erros' e aguardar()).
+    """
+    return Exportacao.configurar_exportacao(diretorio, formato, compressao)
+
+def desativar_exportacao():
+    """Desliga a exportação dos DataFrames intermediários, gravando antes o que estiver pendente."""
+    Exportacao.desativar_exportacao()
@@ -85,13 +85,30 @@ def get_hist(resultados, simul_count):
     
     fig = go.Figure()
 
-    # Adicionar o histograma dos resultados
-    fig.add_trace(go.Histogram(
-        x=resultados.get("resultados"),
-        name='Distribuição',
-        marker_color='#330C73',
-        opacity=0.75
-    ))
+    densidade = resultados.get("densidade")
+    if densidade is not None:
+        # Modo analítico: a distribuição já vem calculada sobre uma grade de valores
+        fig.add_trace(go.Scatter(
+            x=densidade["valores"],
+            y=densidade["probabilidades"],
+            name='Distribuição',
+            mode='lines',
+            fill='tozeroy',
+            line_color='#330C73',
+            opacity=0.75
+        ))
+    else:
+        # Adicionar o histograma dos resultados (já agrupado em bins pela simulação)
+        histograma = resultados.get("histograma") or {"bordas": [0, 0], "contagens": []}
+        bordas = histograma["bordas"]
+        fig.add_trace(go.Bar(
+            x=[(inicio + fim) / 2 for inicio, fim in zip(bordas[:-1], bordas[1:])],
+            y=histograma["contagens"],
+            width=[fim - inicio for inicio, fim in zip(bordas[:-1], bordas[1:])],
+            name='Distribuição',
+            marker_color='#330C73',
+            opacity=0.75
+        ))
 
     # Adicionar uma linha vertical para a Média
     fig.add_vline(
@@ -123,6 +140,41 @@ def get_hist(resultados, simul_count):
     
     return fig
 
+def get_heatmap_preco(grade, indice_cenario, metrica="PMV", titulo_cenario=""):
+    """Mapa de calor de uma métrica da grade de precificação (custo x retorno) para um cenário."""
+    fig = go.Figure(go.Heatmap(
+        x=grade["retorno_percent"],
+        y=grade["COP_percent"],
+        z=grade[metrica][indice_cenario],
+        colorscale='Viridis',
+        colorbar=dict(title='R$'),
+        hovertemplate='Retorno: %{x:.0f}%<br>Custo: %{y:.0f}%<br>R$ %{z:,.2f}<extra></extra>'
+    ))
+    fig.update_layout(
+        title_text=f'<b>{"Preço Máximo Viável" if metrica == "PMV" else "Lucro Líquido"} {titulo_cenario}</b>',
+        xaxis_title_text='Retorno Desejado (%)',
+        yaxis_title_text='Custo de Operação (%)',
+        template='plotly_white'
+    )
+    return fig
+
+def get_contribuicoes(contribuicoes, titulo=""):
+    """Barras horizontais com a contribuição (log-odds) de cada coluna: verde aumenta o score, vermelho reduz."""
+    contribuicoes = contribuicoes.sort_values()
+    fig = go.Figure(go.Bar(
+        x=contribuicoes.values,
+        y=contribuicoes.index,
+        orientation='h',
+        marker_color=['#34a853' if valor >= 0 else '#ea4335' for valor in contribuicoes.values],
+        hovertemplate='%{y}: %{x:+.3f}<extra></extra>'
+    ))
+    fig.update_layout(
+        title_text=f'<b>{titulo}</b>',
+        xaxis_title_text='Contribuição (log-odds)',
+        template='plotly_white'
+    )
+    return fig
+
 def get_scatter_pca(dataframe_resultado_pca):
     """Cria um gráfico de dispersão dos dois primeiros componentes principais (PCA)."""
     fig = px.scatter(
@@ -1,3 +1,4 @@
+import math
 import streamlit as st
 import locale
 
@@ -93,11 +94,42 @@ def relatorio_sumario(df_final, analise_montecarlo):
             label="📉 Cenário Pessimista (5%)",
             value=_formatar_valor(analise_montecarlo.get("percentil_5", 0))
         )
+        _exibir_erro(analise_montecarlo.get("erro_percentil_5"))
     with col_otim:
         st.metric(
             label="🚀 Cenário Otimista (95%)",
             value=_formatar_valor(analise_montecarlo.get("percentil_95", 0))
         )
+        _exibir_erro(analise_montecarlo.get("erro_percentil_95"))
+
+    diagnostico = analise_montecarlo.get("diagnostico")
+    if diagnostico and diagnostico.get("tamanho_amostral_efetivo") is not None:
+        # O tamanho efetivo da média não mede a precisão dos percentis: sem o do
+        # percentil 5, a legenda deixa claro que o valor vale só para a média.
+        if diagnostico.get("tamanho_amostral_efetivo_p5") is not None:
+            efetivo, alvo = diagnostico["tamanho_amostral_efetivo_p5"], "no percentil 5"
+        else:
+            efetivo, alvo = diagnostico["tamanho_amostral_efetivo"], "para a média"
+        st.caption(
+            f"Amostragem {diagnostico['amostragem']}: {diagnostico['cenarios']} cenários com "
+            f"tamanho amostral efetivo de {efetivo:,.0f} {alvo}."
+        )
+    if diagnostico and "convergiu" in diagnostico:
+        situacao = "convergiu" if diagnostico["convergiu"] else "atingiu o limite de cenários"
+        st.caption(
+            f"Modo adaptativo {situacao}: {diagnostico['cenarios_usados']} de "
+            f"{diagnostico['cenarios_maximos']} cenários, precisão de ± {diagnostico['precisao']:.2%} "
+            f"(alvo ± {diagnostico['tolerancia']:.2%})."
+        )
+
+def _exibir_erro(erro):
+    """Exibe a margem de erro de um percentil calculado pelo modo analítico."""
+    if erro is None:
+        return
+    if math.isfinite(erro):
+        st.caption(f"Erro estimado: ± {_formatar_valor(erro)}")
+    else:
+        st.caption("Erro estimado: sem limite útil para esta carteira")
 
 def relatorio_preco(ve, analise_preco_montecarlo, retorno):
     """
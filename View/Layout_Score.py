@@ -1,8 +1,12 @@
+import logging
+
 import streamlit as st
 import locale
 
 import View.Graficos as Graficos
 
+logger = logging.getLogger(__name__)
+
 def relatorio_score(dataframe_final):
     # 1. Calcular o "valor esperado" de recuperação (soma de cada dívida * sua probabilidade)
     valor_esperado_total = (dataframe_final['score_recuperacao'] * dataframe_final['valor_divida_mil']).sum()
@@ -24,11 +28,11 @@ def relatorio_score(dataframe_final):
     rankD_contagem = len(dataframe_final[dataframe_final['score_recuperacao'] < 0.25])
 
     # Agora você pode mostrar os resultados
-    print("--- Resumo da Carteira por Rank ---")
-    print(f"Rank A (Score >= 0.75): {rankA_contagem} devedores, somando R$ {rankA_valor * 1000:,.2f}")
-    print(f"Rank B (Score 0.50-0.74): {rankB_contagem} devedores, somando R$ {rankB_valor * 1000:,.2f}")
-    print(f"Rank C (Score 0.25-0.49): {rankC_contagem} devedores, somando R$ {rankC_valor * 1000:,.2f}")
-    print(f"Rank D (Score < 0.25): {rankD_contagem} devedores, somando R$ {rankD_valor * 1000:,.2f}")
+    logger.debug("--- Resumo da Carteira por Rank ---")
+    logger.debug("Rank A (Score >= 0.75): %d devedores, somando R$ %s", rankA_contagem, f"{rankA_valor * 1000:,.2f}")
+    logger.debug("Rank B (Score 0.50-0.74): %d devedores, somando R$ %s", rankB_contagem, f"{rankB_valor * 1000:,.2f}")
+    logger.debug("Rank C (Score 0.25-0.49): %d devedores, somando R$ %s", rankC_contagem, f"{rankC_valor * 1000:,.2f}")
+    logger.debug("Rank D (Score < 0.25): %d devedores, somando R$ %s", rankD_contagem, f"{rankD_valor * 1000:,.2f}")
                     
     gauge_col, relatorio_col, bar_col = st.columns([1.5, 0.7, 1.7])
     
@@ -1,6 +1,9 @@
+import json
+import logging
 import streamlit as st
 import pandas as pd
 import locale
+from contextlib import nullcontext
 from typing import Optional, Union
 
 # --- Módulos do Projeto Zoro ---
@@ -8,10 +11,16 @@ import View.Graficos as Graficos
 import View.Layout_Score as LayoutScore
 import View.Layout_Montecarlo as LayoutMonteCarlo
 import Control.Zoro as Zoro
+import Control.Documento.documento as Documento
 import Control.Score_Manual.SM_analise as SMHelper
+import Control.Telemetria.telemetria as Telemetria
 
 # --- Constantes de Configuração ---
 THREE_COLS_SIZE = [1.5, 1.5, 1.5]
+# Eixos da superfície de preço (custo de operação % x retorno desejado %) e percentis disponíveis.
+GRADE_COP_PERCENT = list(range(5, 55, 5))
+GRADE_RETORNO_PERCENT = list(range(10, 210, 10))
+PERCENTIS_GRADE = [5, 10, 25, 50, 75, 90, 95]
 
 # --- Funções de Carregamento e Processamento com Cache ---
 # Otimização Crítica: O cache impede que os dados sejam recarregados e os scores 
@@ -30,8 +39,11 @@ def processar_score_manual(_df: pd.DataFrame) -> pd.DataFrame:
     return Zoro.score_manual(_df.copy())
 
 @st.cache_data
-def processar_score_xgboost(_df: pd.DataFrame, model_path: str) -> pd.DataFrame:
-    """Executa e cacheia os resultados do Score XGBoost."""
+def processar_score_xgboost(_df: pd.DataFrame, model_path: str, versao_modelo: str) -> pd.DataFrame:
+    """
+    Executa e cacheia os resultados do Score XGBoost. 'versao_modelo' (hash do artefato)
+    invalida o cache quando o arquivo do modelo é regravado.
+    """
     return Zoro.score_xgboost(_df.copy(), model_path)
 
 @st.cache_data
@@ -43,7 +55,6 @@ def processar_analise_pca(_df: pd.DataFrame) -> pd.DataFrame:
 # Abstração: Estas funções evitam a duplicação de código no layout.
 
 def renderizar_aba_score(df_scored: pd.DataFrame):
-    print(df_scored.columns)
     # Cria as abas aninhadas
     tab_geral, tab_pf, tab_pj = st.tabs(["📊 Geral", "👤 Pessoa Física (PF)", "🏢 Pessoa Jurídica (PJ)"])
 
@@ -83,7 +94,28 @@ def renderizar_aba_score(df_scored: pd.DataFrame):
             st.divider()
             st.dataframe(df_pj)
 
-def renderizar_aba_simulacao(df_scored: pd.DataFrame, simul_count: int, model_name: str, key_prefix: str):
+def renderizar_explicacao_xgboost(df_scored: pd.DataFrame, model_path: str):
+    """Mostra o que mais pesa no score XGBoost da carteira e de um prospect escolhido."""
+    with st.expander("🔍 Por que este score? (Contribuições por coluna)"):
+        contribuicoes = Zoro.explicar_score_xgboost(df_scored, model_path)
+        colunas = contribuicoes.columns.drop('base')
+
+        carteira_col, prospect_col = st.columns(2)
+        with carteira_col:
+            st.plotly_chart(Graficos.get_contribuicoes(contribuicoes[colunas].abs().mean(), "Peso médio na carteira"),
+                            key="xgb_contrib_carteira")
+        with prospect_col:
+            id_cliente = st.selectbox("Prospect (id_cliente)", df_scored['id_cliente'], key="xgb_contrib_id")
+            linha = df_scored.index[df_scored['id_cliente'] == id_cliente][0]
+            score = df_scored.at[linha, 'score_recuperacao']
+            st.plotly_chart(Graficos.get_contribuicoes(contribuicoes.loc[linha, colunas], f"Prospect {id_cliente}"),
+                            key="xgb_contrib_prospect")
+            st.caption(f"Score {score:.1%} = sigmoide(base {contribuicoes.at[linha, 'base']:+.3f} "
+                       f"+ soma das contribuições {contribuicoes.loc[linha, colunas].sum():+.3f}).")
+
+def renderizar_aba_simulacao(df_scored: pd.DataFrame, simul_count: int, model_name: str, key_prefix: str,
+                             modo: str = "monte_carlo", tolerancia: float = 0.005, amostragem: str = "simples",
+                             fatores: dict = None, seed: int = None, precisao: str = "dupla"):
     """Renderiza um bloco completo de simulação Monte Carlo para um dado score."""
     st.subheader(f"Análise de Cenários com {model_name}")
     
@@ -97,8 +129,10 @@ def renderizar_aba_simulacao(df_scored: pd.DataFrame, simul_count: int, model_na
         retorno = st.number_input("Retorno Desejado %", 1.0, 1000.0, 50.0, step=0.01, key=f"{key_prefix}_roi")
 
     # --- Lógica de Simulação ---
-    resultados_mc = Zoro.rodar_simulacao_montecarlo(df_scored, simul_count)
-    analise_mc = SMHelper.calcular_estatisticas_simulacao(resultados_mc, simul_count)
+    # Com semente fixa, a simulação vem do cache do Zoro quando só os inputs acima mudam.
+    resultados_mc = Zoro.rodar_simulacao_montecarlo(df_scored, simul_count, seed=seed, modo=modo, tolerancia=tolerancia,
+                                                    amostragem=amostragem, fatores=fatores, precisao=precisao)
+    analise_mc = SMHelper.calcular_estatisticas_simulacao(resultados_mc, simul_count, modo=modo)
     
     mapa_cenarios = {
         "Pessimista": analise_mc.get("percentil_5", 0),
@@ -117,6 +151,34 @@ def renderizar_aba_simulacao(df_scored: pd.DataFrame, simul_count: int, model_na
     with p_col:
         LayoutMonteCarlo.relatorio_preco(valor_esperado, analise_preco, retorno)
 
+    # --- Superfície de Preço ---
+    # Toda a grade sai da mesma simulação, sem rodar os cenários de novo.
+    with st.expander("🗺️ Superfície de Preço (Custo x Retorno)"):
+        percentil_col, metrica_col = st.columns(2)
+        with percentil_col:
+            percentil = st.select_slider("Percentil do Cenário", PERCENTIS_GRADE, value=5, key=f"{key_prefix}_grade_pct")
+        with metrica_col:
+            metrica = st.radio("Métrica", ["PMV", "Lucro Líquido"], horizontal=True, key=f"{key_prefix}_grade_metrica")
+        ves = SMHelper.valores_cenarios(resultados_mc, [p / 100 for p in PERCENTIS_GRADE], modo=modo)
+        grade = SMHelper.estimar_grade_precificacao(ves, GRADE_COP_PERCENT, GRADE_RETORNO_PERCENT)
+        st.plotly_chart(Graficos.get_heatmap_preco(grade, PERCENTIS_GRADE.index(percentil),
+                                                   "PMV" if metrica == "PMV" else "ROI", f"(P{percentil})"),
+                        use_container_width=True)
+
+def renderizar_diagnostico(rastro: Telemetria.Rastro):
+    """Tempo, linhas e pico de memória de cada etapa desta execução, com o rastro para download."""
+    with st.expander("⏱️ Diagnóstico de Desempenho", expanded=True):
+        st.caption("Etapas atendidas pelo cache do Streamlit não aparecem no rastro."
+                   + (" Com a memória ligada (tracemalloc), os tempos ficam maiores que o normal." if rastro.memoria else ""))
+        st.dataframe(rastro.resumo(), use_container_width=True, hide_index=True)
+        json_col, chrome_col, _ = st.columns([0.5, 0.5, 2])
+        with json_col:
+            st.download_button("Baixar JSON", json.dumps(rastro.para_dict(), indent=2, ensure_ascii=False),
+                               "rastro_zoro.json", "application/json")
+        with chrome_col:
+            st.download_button("Baixar Trace (Chrome)", json.dumps(rastro.para_chrome()), "trace_zoro.json",
+                               "application/json", help="Abra em chrome://tracing ou ui.perfetto.dev.")
+
 # --- Função Principal da Aplicação ---
 
 def draw_page():
@@ -134,59 +196,105 @@ def draw_page():
     
     # --- Inputs Globais ---
     with st.container():
-        _, model_xb_col, simulations_col, upload_file_col = st.columns([0.5, 0.3, 0.3, 1])
+        _, model_xb_col, simulations_col, method_col, upload_file_col = st.columns([0.5, 0.3, 0.3, 0.3, 1])
         with model_xb_col:
-            model_xb_input = st.selectbox("Modelo XGBoost", ["V1"])
+            versoes_modelo = Zoro.listar_modelos_xgboost()
+            model_xb_input = st.selectbox("Modelo XGBoost", list(versoes_modelo))
         with simulations_col:
             simulations_count_input = st.number_input("Nº de Simulações", 108, 108000, 10800, 1)
+            seed_input = st.number_input("Semente", 0, 2**31 - 1, 42, 1,
+                                         help="A mesma semente reproduz os cenários e permite reaproveitar a simulação.")
+        with method_col:
+            metodo_input = st.selectbox("Método", ["Monte Carlo", "Monte Carlo Adaptativo", "Analítico"])
+            tolerancia_input = 0.5
+            if metodo_input == "Monte Carlo Adaptativo":
+                tolerancia_input = st.number_input("Tolerância %", 0.01, 10.0, 0.5, step=0.01)
+            amostragem_input = "Simples"
+            correlacao_setor_input, correlacao_regiao_input = 0.0, 0.0
+            if metodo_input != "Analítico":
+                correlacao_setor_input = st.number_input("Correlação Setorial %", 0.0, 60.0, 0.0, step=1.0)
+                correlacao_regiao_input = st.number_input("Correlação Regional %", 0.0, 30.0, 0.0, step=1.0,
+                                                          help="Sem a coluna 'regiao' na base, atua como um fator comum a toda a carteira.")
+                opcoes_amostragem = ["Simples", "Antitética", "Hipercubo Latino", "Importância (cauda)"]
+                if correlacao_setor_input or correlacao_regiao_input:
+                    opcoes_amostragem = opcoes_amostragem[:2]
+                amostragem_input = st.selectbox("Redução de Variância", opcoes_amostragem)
+                if amostragem_input == "Importância (cauda)":
+                    st.caption("⚠️ Mira o cenário pessimista: média, desvio e percentis acima da mediana "
+                               "vêm dos momentos exatos da carteira (aproximação normal), não dos sorteios.")
+            compacto_input = False
+            if metodo_input != "Analítico" and amostragem_input != "Hipercubo Latino" \
+                    and not (correlacao_setor_input or correlacao_regiao_input):
+                compacto_input = st.checkbox("Núcleo Compacto (float32)",
+                                             help="Limiares inteiros e somas em float32: mais rápido em carteiras grandes.")
         with upload_file_col:
             uploaded_file = st.file_uploader("Upload Base Prospects", type="csv")
+            diagnostico_input = st.checkbox("Diagnóstico de Desempenho",
+                                            help="Mede o tempo e as linhas de cada etapa do processamento desta execução.")
+            memoria_input = False
+            if diagnostico_input:
+                memoria_input = st.checkbox("Medir Memória", help="Pico de memória por etapa (tracemalloc; deixa o processamento mais lento).")
 
     # --- Lógica Principal e Renderização das Abas (ARQUITETURA AJUSTADA) ---
-    df_prospects = carregar_dados(uploaded_file)
-
-    if df_prospects is None or df_prospects.empty:
-        st.header("⚔️ Aguardando Base de Prospects")
-        return
-
-    # --- PONTO CENTRAL DA CORREÇÃO ---
-    # 1. Enriquecer o DataFrame principal com a coluna 'tipo_pessoa' AQUI.
-    # Esta lógica é executada uma única vez e serve de base para todos os modelos.
-    if 'documento' in df_prospects.columns:
-        df_prospects['tipo_pessoa'] = df_prospects['documento'].str.replace(r'\D', '', regex=True).str.len().map({11: 'pf', 14: 'pj'})
-    else:
-        # Fallback caso a coluna 'documento' não exista
-        df_prospects['tipo_pessoa'] = 'indefinido'
-
-    # 2. Processar todos os dataframes. Agora, ambos os fluxos herdarão a coluna 'tipo_pessoa'.
-    df_final_sm = processar_score_manual(df_prospects)
+    with (Telemetria.coletar(memoria_input) if diagnostico_input else nullcontext()) as rastro:
+        df_prospects = carregar_dados(uploaded_file)
+
+        if df_prospects is None or df_prospects.empty:
+            st.header("⚔️ Aguardando Base de Prospects")
+            return
+
+        # --- PONTO CENTRAL DA CORREÇÃO ---
+        # 1. Enriquecer o DataFrame principal com a coluna 'tipo_pessoa' AQUI.
+        # Esta lógica é executada uma única vez e serve de base para todos os modelos.
+        if 'documento' in df_prospects.columns:
+            Documento.anotar_tipo_pessoa(df_prospects)
+        else:
+            # Fallback caso a coluna 'documento' não exista
+            df_prospects['tipo_pessoa'] = 'indefinido'
+
+        # 2. Processar todos os dataframes. Agora, ambos os fluxos herdarão a coluna 'tipo_pessoa'.
+        df_final_sm = processar_score_manual(df_prospects)
     
-    model_path = "modelo_score_recuperacao_with_columns_v1.pkl"
-    df_final_xb = processar_score_xgboost(df_prospects, model_path)
+        model_path = versoes_modelo[model_xb_input]
+        df_final_xb = processar_score_xgboost(df_prospects, model_path, Zoro.versao_modelo_xgboost(model_path))
     
-    df_pca = processar_analise_pca(df_prospects)
+        df_pca = processar_analise_pca(df_prospects)
 
-    # 3. Criar e renderizar as abas da interface (código inalterado)
-    score_manual_tab, score_xb_tab, pca_tab, simulation_tab = st.tabs(["🧠 Score Manual", "🐉 XGBoost", "🧪 PCA", "🎲 Monte Carlo"])
+        # 3. Criar e renderizar as abas da interface (código inalterado)
+        score_manual_tab, score_xb_tab, pca_tab, simulation_tab = st.tabs(["🧠 Score Manual", "🐉 XGBoost", "🧪 PCA", "🎲 Monte Carlo"])
 
-    with score_manual_tab:
-        renderizar_aba_score(df_final_sm)
+        with score_manual_tab:
+            renderizar_aba_score(df_final_sm)
 
-    with score_xb_tab:
-        renderizar_aba_score(df_final_xb) # Agora esta chamada funcionará.
+        with score_xb_tab:
+            renderizar_aba_score(df_final_xb) # Agora esta chamada funcionará.
+            renderizar_explicacao_xgboost(df_final_xb, model_path)
         
-    with pca_tab:
-        scatter_graf_col, _ = st.columns([1.7, 0.5])
-        with scatter_graf_col:
-            st.plotly_chart(Graficos.get_scatter_pca(df_pca))
-        st.dataframe(df_pca)
+        with pca_tab:
+            scatter_graf_col, _ = st.columns([1.7, 0.5])
+            with scatter_graf_col:
+                st.plotly_chart(Graficos.get_scatter_pca(df_pca))
+            st.dataframe(df_pca)
+
+        with simulation_tab:
+            modo_simulacao = {"Analítico": "analitico", "Monte Carlo Adaptativo": "adaptativo"}.get(metodo_input, "monte_carlo")
+            tolerancia = tolerancia_input / 100
+            amostragem = {"Antitética": "antitetica", "Hipercubo Latino": "lhs", "Importância (cauda)": "importancia"}.get(amostragem_input, "simples")
+            fatores = None
+            if correlacao_setor_input or correlacao_regiao_input:
+                fatores = {"ramo_atuacao_cliente": correlacao_setor_input / 100, "regiao": correlacao_regiao_input / 100}
+            precisao = "compacta" if compacto_input else "dupla"
+            renderizar_aba_simulacao(df_final_sm, simulations_count_input, "Score Manual", "sm", modo_simulacao, tolerancia,
+                                     amostragem, fatores, int(seed_input), precisao)
+            st.divider()
+            renderizar_aba_simulacao(df_final_xb, simulations_count_input, "XGBoost", "xgb", modo_simulacao, tolerancia,
+                                     amostragem, fatores, int(seed_input), precisao)
 
-    with simulation_tab:
-        renderizar_aba_simulacao(df_final_sm, simulations_count_input, "Score Manual", "sm")
-        st.divider()
-        renderizar_aba_simulacao(df_final_xb, simulations_count_input, "XGBoost", "xgb")
+    if rastro is not None:
+        renderizar_diagnostico(rastro)
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     draw_page()
 
 if __name__ == '__main__':
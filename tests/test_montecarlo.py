@@ -0,0 +1,101 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import Control.MonteCarlo.analitico  as Analitico
+import Control.MonteCarlo.montecarlo as MonteCarlo
+
+# --- Carteira de Teste ---
+
+@pytest.fixture(scope="module")
+def carteira():
+    rng = np.random.default_rng(7)
+    n_prospects = 1000
+    return pd.DataFrame({
+        "score_recuperacao": rng.beta(2, 3, n_prospects),
+        "valor_divida_mil": rng.lognormal(mean=3.5, sigma=1.0, size=n_prospects).round(2),
+    })
+
+@pytest.fixture(scope="module")
+def exato(carteira):
+    probabilidades, valores = MonteCarlo._extrair_arrays(carteira)
+    return Analitico.distribuicao_recuperacao(probabilidades, valores, metodo="fft")
+
+# --- Modo Analítico ---
+
+def test_sela_devolve_densidade_para_o_grafico(carteira, exato):
+    probabilidades, valores = MonteCarlo._extrair_arrays(carteira)
+    sela = Analitico.distribuicao_recuperacao(probabilidades, valores, metodo="sela")
+    densidade = sela["densidade"]
+    assert densidade is not None
+    assert np.sum(densidade["probabilidades"]) == pytest.approx(1.0)
+    media_grade = np.sum(np.asarray(densidade["valores"]) * densidade["probabilidades"])
+    assert media_grade == pytest.approx(exato["media_recuperacao"], rel=1e-3)
+
+@pytest.mark.parametrize("probabilidades", [[0.5], [0.5, 0.5]])
+def test_sela_em_carteira_pequena_usa_fft(probabilidades):
+    valores = np.full(len(probabilidades), 100.0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        resultado = Analitico.distribuicao_recuperacao(np.array(probabilidades), valores, metodo="sela")
+    assert resultado["metodo"] == "fft"
+    assert resultado["percentil_5"] == pytest.approx(0.0, abs=1.0)
+    assert resultado["percentil_95"] == pytest.approx(100.0 * len(probabilidades), abs=1.0)
+
+# --- Laço Serial ---
+
+def test_laco_serial_prepara_nucleo_compacto_uma_vez(carteira, monkeypatch):
+    chamadas = []
+    preparar = MonteCarlo._preparar_compacto
+    monkeypatch.setattr(MonteCarlo, "_preparar_compacto", lambda *args: chamadas.append(1) or preparar(*args))
+    acumulador = MonteCarlo.rodar_simulacao(carteira, 5000, tamanho_bloco=500, seed=3, precisao="compacta")
+    assert acumulador.n == 5000
+    assert len(chamadas) == 1
+
+# --- Amostragem por Importância ---
+
+def test_importancia_media_e_p95_batem_com_analitico(carteira, exato):
+    acumulador = MonteCarlo.rodar_simulacao(carteira, 10800, seed=42, amostragem="importancia")
+    assert acumulador.media == pytest.approx(exato["media_recuperacao"], rel=1e-9)
+    assert acumulador.desvio_padrao == pytest.approx(exato["desvio_padrao"], rel=1e-9)
+    assert acumulador.quantil(0.95) == pytest.approx(exato["percentil_95"], rel=0.01)
+    assert acumulador.quantil(0.05) == pytest.approx(exato["percentil_5"], rel=0.01)
+
+def test_importancia_paralela_usa_momentos_exatos(carteira, exato):
+    acumulador = MonteCarlo.rodar_simulacao_paralela(carteira, 4000, n_workers=2, seed=1, amostragem="importancia")
+    assert acumulador.media == pytest.approx(exato["media_recuperacao"], rel=1e-9)
+    assert acumulador.quantil(0.95) == pytest.approx(exato["percentil_95"], rel=0.01)
+
+# --- Amostragem Antitética ---
+
+@pytest.mark.parametrize("precisao", ["dupla", "compacta"])
+def test_antitetica_tamanho_efetivo_bate_com_variancia_exata_dos_pares(carteira, precisao):
+    probabilidades, valores = MonteCarlo._extrair_arrays(carteira)
+    # Em cada par, 1{U < p} e 1{1 - U < p} têm covariância max(0, 2p - 1) - p².
+    covariancia = np.maximum(0.0, 2 * probabilidades - 1) - probabilidades ** 2
+    variancia_par = np.sum(valores ** 2 * (probabilidades * (1 - probabilidades) + covariancia)) / 2
+    variancia_simples = np.sum(valores ** 2 * probabilidades * (1 - probabilidades))
+    # Blocos ímpares (1801 cenários) exercitam o cenário sem par de cada núcleo.
+    acumulador = MonteCarlo.rodar_simulacao(carteira, 10800, tamanho_bloco=1801, seed=42, amostragem="antitetica",
+                                            precisao=precisao)
+    pares = sum(tamanho // 2 for tamanho in [1801] * 5 + [10800 - 5 * 1801])
+    esperado = variancia_simples * pares / variancia_par
+    assert acumulador.diagnostico["tamanho_amostral_efetivo"] == pytest.approx(esperado, rel=0.1)
+    assert acumulador.diagnostico["tamanho_amostral_efetivo"] > acumulador.n
+
+# --- Hipercubo Latino ---
+
+def test_lhs_tamanho_efetivo_p5_bate_com_variancia_entre_sementes(carteira):
+    # Variância do p5 em réplicas independentes: hipercubo latino contra amostragem simples.
+    percentis = {amostragem: [MonteCarlo.rodar_simulacao(carteira, 4000, tamanho_bloco=200, seed=semente,
+                                                         amostragem=amostragem).quantil(0.05)
+                              for semente in range(30)]
+                 for amostragem in ("lhs", "simples")}
+    efetivo_observado = 4000 * np.var(percentis["simples"], ddof=1) / np.var(percentis["lhs"], ddof=1)
+
+    diagnostico = MonteCarlo.rodar_simulacao(carteira, 4000, tamanho_bloco=200, seed=99, amostragem="lhs").diagnostico
+    assert diagnostico["tamanho_amostral_efetivo_p5"] == pytest.approx(efetivo_observado, rel=0.5)
+    assert diagnostico["tamanho_amostral_efetivo"] > 10 * diagnostico["tamanho_amostral_efetivo_p5"]
+
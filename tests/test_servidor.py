@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+import pandas as pd
+
+import Control.Servico.cliente  as Cliente
+import Control.Servico.servidor as Servidor
+
+CAMINHO_MODELO = "modelo_score_recuperacao_with_columns_v1.pkl"
+
+def _prospects(n: int) -> list:
+    df = pd.read_csv("base_full.csv", nrows=n)
+    return json.loads(df.to_json(orient="records"))
+
+async def _pedir_concorrente(servico, conteudos: list) -> list:
+    conexoes = [Cliente.ConexaoScore(servico.host, servico.porta) for _ in conteudos]
+    await asyncio.gather(*(conexao.abrir() for conexao in conexoes))
+    try:
+        return await asyncio.gather(*(conexao.pedir("POST", "/score", conteudo)
+                                      for conexao, conteudo in zip(conexoes, conteudos)))
+    finally:
+        await asyncio.gather(*(conexao.fechar() for conexao in conexoes))
+
+# --- Isolamento de Erros no Micro-lote ---
+
+def test_prospect_invalido_nao_derruba_o_lote():
+    async def cenario():
+        # Janela longa: os três pedidos caem no mesmo micro-lote.
+        servico = Servidor.ServicoScore(CAMINHO_MODELO, porta=0, espera_ms=200)
+        await servico.iniciar()
+        try:
+            validos = _prospects(2)
+            invalido = {**validos[0], "valor_divida_mil": "abc"}
+            return await _pedir_concorrente(servico, [validos[0], invalido, validos[1]])
+        finally:
+            await servico.parar()
+
+    (status_1, resposta_1), (status_2, resposta_2), (status_3, resposta_3) = asyncio.run(cenario())
+    assert (status_1, status_3) == (200, 200)
+    assert 0.0 <= resposta_1["score"] <= 1.0 and 0.0 <= resposta_3["score"] <= 1.0
+    assert status_2 == 400 and "valor_divida_mil" in resposta_2["erro"]
+
+def test_falha_do_lote_pontua_um_a_um():
+    async def cenario():
+        agrupador = Servidor.AgrupadorLotes(CAMINHO_MODELO, espera_ms=200)
+        agrupador.iniciar()
+        try:
+            validos = _prospects(2)
+            # Sem validação prévia, o valor inválido chega ao modelo e faz o lote falhar.
+            return await asyncio.gather(agrupador.pontuar([validos[0]]),
+                                        agrupador.pontuar([{**validos[1], "valor_divida_mil": "abc"}]),
+                                        agrupador.pontuar([validos[1]]), return_exceptions=True)
+        finally:
+            await agrupador.parar()
+
+    primeiro, segundo, terceiro = asyncio.run(cenario())
+    assert isinstance(segundo, ValueError)
+    assert 0.0 <= primeiro[0] <= 1.0 and 0.0 <= terceiro[0] <= 1.0
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+import Control.Sintetico.gerador    as Gerador
+import Control.Streaming.streaming  as Streaming
+
+CAMINHO_MODELO = "modelo_score_recuperacao_with_columns_v1.pkl"
+
+def _carteira_pf_primeiro(diretorio) -> str:
+    """CSV com todos os PF antes dos PJ: os primeiros blocos não têm nenhuma coluna de PJ preenchida."""
+    caminho_parquet = str(diretorio / "carteira.parquet")
+    Gerador.gerar_carteira(caminho_parquet, 6000, seed=5)
+    df = pd.read_parquet(caminho_parquet)
+    df = df.iloc[np.argsort(df['razao_social'].notna().to_numpy(), kind='stable')]
+    caminho_csv = str(diretorio / "carteira.csv")
+    df.to_csv(caminho_csv, index=False)
+    return caminho_csv
+
+def test_parquet_aceita_colunas_de_texto_vazias_no_primeiro_bloco(tmp_path):
+    entrada = _carteira_pf_primeiro(tmp_path)
+    manual = Streaming.pontuar_arquivo_manual(entrada, str(tmp_path / "manual.parquet"), linhas_por_bloco=1000)
+    xgboost = Streaming.pontuar_arquivo_xgboost(entrada, CAMINHO_MODELO, str(tmp_path / "xgb.parquet"),
+                                                linhas_por_bloco=1000)
+    saida = pd.read_parquet(tmp_path / "xgb.parquet")
+    assert manual["prospects"] == xgboost["prospects"] == len(saida) == 6000
+    assert saida['razao_social'].notna().sum() == (pd.read_csv(entrada)['razao_social'].notna()).sum()
+    assert saida['capital_social'].dtype == np.float64
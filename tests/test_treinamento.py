@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import Control.Zoro                     as Zoro
+import Control.Sintetico.gerador        as Gerador
+import Control.XGboost.model_training   as XGTraining
+
+def _base_historica(diretorio) -> str:
+    """Carteira sintética com um 'status_final_pago' sorteado, no formato da base de treino."""
+    caminho = str(diretorio / "historico.parquet")
+    Gerador.gerar_carteira(caminho, 2000, seed=3)
+    df = pd.read_parquet(caminho)
+    df["status_final_pago"] = np.random.default_rng(3).integers(0, 2, len(df))
+    df.to_parquet(caminho, index=False)
+    return caminho
+
+def test_treinar_modelo_rejeita_numero_de_amostras_posicional():
+    with pytest.raises(TypeError):
+        Zoro.treinar_modelo("base_full.csv", 54000)
+
+def test_treinar_pipeline_cria_diretorio_do_artefato(tmp_path):
+    diretorio = tmp_path / "modelos" / "novos"
+    caminho_modelo = XGTraining.treinar_pipeline(_base_historica(tmp_path), grade=[{'max_depth': 2, 'eta': 0.3}],
+                                                 rodadas_maximas=5, paciencia=2, diretorio=str(diretorio))
+    assert os.path.dirname(caminho_modelo) == str(diretorio)
+    assert os.path.exists(caminho_modelo)